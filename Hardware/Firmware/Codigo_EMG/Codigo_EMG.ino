@@ -7,8 +7,49 @@
 
 Adafruit_ADS1115 ads;  // Instancia del ADS1115
 
+// Canales a adquirir: 1 = solo la entrada A3 (configuración original), 2-4 = entradas A0..A(N-1)
+// En modo texto cada línea lleva un valor por canal separado por comas
+#define NUM_CHANNELS 1
+
+// 4 canales en texto a 100 Hz son ~2100 bytes/s: por encima de lo que admite 9600 baudios.
+// Con varios canales usar 115200 o el protocolo binario.
+#define TEXT_BAUDRATE 9600
+
+// Protocolo de salida: 0 = texto (una línea por muestra), 1 = tramas binarias
+// Trama: A5 5A | seq (uint16) | canales (uint8) | muestras (uint8) | int16 LE... | checksum (uint16)
+#define BINARY_PROTOCOL 0
+#define BINARY_BAUDRATE 921600
+#define SAMPLES_PER_FRAME 10
+
+#if BINARY_PROTOCOL
+uint16_t frameSeq = 0;
+uint8_t frameCount = 0;
+int16_t frameSamples[SAMPLES_PER_FRAME * NUM_CHANNELS];  // Intercalado por muestra
+
+void sendFrame() {
+  uint8_t header[6] = {0xA5, 0x5A, (uint8_t)(frameSeq & 0xFF), (uint8_t)(frameSeq >> 8), NUM_CHANNELS, frameCount};
+  const uint8_t *payload = (const uint8_t *)frameSamples;  // int16 little-endian
+  uint16_t sum = 0;
+
+  for (int i = 2; i < 6; i++) sum += header[i];
+  for (int i = 0; i < frameCount * NUM_CHANNELS * 2; i++) sum += payload[i];
+
+  Serial.write(header, 6);
+  Serial.write(payload, frameCount * NUM_CHANNELS * 2);
+  Serial.write((uint8_t)(sum & 0xFF));
+  Serial.write((uint8_t)(sum >> 8));
+
+  frameSeq++;
+  frameCount = 0;
+}
+#endif
+
 void setup() {
-  Serial.begin(9600);
+#if BINARY_PROTOCOL
+  Serial.begin(BINARY_BAUDRATE);
+#else
+  Serial.begin(TEXT_BAUDRATE);
+#endif
   Serial.println("Iniciando ADS1115 con pines personalizados");
   
   // Inicializar Wire con pines personalizados
@@ -24,22 +65,42 @@ void setup() {
   // ads.setGain(GAIN_ONE); // 1x gain = +/- 4.096V
   
   Serial.println("ADS1115 inicializado correctamente!");
+
+#if BINARY_PROTOCOL
+  // Anunciar el modo binario; a partir de aquí solo se envían tramas
+  Serial.println("#EMG:BIN1");
+#endif
 }
 
 void loop() {
   // Leer los valores de los diferentes canales
-  int16_t adc3;
-  
+  int16_t adc[NUM_CHANNELS];
 
-  adc3 = ads.readADC_SingleEnded(3);
-  
-  // Convertir a voltaje (opcional)
-
-  float volts3 = ads.computeVolts(adc3);
+  if (NUM_CHANNELS == 1) {
+    adc[0] = ads.readADC_SingleEnded(3);
+  } else {
+    for (int channel = 0; channel < NUM_CHANNELS; channel++) {
+      adc[channel] = ads.readADC_SingleEnded(channel);
+    }
+  }
   
   // Imprimir resultados
 
-  Serial.println(adc3); 
+#if BINARY_PROTOCOL
+  for (int channel = 0; channel < NUM_CHANNELS; channel++) {
+    frameSamples[frameCount * NUM_CHANNELS + channel] = adc[channel];
+  }
+  frameCount++;
+  if (frameCount == SAMPLES_PER_FRAME) {
+    sendFrame();
+  }
+#else
+  for (int channel = 0; channel < NUM_CHANNELS; channel++) {
+    if (channel > 0) Serial.print(',');
+    Serial.print(adc[channel]);
+  }
+  Serial.println();
+#endif
   
   delay(10);
-}
\ No newline at end of file
+}
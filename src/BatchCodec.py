@@ -0,0 +1,153 @@
+"""
+Codificación de los lotes que HTTPSender envía al receptor web.
+
+Formato columnar ("columnar-v1"): en lugar de un objeto por muestra, el lote
+lleva arreglos paralelos y el tiempo codificado en diferencias enteras:
+
+    format      "columnar-v1"
+    timestamp   ISO 8601 del armado del lote
+    batch_time_ms
+    channels    canales por muestra
+    time_ms     {"t0": primer tiempo, "resolution": 0.1, "deltas": [enteros]}
+                el tiempo de la muestra i es t0 + resolution · (deltas[0] + ... + deltas[i - 1])
+    raw         valores por muestra (un canal) o una lista por canal
+    filtered    ídem, redondeados a 0.1 µV
+    features    (opcional) igual que en el formato por muestra
+    events      (opcional) igual que en el formato por muestra
+
+El cuerpo se comprime con gzip (Content-Encoding: gzip). decode_batch acepta
+ambos formatos y devuelve siempre el formato por muestra ("samples"), que es
+el que guarda el receptor y consumen get_data.php e index.html.
+"""
+
+import gzip
+import json
+import numpy as np
+
+COLUMNAR_FORMAT = "columnar-v1"
+TIME_RESOLUTION_MS = 0.1
+GZIP_LEVEL = 6  # Por encima casi no reduce más y cuesta bastante más CPU
+
+
+def _rows(values, count):
+    """(muestras, canales) a partir de (muestras,) o (muestras, canales)"""
+    values = np.asarray(values, dtype=float)
+    return values if values.ndim == 2 else values.reshape(count, 1)
+
+
+def _column(values, channels):
+    """Columna JSON: lista plana con un canal, una lista por canal con varios"""
+    return values[:, 0].tolist() if channels == 1 else values.T.tolist()
+
+
+def columnar_batch(times_ms, raw, filtered, **extra):
+    """Arma el lote columnar; times_ms (muestras,), raw y filtered (muestras, canales)"""
+    times_ms = np.asarray(times_ms, dtype=float)
+    raw = _rows(raw, len(times_ms))
+    filtered = np.round(_rows(filtered, len(times_ms)), 1)
+    channels = raw.shape[1]
+
+    ticks = np.round(times_ms / TIME_RESOLUTION_MS).astype(np.int64)
+    return {
+        "format": COLUMNAR_FORMAT,
+        **extra,
+        "channels": channels,
+        "time_ms": {
+            "t0": round(float(ticks[0]) * TIME_RESOLUTION_MS, 1) if len(ticks) else 0.0,
+            "resolution": TIME_RESOLUTION_MS,
+            "deltas": np.diff(ticks).tolist()
+        },
+        "raw": _column(raw, channels),
+        "filtered": _column(filtered, channels)
+    }
+
+
+def samples_batch(times_ms, raw, filtered, **extra):
+    """Arma el lote en el formato original, un objeto por muestra"""
+    times_ms = np.round(np.asarray(times_ms, dtype=float), 1)
+    raw = _rows(raw, len(times_ms))
+    filtered = np.round(_rows(filtered, len(times_ms)), 1)
+    if raw.shape[1] == 1:
+        raw = raw[:, 0]
+        filtered = filtered[:, 0]
+    return {
+        **extra,
+        "samples": [
+            {"time_ms": t_ms, "raw": raw_value, "filtered": filtered_value}
+            for t_ms, raw_value, filtered_value in zip(times_ms.tolist(), raw.tolist(), filtered.tolist())
+        ]
+    }
+
+
+def batch_times_ms(batch):
+    """Tiempos relativos (ms) de las muestras del lote, en cualquiera de los dos formatos"""
+    if batch.get("format") == COLUMNAR_FORMAT:
+        time_ms = batch["time_ms"]
+        resolution = time_ms["resolution"]
+        t0 = int(round(time_ms["t0"] / resolution))
+        ticks = t0 + np.concatenate(([0], np.cumsum(time_ms["deltas"], dtype=np.int64)))
+        return ticks / round(1 / resolution)
+    return np.array([sample["time_ms"] for sample in batch.get("samples", [])], dtype=float)
+
+
+def batch_values(batch, key="filtered"):
+    """Valores (muestras, canales) de raw o filtered del lote, en cualquiera de los dos formatos"""
+    if batch.get("format") == COLUMNAR_FORMAT:
+        values = np.asarray(batch[key], dtype=float)
+        return values.reshape(-1, 1) if batch["channels"] == 1 else values.T
+    samples = batch.get("samples", [])
+    return _rows([sample[key] for sample in samples], len(samples))
+
+
+def expand_samples(batch):
+    """Convierte un lote columnar al formato por muestra (los demás campos se conservan)"""
+    if batch.get("format") != COLUMNAR_FORMAT:
+        return batch
+
+    times_ms = batch_times_ms(batch)
+    if batch["channels"] == 1:
+        raw, filtered = batch["raw"], batch["filtered"]
+    else:
+        raw = [list(row) for row in zip(*batch["raw"])]
+        filtered = [list(row) for row in zip(*batch["filtered"])]
+
+    expanded = {key: value for key, value in batch.items()
+                if key not in ("format", "channels", "time_ms", "raw", "filtered")}
+    expanded["samples"] = [
+        {"time_ms": t_ms, "raw": raw_value, "filtered": filtered_value}
+        for t_ms, raw_value, filtered_value in zip(times_ms.tolist(), raw, filtered)
+    ]
+    return expanded
+
+
+def batch_headers(compressed):
+    """Cabeceras HTTP para un cuerpo de encode_batch"""
+    headers = {'Content-Type': 'application/json'}
+    if compressed:
+        headers['Content-Encoding'] = 'gzip'
+    return headers
+
+
+def encode_batch(batch, compress=True):
+    """Serializa el lote; devuelve (cuerpo, cabeceras HTTP)"""
+    body = json.dumps(batch, separators=(',', ':')).encode('utf-8')
+    if compress:
+        body = gzip.compress(body, compresslevel=GZIP_LEVEL)
+    return body, batch_headers(compress)
+
+
+def decode_batch(body, content_encoding=None):
+    """Inverso de encode_batch: descomprime si corresponde y expande el formato columnar.
+
+    Un cuerpo que no es JSON lanza json.JSONDecodeError; uno que no es un lote
+    (no es un objeto, o columnar con campos faltantes o mal formados) ValueError
+    """
+    if content_encoding == 'gzip':
+        body = gzip.decompress(body)
+    batch = json.loads(body)
+    if not isinstance(batch, dict):
+        raise ValueError("El lote debe ser un objeto JSON")
+    try:
+        return expand_samples(batch)
+    except (KeyError, TypeError, AttributeError, IndexError, ValueError) as e:
+        raise ValueError(f"Lote columnar inválido: {e!r}") from e
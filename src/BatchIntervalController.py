@@ -0,0 +1,84 @@
+class BatchIntervalController:
+    """Intervalo de armado de lotes de HTTPSender adaptado al RTT y al rendimiento del receptor.
+
+    Con max_in_flight peticiones concurrentes que tardan rtt cada una, el receptor
+    atiende como mucho max_in_flight / rtt lotes por segundo, así que el intervalo
+    no baja de headroom · rtt / max_in_flight. Por encima de ese piso el intervalo
+    crece de forma multiplicativa mientras haya atraso (lotes sin enviar por
+    encima de max_in_flight) o el caudal ofrecido se acerque al que sostiene el
+    receptor: lotes más grandes amortizan el costo fijo de cada petición. Sin
+    atraso vuelve de a poco hacia el piso (min_interval_ms o el del RTT, el
+    mayor), que da la menor latencia; mientras no haya RTT medido vuelve al
+    intervalo base.
+    """
+
+    def __init__(self, base_interval_ms=200, min_interval_ms=100, max_interval_ms=2000,
+                 max_in_flight=4, headroom=1.5, smoothing=0.2):
+        self.base_interval_ms = base_interval_ms
+        self.min_interval_ms = min_interval_ms
+        self.max_interval_ms = max_interval_ms
+        self.max_in_flight = max_in_flight
+        self.headroom = headroom    # Margen sobre la capacidad estimada
+        self.smoothing = smoothing  # Peso de cada medición en los promedios exponenciales
+        self.reset()
+
+    def reset(self):
+        self.interval_ms = self.base_interval_ms
+        self.rtt = None                # Segundos por petición (promedio exponencial)
+        self.request_throughput = None  # Bytes por segundo de una petición (cuerpo / rtt)
+        self.batch_bytes = None        # Tamaño de cuerpo promedio de los lotes armados
+
+    def _average(self, current, value):
+        return value if current is None else current + self.smoothing * (value - current)
+
+    def record_batch(self, body_bytes):
+        """Lote armado: estima el caudal ofrecido"""
+        self.batch_bytes = self._average(self.batch_bytes, body_bytes)
+
+    def record_ack(self, rtt_seconds, body_bytes):
+        """Lote confirmado por el receptor"""
+        rtt_seconds = max(rtt_seconds, 1e-4)
+        self.rtt = self._average(self.rtt, rtt_seconds)
+        self.request_throughput = self._average(self.request_throughput, body_bytes / rtt_seconds)
+
+    @property
+    def capacity(self):
+        """Bytes por segundo que sostiene el receptor con todas las peticiones en vuelo"""
+        if self.request_throughput is None:
+            return None
+        return self.max_in_flight * self.request_throughput
+
+    @property
+    def offered_rate(self):
+        """Bytes por segundo que se generan con el intervalo actual"""
+        if self.batch_bytes is None:
+            return None
+        return self.batch_bytes / (self.interval_ms / 1000)
+
+    def update(self, backlog):
+        """Recalcula el intervalo con backlog lotes sin enviar; devuelve el intervalo en ms"""
+        saturated = backlog > self.max_in_flight
+        if self.capacity is not None and self.offered_rate is not None:
+            saturated = saturated or self.offered_rate * self.headroom > self.capacity
+
+        floor = self.min_interval_ms
+        if self.rtt is not None:
+            floor = max(floor, 1000 * self.headroom * self.rtt / self.max_in_flight)
+
+        if saturated:
+            interval = self.interval_ms * 1.25
+        else:
+            # Enlace medido: bajar hasta el piso; sin mediciones, no pasar del intervalo base
+            target = floor if self.rtt is not None else self.base_interval_ms
+            interval = target + int(0.9 * (self.interval_ms - target))
+
+        self.interval_ms = int(round(min(self.max_interval_ms, max(floor, interval))))
+        return self.interval_ms
+
+    def get_settings(self):
+        return {
+            'interval_ms': self.interval_ms,
+            'rtt_ms': None if self.rtt is None else round(self.rtt * 1000, 1),
+            'capacity_kbps': None if self.capacity is None else round(self.capacity / 1024, 1),
+            'max_in_flight': self.max_in_flight
+        }
@@ -0,0 +1,218 @@
+"""
+Cola persistente de lotes HTTP pendientes (spool) en disco.
+
+Los lotes ya codificados se agregan al final de archivos de segmento
+append-only (spool_00000001.bin, ...). Cada registro (little-endian):
+
+    magic       4 bytes  b"EMGS"
+    body_size   uint32   tamaño del cuerpo
+    created     float64  momento en que se armó el lote (segundos epoch)
+    id_size     uint16   tamaño del identificador
+    flags       uint8    bit 0: cuerpo comprimido con gzip
+    batch_id    UTF-8
+    body        bytes tal como se envían
+
+El archivo "cursor" guarda (segmento, offset) del primer registro sin
+confirmar; un segmento se borra cuando el cursor lo deja atrás. Al abrir se
+recorre desde el cursor y se trunca un registro final incompleto (cierre
+abrupto a mitad de escritura). Si se supera max_bytes se descartan segmentos
+completos, los más antiguos primero, y se cuentan en dropped_batches.
+"""
+
+import os
+import struct
+import threading
+import time
+from collections import deque, namedtuple
+
+RECORD_MAGIC = b"EMGS"
+RECORD_HEADER = struct.Struct('<4sIdHB')
+CURSOR = struct.Struct('<QQ')
+FLAG_GZIP = 0x01
+
+SpooledBatch = namedtuple('SpooledBatch', ['batch_id', 'body', 'compressed', 'created'])
+
+# Ubicación de un registro: segmento, offset y tamaño total en disco
+_Entry = namedtuple('_Entry', ['segment', 'offset', 'size', 'created', 'batch_id'])
+
+
+class BatchSpool:
+    """FIFO de lotes en disco con tamaño acotado; apto para un escritor/lector y lecturas de estado desde otro hilo"""
+
+    def __init__(self, directory, max_bytes=64 * 1024 * 1024, segment_bytes=1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.segment_bytes = segment_bytes
+        self.bytes = 0             # Bytes en disco de los registros pendientes
+        self.dropped_batches = 0   # Descartados por superar max_bytes
+        self._entries = deque()
+        self._lock = threading.Lock()
+        self._write_segment = None
+        self._write_handle = None
+
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _segment_path(self, segment):
+        return os.path.join(self.directory, f"spool_{segment:08d}.bin")
+
+    def _cursor_path(self):
+        return os.path.join(self.directory, "cursor")
+
+    def _segments(self):
+        segments = []
+        for name in os.listdir(self.directory):
+            if name.startswith("spool_") and name.endswith(".bin"):
+                try:
+                    segments.append(int(name[6:-4]))
+                except ValueError:
+                    continue
+        return sorted(segments)
+
+    def _load(self):
+        """Reconstruye el índice desde el cursor; descarta lo ya confirmado y colas incompletas"""
+        cursor_segment, cursor_offset = 0, 0
+        try:
+            with open(self._cursor_path(), 'rb') as f:
+                cursor_segment, cursor_offset = CURSOR.unpack(f.read(CURSOR.size))
+        except (OSError, struct.error):
+            pass
+
+        segments = self._segments()
+        for segment in segments:
+            path = self._segment_path(segment)
+            if segment < cursor_segment:
+                os.remove(path)
+                continue
+            offset = cursor_offset if segment == cursor_segment else 0
+            with open(path, 'r+b') as f:
+                f.seek(offset)
+                while True:
+                    header = f.read(RECORD_HEADER.size)
+                    if len(header) < RECORD_HEADER.size:
+                        break
+                    magic, body_size, created, id_size, _flags = RECORD_HEADER.unpack(header)
+                    batch_id = f.read(id_size)
+                    size = RECORD_HEADER.size + id_size + body_size
+                    if magic != RECORD_MAGIC or len(batch_id) < id_size or offset + size > os.fstat(f.fileno()).st_size:
+                        break
+                    self._entries.append(_Entry(segment, offset, size, created, batch_id.decode('utf-8')))
+                    self.bytes += size
+                    offset += size
+                    f.seek(offset)
+                f.truncate(offset)
+
+        self._next_segment = (segments[-1] + 1) if segments else 1
+        if not self._entries:
+            self._discard_files()
+
+    def append(self, batch_id, body, compressed=True, created=None):
+        """Agrega un lote al final; lo escribe y vacía el buffer del archivo antes de volver.
+
+        Devuelve los batch_id que se descartaron por superar max_bytes (normalmente ninguno).
+        """
+        created = time.time() if created is None else created
+        batch_id_bytes = batch_id.encode('utf-8')
+        record = RECORD_HEADER.pack(RECORD_MAGIC, len(body), created, len(batch_id_bytes),
+                                    FLAG_GZIP if compressed else 0) + batch_id_bytes + body
+
+        if self._write_handle is None or self._write_handle.tell() >= self.segment_bytes:
+            self._roll_segment()
+        offset = self._write_handle.tell()
+        self._write_handle.write(record)
+        self._write_handle.flush()
+
+        with self._lock:
+            self._entries.append(_Entry(self._write_segment, offset, len(record), created, batch_id))
+            self.bytes += len(record)
+        return self._enforce_limit()
+
+    def _roll_segment(self):
+        if self._write_handle is not None:
+            self._write_handle.close()
+        self._write_segment = self._next_segment
+        self._next_segment += 1
+        self._write_handle = open(self._segment_path(self._write_segment), 'ab')
+
+    def batch_id(self, position=0):
+        """Identificador del lote en la posición dada (0 = el más antiguo)"""
+        return self._entries[position].batch_id
+
+    def peek(self, position=0):
+        """Lote sin confirmar en la posición dada (0 = el más antiguo), o None"""
+        if position >= len(self._entries):
+            return None
+        entry = self._entries[position]
+        with open(self._segment_path(entry.segment), 'rb') as f:
+            f.seek(entry.offset)
+            record = f.read(entry.size)
+        _magic, body_size, created, id_size, flags = RECORD_HEADER.unpack_from(record)
+        return SpooledBatch(
+            batch_id=entry.batch_id,
+            body=record[RECORD_HEADER.size + id_size:],
+            compressed=bool(flags & FLAG_GZIP),
+            created=created
+        )
+
+    def pop(self):
+        """Confirma el lote más antiguo (entregado o rechazado) y avanza el cursor"""
+        with self._lock:
+            entry = self._entries.popleft()
+            self.bytes -= entry.size
+        if not self._entries:
+            self._discard_files()
+            return
+        head = self._entries[0]
+        self._write_cursor(head.segment, head.offset)
+        if head.segment != entry.segment:
+            os.remove(self._segment_path(entry.segment))
+
+    def _enforce_limit(self):
+        """Descarta segmentos completos (nunca el que se está escribiendo) mientras se supere max_bytes;
+        devuelve los batch_id descartados"""
+        dropped = []
+        while self.bytes > self.max_bytes and self._entries[0].segment != self._write_segment:
+            segment = self._entries[0].segment
+            with self._lock:
+                while self._entries[0].segment == segment:
+                    entry = self._entries.popleft()
+                    self.bytes -= entry.size
+                    self.dropped_batches += 1
+                    dropped.append(entry.batch_id)
+            head = self._entries[0]
+            self._write_cursor(head.segment, head.offset)
+            os.remove(self._segment_path(segment))
+        return dropped
+
+    def _write_cursor(self, segment, offset):
+        """Reemplazo atómico: un corte a mitad de escritura deja el cursor anterior"""
+        temporary = self._cursor_path() + ".tmp"
+        with open(temporary, 'wb') as f:
+            f.write(CURSOR.pack(segment, offset))
+        os.replace(temporary, self._cursor_path())
+
+    def _discard_files(self):
+        """Spool vacío: se borran segmentos y cursor"""
+        if self._write_handle is not None:
+            self._write_handle.close()
+            self._write_handle = None
+        for segment in self._segments():
+            os.remove(self._segment_path(segment))
+        if os.path.exists(self._cursor_path()):
+            os.remove(self._cursor_path())
+
+    def oldest_age(self, now=None):
+        """Segundos desde que se armó el lote pendiente más antiguo (None si no hay)"""
+        with self._lock:
+            if not self._entries:
+                return None
+            created = self._entries[0].created
+        return (time.time() if now is None else now) - created
+
+    def close(self):
+        if self._write_handle is not None:
+            self._write_handle.close()
+            self._write_handle = None
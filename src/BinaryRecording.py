@@ -0,0 +1,161 @@
+"""
+Formato binario columnar para grabaciones EMG (.emgb).
+
+Estructura del archivo (little-endian):
+    magic        8 bytes  b"EMGBIN01"
+    header_size  uint32   tamaño total del encabezado (múltiplo de 64 bytes)
+    metadata     JSON UTF-8 con los datos de la sesión, completado con espacios
+    chunks       bloques de tamaño fijo con chunk_samples muestras cada uno
+
+Cada chunk guarda sus columnas contiguas:
+    count     uint32                      muestras válidas del chunk
+    reserved  uint32
+    time      float64[chunk_samples]              tiempo absoluto (segundos epoch)
+    sample    int32[chunk_samples]                número de muestra
+    raw       float32[chunk_samples, channels]    valor crudo en mV
+    filtered  float32[chunk_samples, channels]    potencial filtrado en µV
+
+Todos los chunks ocupan lo mismo, así que agregar uno es O(1) y el archivo se
+puede mapear directamente como un array de registros. Solo el último chunk
+puede estar incompleto (count < chunk_samples).
+"""
+
+import csv
+import json
+import struct
+import numpy as np
+from datetime import datetime
+
+MAGIC = b"EMGBIN01"
+FILE_EXTENSION = ".emgb"
+HEADER_PREFIX = struct.Struct('<8sI')
+HEADER_ALIGNMENT = 64
+DEFAULT_CHUNK_SAMPLES = 1024
+
+
+def chunk_dtype(channels, chunk_samples=DEFAULT_CHUNK_SAMPLES):
+    """dtype estructurado de un chunk"""
+    return np.dtype([
+        ('count', '<u4'),
+        ('reserved', '<u4'),
+        ('time', '<f8', (chunk_samples,)),
+        ('sample', '<i4', (chunk_samples,)),
+        ('raw', '<f4', (chunk_samples, channels)),
+        ('filtered', '<f4', (chunk_samples, channels))
+    ])
+
+
+def write_header(file_handle, metadata):
+    """Escribe magic, tamaño y metadatos JSON; devuelve la cantidad de bytes escritos"""
+    text = json.dumps(metadata, ensure_ascii=False).encode('utf-8')
+    size = HEADER_PREFIX.size + len(text)
+    size += -size % HEADER_ALIGNMENT
+    header = HEADER_PREFIX.pack(MAGIC, size) + text
+    file_handle.write(header.ljust(size, b' '))
+    return size
+
+
+def read_header(file_handle):
+    """Lee el encabezado; devuelve (metadatos, offset del primer chunk)"""
+    prefix = file_handle.read(HEADER_PREFIX.size)
+    if len(prefix) < HEADER_PREFIX.size:
+        raise ValueError("Archivo demasiado corto para ser una grabación binaria")
+    magic, size = HEADER_PREFIX.unpack(prefix)
+    if magic != MAGIC:
+        raise ValueError(f"No es una grabación binaria EMG (magic {magic!r})")
+    metadata = json.loads(file_handle.read(size - HEADER_PREFIX.size).decode('utf-8'))
+    return metadata, size
+
+
+class BinaryRecordingWriter:
+    """Acumula muestras en un chunk en memoria y escribe cada chunk completo al archivo"""
+
+    def __init__(self, file_handle, channels, chunk_samples=DEFAULT_CHUNK_SAMPLES):
+        self.file_handle = file_handle
+        self.channels = channels
+        self.chunk_samples = chunk_samples
+        self._chunk = np.zeros((), dtype=chunk_dtype(channels, chunk_samples))
+        self._count = 0
+
+    def append(self, times, sample_numbers, raw_rows, filtered_rows):
+        """Agrega un bloque (raw/filtered de forma (muestras, canales)); devuelve bytes escritos"""
+        written = 0
+        position = 0
+        total = len(times)
+
+        while position < total:
+            take = min(total - position, self.chunk_samples - self._count)
+            chunk_slice = slice(self._count, self._count + take)
+            block_slice = slice(position, position + take)
+            self._chunk['time'][chunk_slice] = times[block_slice]
+            self._chunk['sample'][chunk_slice] = sample_numbers[block_slice]
+            self._chunk['raw'][chunk_slice] = raw_rows[block_slice]
+            self._chunk['filtered'][chunk_slice] = filtered_rows[block_slice]
+            self._count += take
+            position += take
+
+            if self._count == self.chunk_samples:
+                written += self._write_chunk()
+
+        return written
+
+    def _write_chunk(self):
+        self._chunk['count'] = self._count
+        data = self._chunk.tobytes()
+        self.file_handle.write(data)
+        self._chunk = np.zeros_like(self._chunk)
+        self._count = 0
+        return len(data)
+
+    def close(self):
+        """Escribe el último chunk incompleto (si hay); devuelve bytes escritos"""
+        if self._count == 0:
+            return 0
+        return self._write_chunk()
+
+
+def read_chunks(path):
+    """Lee metadatos y chunks completos de una grabación (array de registros)"""
+    with open(path, 'rb') as f:
+        metadata, offset = read_header(f)
+    dtype = chunk_dtype(metadata['channels'], metadata['chunk_samples'])
+    chunks = np.fromfile(path, dtype=dtype, offset=offset)
+    return metadata, chunks
+
+
+def convert_to_csv(path, csv_path=None):
+    """Exporta una grabación binaria al mismo CSV que escribe DataLogger; devuelve la ruta"""
+    if csv_path is None:
+        csv_path = path[:-len(FILE_EXTENSION)] + ".csv" if path.endswith(FILE_EXTENSION) else path + ".csv"
+
+    metadata, chunks = read_chunks(path)
+    channels = metadata['channels']
+    session_start_ms = metadata['session_start_time'] * 1000
+
+    if channels == 1:
+        value_columns = ['raw_value_mv', 'filtered_value_uv']
+    else:
+        value_columns = ([f'raw_value_mv_ch{channel}' for channel in range(channels)] +
+                         [f'filtered_value_uv_ch{channel}' for channel in range(channels)])
+
+    with open(csv_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['timestamp_iso', 'time_ms', 'sample_number'] + value_columns)
+
+        for chunk in chunks:
+            count = int(chunk['count'])
+            times = chunk['time'][:count]
+            writer.writerows(
+                [datetime.fromtimestamp(ts).isoformat(), f"{t_ms:.1f}", number] +
+                [f"{mv:.3f}" for mv in raw_row] +
+                [f"{uv:.1f}" for uv in filtered_row]
+                for ts, t_ms, number, raw_row, filtered_row in zip(
+                    times.tolist(),
+                    (times * 1000 - session_start_ms).tolist(),
+                    chunk['sample'][:count].tolist(),
+                    chunk['raw'][:count].tolist(),
+                    chunk['filtered'][:count].tolist()
+                )
+            )
+
+    return csv_path
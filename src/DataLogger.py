@@ -1,56 +1,112 @@
 import csv
+import io
 import os
 import time
+import threading
+import numpy as np
+from queue import Queue, Empty, Full
 from datetime import datetime
 from PySide6.QtCore import QObject, Signal
+from BinaryRecording import (BinaryRecordingWriter, DEFAULT_CHUNK_SAMPLES, FILE_EXTENSION,
+                             write_header, convert_to_csv)
+from FeatureExtractor import FEATURE_NAMES, FeatureFrame
+from OnsetDetector import ActivationEvent
 
 class DataLogger(QObject):
     log_status = Signal(str)
     
-    def __init__(self, base_directory="data"):
+    def __init__(self, base_directory="data", queue_max_blocks=512, flush_interval=1.0,
+                 fsync=False, status_interval=10.0):
         super().__init__()
         self.base_directory = base_directory
         self.current_file = None
-        self.csv_writer = None
+        self.last_file = None
         self.file_handle = None
+        self.file_format = 'csv'  # 'csv' o 'binary' (columnar .emgb)
+        self.binary_writer = None
+        # CSV auxiliares junto a la grabación: características por ventana y eventos de activación.
+        # Se abren con el primer registro y solo los usa el hilo escritor (ruta -> archivo)
+        self.features_file = None
+        self.events_file = None
+        self._sidecar_handles = {}
         self.is_logging = False
         self.sample_count = 0
         self.session_start_time = None  # Tiempo de inicio de la sesión en ms
+        self.num_channels = 1
+        
+        # Escritura asíncrona: los bloques se encolan y un hilo los formatea y escribe en lotes
+        self.write_queue = Queue(maxsize=queue_max_blocks)
+        self.writer_thread = None
+        self.flush_interval = flush_interval    # Segundos entre flush del archivo
+        self.fsync = fsync                      # Forzar también os.fsync en cada flush
+        self.status_interval = status_interval  # Segundos entre reportes de estado por log_status
+        
+        # Estadísticas del escritor
+        self.samples_written = 0
+        self.bytes_written = 0
+        self.dropped_samples = 0
+        
+        # LatencyTracer opcional: latencia llegada -> escritura, medida en el hilo escritor
+        self.latency_tracer = None
         
         # Crear directorio si no existe
         if not os.path.exists(self.base_directory):
             os.makedirs(self.base_directory)
     
-    def start_logging(self, session_name=None):
+    def start_logging(self, session_name=None, num_channels=1, file_format=None, metadata=None):
+        """Inicia una grabación; metadata (frecuencia, calibración, filtros...) se guarda en el formato binario"""
         if self.is_logging:
             return False
+        
+        file_format = file_format or self.file_format
+        if file_format not in ('csv', 'binary'):
+            self.log_status.emit(f"Error al iniciar grabación: formato desconocido '{file_format}'")
+            return False
             
         try:
             # Generar nombre de archivo
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            extension = FILE_EXTENSION if file_format == 'binary' else ".csv"
             if session_name:
-                filename = f"{session_name}_{timestamp}.csv"
+                filename = f"{session_name}_{timestamp}{extension}"
             else:
-                filename = f"emg_session_{timestamp}.csv"
+                filename = f"emg_session_{timestamp}{extension}"
             
             self.current_file = os.path.join(self.base_directory, filename)
+            self.features_file = os.path.splitext(self.current_file)[0] + "_features.csv"
+            self.events_file = os.path.splitext(self.current_file)[0] + "_events.csv"
+            self.num_channels = num_channels
+            self.session_start_time = time.time() * 1000  # Tiempo de inicio en ms
             
-            # Abrir archivo y crear writer
-            self.file_handle = open(self.current_file, 'w', newline='')
-            self.csv_writer = csv.writer(self.file_handle)
-            
-            # Escribir encabezados actualizados
-            self.csv_writer.writerow([
-                'timestamp_iso',           # Timestamp absoluto ISO
-                'time_ms',                # Tiempo relativo en milisegundos desde inicio
-                'sample_number', 
-                'raw_value_mv',           # Valor crudo en mV
-                'filtered_value_uv'       # Valor filtrado en µV
-            ])
+            if file_format == 'binary':
+                self.file_handle = open(self.current_file, 'wb')
+                write_header(self.file_handle, {
+                    'channels': num_channels,
+                    'chunk_samples': DEFAULT_CHUNK_SAMPLES,
+                    'session_start_time': self.session_start_time / 1000,
+                    'session_name': session_name or "emg_session",
+                    **(metadata or {})
+                })
+                self.binary_writer = BinaryRecordingWriter(self.file_handle, num_channels)
+            else:
+                self.file_handle = open(self.current_file, 'w', newline='')
+                
+                # Escribir encabezados actualizados
+                csv.writer(self.file_handle).writerow([
+                    'timestamp_iso',           # Timestamp absoluto ISO
+                    'time_ms',                # Tiempo relativo en milisegundos desde inicio
+                    'sample_number', 
+                ] + self._channel_columns())
             
             self.is_logging = True
             self.sample_count = 0
-            self.session_start_time = time.time() * 1000  # Tiempo de inicio en ms
+            self.samples_written = 0
+            self.bytes_written = self.file_handle.tell()
+            self.dropped_samples = 0
+            
+            # Hilo escritor dedicado a esta sesión
+            self.writer_thread = threading.Thread(target=self._writer_worker, daemon=True)
+            self.writer_thread.start()
             self.log_status.emit(f"Iniciando grabación: {filename}")
             return True
             
@@ -58,50 +114,261 @@ class DataLogger(QObject):
             self.log_status.emit(f"Error al iniciar grabación: {str(e)}")
             return False
     
+    def _channel_columns(self):
+        """Columnas de valores: las originales con un canal, una por canal con varios"""
+        if self.num_channels == 1:
+            return ['raw_value_mv', 'filtered_value_uv']  # Valor crudo en mV, filtrado en µV
+        return ([f'raw_value_mv_ch{channel}' for channel in range(self.num_channels)] +
+                [f'filtered_value_uv_ch{channel}' for channel in range(self.num_channels)])
+    
     def log_sample(self, raw_value_mv, filtered_value_uv):
-        if not self.is_logging or not self.csv_writer:
+        self.log_block([raw_value_mv], [filtered_value_uv])
+    
+    def log_block(self, raw_values_mv, filtered_values_uv, timestamps=None):
+        """Encola un bloque de muestras para el hilo escritor - NO BLOQUEANTE
+        
+        Si la cola está llena (disco lento) el bloque se descarta y se cuenta en
+        dropped_samples; los números de muestra descartados quedan como hueco en el archivo.
+        """
+        if not self.is_logging:
             return
-            
+        
+        count = len(raw_values_mv)
+        if count == 0:
+            return
+        
+        if timestamps is None:
+            timestamps = np.full(count, time.time())
+        
+        # Copias propias: el productor puede reutilizar sus arrays
+        block = (
+            np.array(timestamps, dtype=float),
+            self.sample_count + 1,
+            np.array(raw_values_mv, dtype=float).reshape(count, -1),
+            np.array(filtered_values_uv, dtype=float).reshape(count, -1)
+        )
+        self.sample_count += count
+        
         try:
-            current_time = time.time() * 1000
-            timestamp_iso = datetime.now().isoformat()
-            time_ms = current_time - self.session_start_time
-            self.sample_count += 1
-            
-            self.csv_writer.writerow([
-                timestamp_iso,
-                f"{time_ms:.1f}",  # Tiempo relativo con 1 decimal
-                self.sample_count,
-                f"{raw_value_mv:.3f}",      # mV con 3 decimales
-                f"{filtered_value_uv:.1f}"  # µV con 1 decimal
-            ])
-            
-            # Flush cada 100 muestras para asegurar escritura
-            if self.sample_count % 100 == 0:
-                self.file_handle.flush()
+            self.write_queue.put_nowait(block)
+        except Full:
+            self.dropped_samples += count
+    
+    def log_features(self, features):
+        """Encola un FeatureFrame para el CSV de características - NO BLOQUEANTE"""
+        if not self.is_logging:
+            return
+        try:
+            self.write_queue.put_nowait(features)
+        except Full:
+            pass  # Datos derivados: se recalculan desde la grabación si hace falta
+    
+    def log_events(self, events):
+        """Encola eventos de activación (ActivationEvent) para el CSV de eventos - NO BLOQUEANTE"""
+        if not self.is_logging:
+            return
+        for event in events:
+            try:
+                self.write_queue.put_nowait(event)
+            except Full:
+                self.log_status.emit("Advertencia: evento de activación descartado por cola de escritura llena")
+    
+    def _writer_worker(self):
+        """Worker thread que vacía la cola y escribe en lotes - EJECUTA EN HILO ESCRITOR"""
+        last_flush = last_status = time.time()
+        running = True
+        
+        while running:
+            try:
+                blocks = [self.write_queue.get(timeout=0.5)]
+            except Empty:
+                blocks = []
+            
+            # Tomar todo lo acumulado para escribirlo de una vez
+            while True:
+                try:
+                    blocks.append(self.write_queue.get_nowait())
+                except Empty:
+                    break
+            
+            if None in blocks:
+                # Marca de fin: escribir lo anterior y terminar
+                blocks = blocks[:blocks.index(None)]
+                running = False
+            
+            now = time.time()
+            try:
+                if blocks:
+                    self._write_batch(blocks)
                 
-        except Exception as e:
-            self.log_status.emit(f"Error al escribir muestra: {str(e)}")
+                if not running or now - last_flush >= self.flush_interval:
+                    self.file_handle.flush()
+                    for handle in self._sidecar_handles.values():
+                        handle.flush()
+                    if self.fsync:
+                        os.fsync(self.file_handle.fileno())
+                    last_flush = now
+                    
+            except Exception as e:
+                self.log_status.emit(f"Error al escribir bloque: {str(e)}")
+            
+            if running and now - last_status >= self.status_interval:
+                self.log_status.emit(self._status_message())
+                last_status = now
+    
+    def _write_batch(self, blocks):
+        features = [block for block in blocks if isinstance(block, FeatureFrame)]
+        events = [block for block in blocks if isinstance(block, ActivationEvent)]
+        if features or events:
+            if features:
+                self._write_features_batch(features)
+            if events:
+                self._write_events_batch(events)
+            blocks = [block for block in blocks if not isinstance(block, (FeatureFrame, ActivationEvent))]
+            if not blocks:
+                return
+        
+        if self.binary_writer:
+            for timestamps, first_sample, raw_rows, filtered_rows in blocks:
+                count = len(timestamps)
+                self.bytes_written += self.binary_writer.append(
+                    timestamps, np.arange(first_sample, first_sample + count), raw_rows, filtered_rows)
+                self.samples_written += count
+        else:
+            self._write_csv_batch(blocks)
+        
+        if self.latency_tracer is not None:
+            self.latency_tracer.record('disk', np.concatenate([block[0] for block in blocks]))
+    
+    def _write_csv_batch(self, blocks):
+        """Formatea un lote de bloques como CSV con una sola escritura al archivo"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        
+        for timestamps, first_sample, raw_rows, filtered_rows in blocks:
+            times_ms = timestamps * 1000 - self.session_start_time
+            writer.writerows(
+                [datetime.fromtimestamp(ts).isoformat(), f"{t_ms:.1f}", number] +
+                [f"{mv:.3f}" for mv in raw_row] +
+                [f"{uv:.1f}" for uv in filtered_row]
+                for ts, t_ms, number, raw_row, filtered_row in zip(
+                    timestamps.tolist(),
+                    times_ms.tolist(),
+                    range(first_sample, first_sample + len(timestamps)),
+                    raw_rows.tolist(),
+                    filtered_rows.tolist()
+                )
+            )
+            self.samples_written += len(timestamps)
+        
+        text = buffer.getvalue()
+        self.file_handle.write(text)
+        self.bytes_written += len(text)  # Contenido ASCII: caracteres == bytes
+    
+    def _sidecar_handle(self, path, header):
+        """Archivo auxiliar abierto (con encabezado la primera vez)"""
+        handle = self._sidecar_handles.get(path)
+        if handle is None:
+            handle = self._sidecar_handles[path] = open(path, 'w', newline='')
+            csv.writer(handle).writerow(header)
+        return handle
+    
+    def _write_features_batch(self, frames):
+        """Agrega ventanas de características al CSV auxiliar, con una columna por canal"""
+        units = {'rms': 'rms_uv', 'mav': 'mav_uv', 'wl': 'wl_uv', 'zc': 'zc', 'ssc': 'ssc'}
+        channels = frames[0].rms.shape[1]
+        columns = [units[name] if channels == 1 else f"{units[name]}_ch{channel}"
+                   for name in FEATURE_NAMES for channel in range(channels)]
+        handle = self._sidecar_handle(self.features_file, ['time_ms'] + columns)
+        
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for frame in frames:
+            times_ms = frame.time * 1000 - self.session_start_time
+            values = np.hstack([getattr(frame, name) for name in FEATURE_NAMES])
+            writer.writerows([f"{t_ms:.1f}"] + [f"{value:.2f}" for value in row]
+                             for t_ms, row in zip(times_ms.tolist(), values.tolist()))
+        handle.write(buffer.getvalue())
+    
+    def _write_events_batch(self, events):
+        """Agrega eventos de activación al CSV de eventos"""
+        handle = self._sidecar_handle(self.events_file, [
+            'timestamp_iso', 'time_ms', 'detected_ms', 'channel', 'event', 'envelope_uv', 'threshold_uv'
+        ])
+        csv.writer(handle).writerows(
+            [datetime.fromtimestamp(event.time).isoformat(),
+             f"{event.time * 1000 - self.session_start_time:.1f}",
+             f"{event.detected_at * 1000 - self.session_start_time:.1f}",
+             event.channel, event.kind, f"{event.envelope_uv:.2f}", f"{event.threshold_uv:.2f}"]
+            for event in events
+        )
+    
+    def get_stats(self):
+        """Estadísticas del escritor asíncrono"""
+        return {
+            'queue_depth': self.write_queue.qsize(),
+            'samples_written': self.samples_written,
+            'bytes_written': self.bytes_written,
+            'dropped_samples': self.dropped_samples
+        }
+    
+    def _status_message(self):
+        stats = self.get_stats()
+        return (f"Grabación: {stats['samples_written']} muestras, {stats['bytes_written'] / 1024:.0f} KB, "
+                f"cola {stats['queue_depth']}, descartadas {stats['dropped_samples']}")
     
     def stop_logging(self):
         if not self.is_logging:
             return
             
         try:
+            # Dejar de aceptar bloques y esperar a que el escritor vacíe la cola
+            self.is_logging = False
+            if self.writer_thread:
+                self.write_queue.put(None)
+                self.writer_thread.join()
+                self.writer_thread = None
+            
+            if self.binary_writer:
+                # Último chunk incompleto
+                self.bytes_written += self.binary_writer.close()
+                self.binary_writer = None
+            
             if self.file_handle:
                 self.file_handle.close()
+            
+            for path, handle in self._sidecar_handles.items():
+                handle.close()
+                self.log_status.emit(f"Archivo auxiliar guardado: {path}")
+            self._sidecar_handles = {}
                 
-            self.is_logging = False
-            self.log_status.emit(f"Grabación finalizada. {self.sample_count} muestras guardadas en {self.current_file}")
+            self.log_status.emit(f"Grabación finalizada. {self.samples_written} muestras guardadas en {self.current_file}")
+            if self.dropped_samples:
+                self.log_status.emit(f"Advertencia: {self.dropped_samples} muestras descartadas por cola de escritura llena")
             
+            self.last_file = self.current_file
             self.current_file = None
-            self.csv_writer = None
             self.file_handle = None
             self.session_start_time = None
             
         except Exception as e:
             self.log_status.emit(f"Error al finalizar grabación: {str(e)}")
     
+    def export_csv(self, path=None, csv_path=None):
+        """Convierte una grabación binaria (por defecto la última) a CSV; devuelve la ruta del CSV"""
+        path = path or self.last_file
+        if not path or not path.endswith(FILE_EXTENSION):
+            self.log_status.emit("Error al exportar: no hay grabación binaria para convertir")
+            return None
+        
+        try:
+            csv_path = convert_to_csv(path, csv_path)
+            self.log_status.emit(f"Grabación exportada a CSV: {csv_path}")
+            return csv_path
+        except Exception as e:
+            self.log_status.emit(f"Error al exportar a CSV: {str(e)}")
+            return None
+    
     def get_current_file(self):
         return self.current_file
     
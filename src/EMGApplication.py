@@ -1,24 +1,53 @@
+import os
 import sys
+import argparse
+import numpy as np
+from datetime import datetime
 from PySide6.QtWidgets import QApplication
 from PySide6.QtCore import QObject, Signal, QTimer
 from SerialHandler import SerialHandler
+from ReplaySource import ReplaySource
 from SignalProcessor import SignalProcessor
 from DataLogger import DataLogger
 from HTTPSender import HTTPSender
 from MainWindow import MainWindow
 from ThemeManager import ThemeManager
+from LatencyTracer import LatencyTracer
+from FeatureExtractor import FeatureExtractor
+from SpectralAnalyzer import SpectralAnalyzer
+from OnsetDetector import OnsetDetector
 
 class EMGApplication(QObject):
-    def __init__(self):
+    def __init__(self, replay_path=None, replay_speed=1.0, server_url=None, max_in_flight=1):
         super().__init__()
         
-        # Inicializar componentes
-        self.serial_handler = SerialHandler()
+        # Inicializar componentes (una grabación reemplaza al puerto serie si se indica)
+        self.replay_path = replay_path
+        if replay_path:
+            self.serial_handler = ReplaySource(replay_path, speed=replay_speed)
+        else:
+            self.serial_handler = SerialHandler()
         self.signal_processor = SignalProcessor()
+        self.feature_extractor = FeatureExtractor()
+        self.spectral_analyzer = SpectralAnalyzer()
+        self.onset_detector = OnsetDetector()
         self.data_logger = DataLogger()
-        self.http_sender = HTTPSender()
+        # Receptor web: el servidor público, u otro con las mismas rutas (por ejemplo IngestServer)
+        receiver_urls = {}
+        if server_url:
+            base_url = server_url.rstrip('/') + '/'
+            receiver_urls = {'receiver_url': base_url + "reciver.php", 'clear_url': base_url + "clear.php"}
+        self.http_sender = HTTPSender(spool_directory=os.path.join(self.data_logger.base_directory, "spool"),
+                                      max_in_flight=max_in_flight, **receiver_urls)
         self.main_window = MainWindow()
         
+        # Latencias por etapa desde la llegada de cada muestra (compartido con los consumidores)
+        self.latency_tracer = LatencyTracer()
+        self.data_logger.latency_tracer = self.latency_tracer
+        self.http_sender.latency_tracer = self.latency_tracer
+        self.main_window.latency_tracer = self.latency_tracer
+        self.main_window.http_sender = self.http_sender
+        
         # Variables de estado
         self.is_acquiring = False
         self.is_recording = False
@@ -37,6 +66,7 @@ class EMGApplication(QObject):
     def setup_connections(self):
         # Conexiones del SerialHandler
         self.serial_handler.data_received.connect(self.process_data)
+        self.serial_handler.data_block_received.connect(self.process_block)
         self.serial_handler.connection_status.connect(self.update_connection_status)
         
         # Conexiones del DataLogger
@@ -45,6 +75,7 @@ class EMGApplication(QObject):
         # Conexiones del HTTPSender
         self.http_sender.transmission_status.connect(self.update_web_transmission_status)
         self.http_sender.clear_status.connect(self.main_window.log_message)
+        self.http_sender.delivery_status.connect(self.update_web_delivery_status)
         
         # Conexiones de la interfaz
         self.main_window.refresh_ports_btn.clicked.connect(self.refresh_ports)
@@ -52,6 +83,7 @@ class EMGApplication(QObject):
         self.main_window.start_btn.clicked.connect(self.start_acquisition)
         self.main_window.stop_btn.clicked.connect(self.stop_acquisition)
         self.main_window.record_btn.clicked.connect(self.toggle_recording)
+        self.main_window.export_csv_btn.clicked.connect(lambda: self.data_logger.export_csv())
         
         # Conexiones de transmisión web
         self.main_window.web_transmission_btn.clicked.connect(self.toggle_web_transmission)
@@ -71,20 +103,29 @@ class EMGApplication(QObject):
         self.main_window.highpass_freq.valueChanged.connect(self.update_filter_params)
         self.main_window.notch_freq.valueChanged.connect(self.update_filter_params)
         self.main_window.moving_avg_window.valueChanged.connect(self.update_filter_params)
+        
+        # Conexiones de características
+        self.main_window.feature_window.valueChanged.connect(self.update_feature_params)
+        self.main_window.feature_hop.valueChanged.connect(self.update_feature_params)
     
     def setup_initial_state(self):
         self.refresh_ports()
         self.main_window.show()
     
     def refresh_ports(self):
-        ports = SerialHandler.get_available_ports()
+        ports = self.serial_handler.get_available_ports()
         self.main_window.port_combo.clear()
         self.main_window.port_combo.addItems(ports)
     
     def toggle_connection(self):
         if not self.serial_handler.is_connected:
             port = self.main_window.port_combo.currentText()
-            if port and self.serial_handler.connect_serial(port):
+            protocol_map = {"Auto": 'auto', "Texto": 'text', "Binario": 'binary'}
+            self.serial_handler.protocol = protocol_map[self.main_window.protocol_combo.currentText()]
+            baudrate = int(self.main_window.baudrate_combo.currentText())
+            if port and self.serial_handler.connect_serial(port, baudrate):
+                if self.replay_path:
+                    self.signal_processor.set_sample_rate(self.serial_handler.sample_rate)
                 self.main_window.connect_btn.setText("Desconectar")
                 self.main_window.start_btn.setEnabled(True)
         else:
@@ -98,6 +139,15 @@ class EMGApplication(QObject):
         if self.serial_handler.is_connected:
             # Reiniciar referencia de tiempo cuando empiece la adquisición
             self.main_window.reset_time_reference()
+            self.main_window.set_sample_rate(self.signal_processor.sample_rate)
+            self.feature_extractor.configure(sample_rate=self.signal_processor.sample_rate)
+            self.spectral_analyzer.configure(sample_rate=self.signal_processor.sample_rate)
+            self.onset_detector.configure(sample_rate=self.signal_processor.sample_rate)
+            self.main_window.configure_spectrogram(self.spectral_analyzer.frequencies,
+                                                   self.spectral_analyzer.hop_seconds)
+            self.latency_tracer.reset()
+            if not self.replay_path:
+                self.serial_handler.sample_rate = self.signal_processor.sample_rate
             
             self.serial_handler.start_reading()
             self.is_acquiring = True
@@ -113,6 +163,14 @@ class EMGApplication(QObject):
             self.main_window.stop_btn.setEnabled(False)
             self.main_window.log_message("Adquisición detenida")
             
+            stats = self.serial_handler.get_stats()
+            if stats['malformed_lines']:
+                self.main_window.log_message(f"Líneas inválidas descartadas: {stats['malformed_lines']}")
+            if stats['corrupt_frames'] or stats['dropped_frames']:
+                self.main_window.log_message(
+                    f"Tramas corruptas: {stats['corrupt_frames']}, tramas perdidas: {stats['dropped_frames']}"
+                )
+            
             # Detener grabación si está activa
             if self.is_recording:
                 self.toggle_recording()
@@ -124,6 +182,20 @@ class EMGApplication(QObject):
             # Detener calibración si está activa
             if self.signal_processor.is_calibrating:
                 self.stop_calibration()
+            
+            self.save_latency_report()
+    
+    def save_latency_report(self):
+        """Guarda los histogramas de latencia de la sesión junto a las grabaciones"""
+        if not self.latency_tracer.summary():
+            return
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        path = os.path.join(self.data_logger.base_directory, f"latency_{timestamp}.json")
+        try:
+            self.latency_tracer.dump(path)
+            self.main_window.log_message(f"Latencias guardadas en: {path}")
+        except OSError as e:
+            self.main_window.log_message(f"Error al guardar latencias: {str(e)}")
     
     def start_calibration(self):
         """Inicia el proceso de calibración EMG"""
@@ -139,17 +211,32 @@ class EMGApplication(QObject):
             self.main_window.log_message(f"Iniciando calibración de {duration} segundos - manténgase en reposo")
     
     def stop_calibration(self):
-        """Detiene la calibración en curso"""
+        """Detiene la calibración en curso (o cierra la que el procesador completó solo)"""
         if self.signal_processor.is_calibrating:
             success, offset_mv = self.signal_processor.finish_calibration()
-            self.main_window.set_calibration_state(False)
-            self.main_window.set_calibration_result(success, offset_mv)
-            self.calibration_timer.stop()
-            
-            if success:
-                self.main_window.log_message(f"Calibración completada. Offset: {offset_mv:.1f}mV")
-            else:
-                self.main_window.log_message("Error en la calibración")
+        elif self.calibration_timer.isActive():
+            success, offset_mv = self.signal_processor.is_calibrated, self.signal_processor.baseline_offset_mv
+        else:
+            return
+        
+        self.main_window.set_calibration_state(False)
+        self.main_window.set_calibration_result(success, offset_mv)
+        self.calibration_timer.stop()
+        
+        if success:
+            offsets = ", ".join(f"{value:.1f}" for value in np.atleast_1d(offset_mv))
+            self.main_window.log_message(f"Calibración completada. Offset: {offsets}mV")
+            self.calibrate_onset_detector()
+        else:
+            self.main_window.log_message("Error en la calibración")
+    
+    def calibrate_onset_detector(self):
+        """Fija los umbrales de activación con el reposo medido durante la calibración"""
+        if self.onset_detector.calibrate(self.signal_processor.calibration_potentials()):
+            thresholds = ", ".join(f"{value:.1f}" for value in self.onset_detector.on_threshold)
+            self.main_window.log_message(
+                f"Detector de activación listo. Umbral: {thresholds}µV "
+                f"(demora máxima {self.onset_detector.max_latency_seconds * 1000:.0f} ms)")
     
     def update_calibration_progress(self):
         """Actualiza el progreso de calibración"""
@@ -159,10 +246,21 @@ class EMGApplication(QObject):
             
             if progress >= 1.0:
                 self.stop_calibration()
+        else:
+            # El procesador completó la calibración al reunir las muestras
+            self.stop_calibration()
     
     def toggle_recording(self):
         if not self.is_recording:
-            if self.data_logger.start_logging():
+            format_map = {"CSV": 'csv', "Binario": 'binary'}
+            if self.data_logger.start_logging(
+                num_channels=self.signal_processor.num_channels,
+                file_format=format_map[self.main_window.record_format_combo.currentText()],
+                metadata={**self.signal_processor.get_settings(),
+                          'features': self.feature_extractor.get_settings(),
+                          'spectrum': self.spectral_analyzer.get_settings(),
+                          'onset': self.onset_detector.get_settings()}
+            ):
                 self.is_recording = True
                 self.main_window.record_btn.setText("Detener Grabación")
                 self.main_window.record_status.setText("Grabando...")
@@ -191,6 +289,11 @@ class EMGApplication(QObject):
         self.main_window.web_transmission_status.setText(message)
         self.main_window.log_message(message)
     
+    def update_web_delivery_status(self, message):
+        # Los fallos de entrega no detienen la transmisión: los lotes quedan en el spool
+        self.main_window.web_transmission_status.setText(message)
+        self.main_window.log_message(message)
+    
     def process_data(self, raw_value):
         # Procesar con conversión EMG y filtros
         muscle_potential_uv = self.signal_processor.add_sample(raw_value)
@@ -208,6 +311,73 @@ class EMGApplication(QObject):
         if self.is_web_transmitting:
             voltage_mv = raw_value * self.signal_processor.ads_resolution
             self.http_sender.add_sample(voltage_mv, muscle_potential_uv)
+        
+        potentials = np.atleast_1d(muscle_potential_uv)[np.newaxis]
+        features = self.feature_extractor.process_block(potentials)
+        if features is not None:
+            self.process_features(features)
+        
+        spectrum = self.spectral_analyzer.process_block(potentials)
+        if spectrum is not None:
+            self.main_window.update_spectrum(spectrum)
+        
+        events = self.onset_detector.process_block(potentials)
+        if events:
+            self.process_events(events)
+    
+    def process_block(self, raw_values, timestamps=None):
+        """Procesa un bloque de muestras RAW y lo reparte a todos los consumidores"""
+        try:
+            self._process_block(raw_values, timestamps)
+        finally:
+            if self.replay_path:
+                # La reproducción a máxima velocidad emite el siguiente bloque recién ahora
+                self.serial_handler.block_consumed()
+    
+    def _process_block(self, raw_values, timestamps):
+        self.latency_tracer.record('dispatch', timestamps)
+        voltage_mv, muscle_potential_uv = self.signal_processor.process_block(raw_values)
+        self.latency_tracer.record('processing', timestamps)
+        
+        self.main_window.add_data_block(raw_values, muscle_potential_uv, timestamps)
+        
+        if self.is_recording:
+            self.data_logger.log_block(voltage_mv, muscle_potential_uv, timestamps)
+        
+        if self.is_web_transmitting:
+            self.http_sender.add_block(voltage_mv, muscle_potential_uv, timestamps)
+        
+        features = self.feature_extractor.process_block(muscle_potential_uv, timestamps)
+        if features is not None:
+            self.process_features(features)
+        
+        spectrum = self.spectral_analyzer.process_block(muscle_potential_uv, timestamps)
+        if spectrum is not None:
+            self.main_window.update_spectrum(spectrum)
+        
+        events = self.onset_detector.process_block(muscle_potential_uv, timestamps)
+        if events:
+            self.process_events(events)
+    
+    def process_events(self, events):
+        """Reparte eventos de activación (ActivationEvent) a los consumidores"""
+        self.main_window.add_activation_events(events)
+        
+        if self.is_recording:
+            self.data_logger.log_events(events)
+        
+        if self.is_web_transmitting:
+            self.http_sender.add_events(events)
+    
+    def process_features(self, features):
+        """Reparte un FeatureFrame (RMS, MAV, WL, ZC, SSC por ventana) a los consumidores"""
+        self.main_window.update_features(features)
+        
+        if self.is_recording:
+            self.data_logger.log_features(features)
+        
+        if self.is_web_transmitting:
+            self.http_sender.add_features(features)
     
     def update_connection_status(self, connected, message):
         self.main_window.connection_status.setText(message)
@@ -234,17 +404,38 @@ class EMGApplication(QObject):
         }
         self.signal_processor.set_filter_params(**params)
     
+    def update_feature_params(self):
+        self.feature_extractor.configure(
+            window_ms=self.main_window.feature_window.value(),
+            hop_ms=self.main_window.feature_hop.value()
+        )
+    
     def run(self):
         return self.main_window.show()
 
+def parse_arguments(argv):
+    parser = argparse.ArgumentParser(description="EMG Real-Time Monitor")
+    parser.add_argument('--replay', metavar='GRABACION',
+                        help="reproducir una grabación (.csv o .emgb) en lugar de leer el puerto serie")
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help="multiplicador de velocidad de la reproducción (0 = lo más rápido posible)")
+    parser.add_argument('--server', metavar='URL',
+                        help="URL base del receptor web (reciver.php, clear.php), por ejemplo http://localhost:8080/")
+    parser.add_argument('--in-flight', type=int, default=1, metavar='N',
+                        help="lotes enviados a la vez (más de 1 solo con IngestServer, que los reordena)")
+    # Los argumentos no reconocidos quedan para Qt
+    return parser.parse_known_args(argv[1:])[0]
+
 def main():
+    args = parse_arguments(sys.argv)
     app = QApplication(sys.argv)
     
     # Aplicar tema a la aplicación
     theme_manager = ThemeManager()
     theme_manager.apply_theme_to_application(app)
     
-    emg_app = EMGApplication()
+    emg_app = EMGApplication(replay_path=args.replay, replay_speed=args.speed, server_url=args.server,
+                             max_in_flight=max(1, args.in_flight))
     emg_app.run()
     sys.exit(app.exec())
 
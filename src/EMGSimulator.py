@@ -0,0 +1,270 @@
+"""
+Simulador de la placa EMG sobre un pseudo-terminal de Linux.
+
+Abre un par pty y escribe en él lo mismo que Codigo_EMG.ino (líneas de texto con
+un valor por canal, o tramas binarias tras el anuncio BINARY_HANDSHAKE), de modo
+que SerialHandler.connect_serial se conecta al esclavo sin cambios.
+
+La señal sintética tiene la línea de base de ~666 mV, activaciones musculares en
+ráfagas, interferencia de red de 50 Hz y ruido. Opcionalmente inyecta fallas:
+líneas basura, bloqueos temporales y desconexión.
+
+Uso:
+    python src/EMGSimulator.py --rate 2000 --channels 2 --garbage-rate 1
+"""
+
+import os
+import sys
+import time
+import tty
+import argparse
+import threading
+import numpy as np
+from scipy import signal
+from FrameProtocol import encode_frame, BINARY_HANDSHAKE
+
+ADS_RESOLUTION_MV = 0.1875  # mV por LSB, igual que SignalProcessor
+SAMPLES_PER_FRAME = 10      # Igual que el firmware en modo binario
+MAX_OUTPUT_BUFFER = 65536   # Bytes pendientes antes de descartar (desborde de la UART)
+BANNER = b"Iniciando ADS1115 con pines personalizados\r\nADS1115 inicializado correctamente!\r\n"
+GARBAGE_LINES = [b"ADS1115 error!", b"\x00\xff\xfe", b"66#2", b"1234,", b"nan?"]
+
+
+class EMGSimulator:
+    """Genera muestras EMG sintéticas y las escribe en un pty al ritmo de sample_rate"""
+
+    def __init__(self, sample_rate=1000, channels=1, protocol='text', seed=None,
+                 baseline_mv=666.0, mains_freq=50.0, mains_mv=2.0, noise_mv=0.3,
+                 burst_rate=0.5, burst_mv=(50.0, 400.0), burst_seconds=(0.3, 1.0),
+                 garbage_rate=0.0, stall_rate=0.0, stall_seconds=0.5, disconnect_after=None):
+        if protocol not in ('text', 'binary'):
+            raise ValueError(f"Protocolo desconocido: {protocol}")
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.protocol = protocol
+        self.rng = np.random.default_rng(seed)
+
+        # Modelo de señal (mV a la entrada del ADC)
+        self.baseline_mv = baseline_mv
+        self.mains_freq = mains_freq
+        self.mains_mv = mains_mv
+        self.noise_mv = noise_mv
+        self.burst_rate = burst_rate        # Ráfagas por segundo (proceso de Poisson)
+        self.burst_mv = burst_mv            # Amplitud mínima/máxima de una ráfaga
+        self.burst_seconds = burst_seconds  # Duración mínima/máxima de una ráfaga
+
+        # Inyección de fallas
+        self.garbage_rate = garbage_rate    # Líneas basura por segundo
+        self.stall_rate = stall_rate        # Bloqueos por segundo
+        self.stall_seconds = stall_seconds
+        self.disconnect_after = disconnect_after  # Segundos hasta cerrar el pty (None = nunca)
+
+        # Contenido de la actividad muscular: ruido filtrado 20-450 Hz con estado entre bloques
+        high = min(450.0, 0.45 * sample_rate)
+        self._burst_sos = signal.butter(4, [20.0, high], btype='bandpass', fs=sample_rate, output='sos')
+        self._burst_zi = np.zeros((self._burst_sos.shape[0], 2, channels))
+        self._bursts = []  # (inicio, fin, amplitud por canal) en índices de muestra
+        self._next_burst = self._draw_burst_start(0)
+
+        self.master_fd = None
+        self.slave_fd = None
+        self.port_name = None
+        self.is_running = False
+        self._thread = None
+        self._output = bytearray()
+        self._frame_seq = 0
+
+        # Estadísticas
+        self.samples_generated = 0
+        self.samples_sent = 0
+        self.dropped_samples = 0
+        self.garbage_lines = 0
+        self.stalls = 0
+        self.disconnected = False
+
+    # --- Modelo de señal ---
+
+    def _draw_burst_start(self, after):
+        if self.burst_rate <= 0:
+            return np.inf
+        return after + int(self.rng.exponential(1.0 / self.burst_rate) * self.sample_rate)
+
+    def generate(self, count):
+        """Devuelve las próximas count muestras como cuentas del ADC int16, forma (count, channels)"""
+        start = self.samples_generated
+        index = np.arange(start, start + count)
+        t = index / self.sample_rate
+
+        mv = np.empty((count, self.channels))
+        mv[:] = self.baseline_mv
+        mv += (0.5 * np.sin(2 * np.pi * 0.2 * t))[:, np.newaxis]  # Deriva lenta de la línea de base
+        mv += (self.mains_mv * np.sin(2 * np.pi * self.mains_freq * t))[:, np.newaxis]
+        mv += self.rng.normal(0.0, self.noise_mv, (count, self.channels))
+
+        # Programar las ráfagas que empiezan dentro del bloque
+        while self._next_burst < start + count:
+            length = int(self.rng.uniform(*self.burst_seconds) * self.sample_rate)
+            amplitude = self.rng.uniform(*self.burst_mv, self.channels)
+            self._bursts.append((self._next_burst, self._next_burst + length, amplitude))
+            self._next_burst = self._draw_burst_start(self._next_burst + length)
+
+        envelope = np.zeros((count, self.channels))
+        for burst_start, burst_end, amplitude in self._bursts:
+            lo, hi = max(burst_start, start), min(burst_end, start + count)
+            if lo < hi:
+                # Envolvente de Hann: subida y bajada suaves
+                phase = (np.arange(lo, hi) - burst_start) / (burst_end - burst_start)
+                envelope[lo - start:hi - start] += np.sin(np.pi * phase)[:, np.newaxis] * amplitude
+        self._bursts = [burst for burst in self._bursts if burst[1] > start + count]
+
+        carrier, self._burst_zi = signal.sosfilt(
+            self._burst_sos, self.rng.normal(0.0, 1.0, (count, self.channels)), axis=0, zi=self._burst_zi)
+        mv += envelope * carrier
+
+        self.samples_generated += count
+        return np.clip(np.round(mv / ADS_RESOLUTION_MV), -32768, 32767).astype(np.int16)
+
+    def encode(self, samples):
+        """Codifica muestras con el protocolo del firmware"""
+        if self.protocol == 'binary':
+            frames = []
+            for position in range(0, len(samples), SAMPLES_PER_FRAME):
+                frames.append(encode_frame(self._frame_seq, samples[position:position + SAMPLES_PER_FRAME],
+                                           self.channels))
+                self._frame_seq = (self._frame_seq + 1) & 0xFFFF
+            return b"".join(frames)
+
+        lines = "\r\n".join(",".join(map(str, row)) for row in samples.tolist())
+        return lines.encode('ascii') + b"\r\n"
+
+    # --- Pseudo-terminal ---
+
+    def open(self):
+        """Crea el pty; devuelve la ruta del esclavo para conectar SerialHandler"""
+        self.master_fd, self.slave_fd = os.openpty()
+        tty.setraw(self.slave_fd)
+        os.set_blocking(self.master_fd, False)
+        self.port_name = os.ttyname(self.slave_fd)
+        self.disconnected = False
+        return self.port_name
+
+    def close(self):
+        for fd in (self.master_fd, self.slave_fd):
+            if fd is not None:
+                os.close(fd)
+        self.master_fd = self.slave_fd = None
+
+    def start(self):
+        if self.master_fd is None:
+            self.open()
+        self.is_running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self.port_name
+
+    def stop(self):
+        self.is_running = False
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        self.close()
+
+    def _run(self):
+        """Escribe las muestras que corresponden según el reloj, con las fallas configuradas"""
+        self._queue_output(BANNER)
+        if self.protocol == 'binary':
+            self._queue_output(BINARY_HANDSHAKE + b"\r\n")
+
+        started = clock_start = last = time.time()
+        clock_base = self.samples_generated
+
+        while self.is_running:
+            time.sleep(0.002)
+            now = time.time()
+            elapsed = now - last
+            last = now
+
+            if self.disconnect_after is not None and now - started >= self.disconnect_after:
+                # Desconexión: el lector ve el cierre del pty
+                self.disconnected = True
+                self.is_running = False
+                self.close()
+                return
+
+            if self.stall_rate > 0 and self.rng.random() < self.stall_rate * elapsed:
+                # Bloqueo: no se envía nada y luego se sigue sin ponerse al día
+                self.stalls += 1
+                time.sleep(self.stall_seconds)
+                clock_start = last = time.time()
+                clock_base = self.samples_generated
+
+            due = clock_base + int((time.time() - clock_start) * self.sample_rate) - self.samples_generated
+            if due > 0:
+                samples = self.generate(due)
+                self._queue_output(self.encode(samples), len(samples))
+
+            if self.garbage_rate > 0 and self.rng.random() < self.garbage_rate * elapsed:
+                self.garbage_lines += 1
+                self._queue_output(GARBAGE_LINES[self.rng.integers(len(GARBAGE_LINES))] + b"\r\n")
+
+            self._flush_output()
+
+    def _queue_output(self, data, samples=0):
+        if len(self._output) + len(data) > MAX_OUTPUT_BUFFER:
+            # El lector no da abasto: se pierden datos como en una UART desbordada
+            self.dropped_samples += samples
+            return
+        self._output += data
+        self.samples_sent += samples
+
+    def _flush_output(self):
+        if not self._output:
+            return
+        try:
+            written = os.write(self.master_fd, self._output)
+            del self._output[:written]
+        except BlockingIOError:
+            pass
+
+    def get_stats(self):
+        return {
+            'samples_generated': self.samples_generated,
+            'samples_sent': self.samples_sent,
+            'dropped_samples': self.dropped_samples,
+            'garbage_lines': self.garbage_lines,
+            'stalls': self.stalls,
+            'disconnected': self.disconnected
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulador de la placa EMG sobre un pseudo-terminal")
+    parser.add_argument('--rate', type=int, default=1000, help="frecuencia de muestreo en Hz")
+    parser.add_argument('--channels', type=int, default=1)
+    parser.add_argument('--protocol', choices=['text', 'binary'], default='text')
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--garbage-rate', type=float, default=0.0, help="líneas basura por segundo")
+    parser.add_argument('--stall-rate', type=float, default=0.0, help="bloqueos por segundo")
+    parser.add_argument('--stall-seconds', type=float, default=0.5)
+    parser.add_argument('--disconnect-after', type=float, help="cerrar el puerto tras N segundos")
+    args = parser.parse_args()
+
+    simulator = EMGSimulator(
+        sample_rate=args.rate, channels=args.channels, protocol=args.protocol, seed=args.seed,
+        garbage_rate=args.garbage_rate, stall_rate=args.stall_rate, stall_seconds=args.stall_seconds,
+        disconnect_after=args.disconnect_after
+    )
+    port = simulator.start()
+    print(f"Simulador EMG en {port} ({args.rate} Hz, {args.channels} canal(es), {args.protocol})", flush=True)
+
+    try:
+        while simulator.is_running:
+            time.sleep(1.0)
+    except KeyboardInterrupt:
+        pass
+    simulator.stop()
+    print(f"Simulador detenido: {simulator.get_stats()}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+import time
+import numpy as np
+from collections import deque, namedtuple
+
+# Características por ventana: time (ventanas,) con la marca de la última muestra de la
+# ventana, y una columna por canal en cada característica (ventanas, canales)
+FEATURE_NAMES = ('rms', 'mav', 'wl', 'zc', 'ssc')
+FeatureFrame = namedtuple('FeatureFrame', ('time',) + FEATURE_NAMES)
+
+
+class FeatureExtractor:
+    """Características EMG en el dominio del tiempo sobre ventanas deslizantes.
+
+    Cada muestra aporta x², |x|, |Δx| y los indicadores de cruce por cero y cambio
+    de signo de pendiente a una suma acumulada; la suma de una ventana es la
+    diferencia entre la acumulada en su fin y en su inicio. Como las ventanas
+    empiezan siempre en múltiplos del salto, solo se guardan las acumuladas en
+    esos puntos: costo O(1) por muestra y memoria O(ventana / salto),
+    independientemente del largo de la ventana.
+    """
+
+    def __init__(self, sample_rate=100, num_channels=1, window_ms=250, hop_ms=50, threshold_uv=0.0):
+        self.sample_rate = sample_rate
+        self.num_channels = num_channels
+        self.window_ms = window_ms
+        self.hop_ms = hop_ms
+        self.threshold_uv = threshold_uv  # Amplitud mínima para contar cruces por cero y cambios de pendiente
+        self.reset()
+
+    def configure(self, sample_rate=None, window_ms=None, hop_ms=None, threshold_uv=None):
+        """Cambia parámetros; las ventanas en curso se descartan"""
+        if sample_rate is not None:
+            self.sample_rate = sample_rate
+        if window_ms is not None:
+            self.window_ms = window_ms
+        if hop_ms is not None:
+            self.hop_ms = hop_ms
+        if threshold_uv is not None:
+            self.threshold_uv = threshold_uv
+        self.reset()
+
+    def reset(self):
+        self.window = max(1, int(round(self.window_ms * self.sample_rate / 1000)))
+        self.hop = max(1, int(round(self.hop_ms * self.sample_rate / 1000)))
+        self.sample_count = 0  # Índice global de la próxima muestra
+        self._running = np.zeros((len(FEATURE_NAMES), self.num_channels))  # Suma acumulada de cada aporte
+        self._last = np.zeros((2, self.num_channels))  # Dos últimas muestras, para diferencias
+        # Acumuladas en los inicios de ventana (índice de la muestra previa al inicio, valor)
+        self._starts = deque([(-1, np.zeros_like(self._running))])
+
+    def process_block(self, values, timestamps=None):
+        """Agrega un bloque (muestras,) o (muestras, canales); devuelve un FeatureFrame o None"""
+        count = len(values)
+        if count == 0:
+            return None
+        x = np.asarray(values, dtype=float).reshape(count, -1)
+        if x.shape[1] != self.num_channels:
+            self.num_channels = x.shape[1]
+            self.reset()
+        if timestamps is None:
+            timestamps = np.full(count, time.time())
+
+        # Aportes por muestra: x², |x|, |Δx|, cruce por cero, cambio de signo de pendiente
+        previous = np.concatenate((self._last, x))
+        delta = np.diff(previous, axis=0)  # delta[i + 1] = x[i] - x[i - 1]
+        first = self.sample_count
+        index = np.arange(first, first + count)
+        has_one = (index >= 1)[:, np.newaxis]  # Con muestra anterior
+        has_two = (index >= 2)[:, np.newaxis]  # Con dos muestras anteriores
+        step = np.abs(delta[1:])
+
+        contributions = np.empty((count, len(FEATURE_NAMES), self.num_channels))
+        contributions[:, 0] = x * x
+        contributions[:, 1] = np.abs(x)
+        contributions[:, 2] = np.where(has_one, step, 0.0)
+        contributions[:, 3] = has_one & (previous[2:] * previous[1:-1] < 0) & (step >= self.threshold_uv)
+        # El cambio de pendiente se detecta en la muestra anterior y se cuenta al llegar esta
+        turn = -delta[:-1] * delta[1:]
+        contributions[:, 4] = has_two & (turn > 0) & (turn >= self.threshold_uv ** 2)
+
+        cumulative = self._running + np.cumsum(contributions, axis=0)
+        self._running = cumulative[-1]
+        self._last = previous[-2:]
+        self.sample_count += count
+
+        # Guardar las acumuladas que serán inicio de ventana (índice múltiplo del salto - 1)
+        for position in np.flatnonzero((index + 1) % self.hop == 0):
+            self._starts.append((int(index[position]), cumulative[position]))
+
+        # Ventanas que terminan en este bloque: fin en window - 1 + k * hop
+        ends = np.flatnonzero((index >= self.window - 1) & ((index - (self.window - 1)) % self.hop == 0))
+        if len(ends) == 0:
+            self._trim_starts()
+            return None
+
+        sums = np.empty((len(ends),) + self._running.shape)
+        for row, position in enumerate(ends):
+            start = int(index[position]) - self.window
+            while self._starts[0][0] < start:
+                self._starts.popleft()
+            sums[row] = cumulative[position] - self._starts[0][1]
+        self._trim_starts()
+
+        return FeatureFrame(
+            time=np.asarray(timestamps, dtype=float)[ends],
+            rms=np.sqrt(np.maximum(sums[:, 0], 0.0) / self.window),
+            mav=sums[:, 1] / self.window,
+            wl=sums[:, 2],
+            zc=np.round(sums[:, 3]),
+            ssc=np.round(sums[:, 4])
+        )
+
+    def _trim_starts(self):
+        """Descarta inicios que ya no usará ninguna ventana futura"""
+        while self._starts[0][0] < self.sample_count - self.window:
+            self._starts.popleft()
+
+    def get_settings(self):
+        return {
+            'window_ms': self.window_ms,
+            'hop_ms': self.hop_ms,
+            'threshold_uv': self.threshold_uv
+        }
@@ -0,0 +1,133 @@
+"""
+Protocolo binario de tramas para el enlace serie EMG.
+
+Formato de cada trama (little-endian):
+    sync      uint16   0x5AA5 (bytes A5 5A en el cable)
+    seq       uint16   contador de secuencia, módulo 65536
+    channels  uint8    canales por muestra
+    count     uint8    muestras por canal
+    payload   int16[count * channels], intercalado por muestra
+    checksum  uint16   suma de los bytes desde seq hasta el final del payload, módulo 65536
+
+El firmware anuncia el modo binario enviando la línea de texto BINARY_HANDSHAKE
+antes de la primera trama.
+"""
+
+import struct
+import numpy as np
+
+SYNC_WORD = 0x5AA5
+SYNC_BYTES = struct.pack('<H', SYNC_WORD)
+HEADER = struct.Struct('<HHBB')
+CHECKSUM = struct.Struct('<H')
+BINARY_HANDSHAKE = b"#EMG:BIN1"
+
+# Un salto de secuencia mayor que esto se interpreta como reinicio del dispositivo
+MAX_SEQUENCE_GAP = 0x8000
+
+
+def frame_checksum(data):
+    """Suma de bytes módulo 65536"""
+    return int(np.frombuffer(data, dtype=np.uint8).sum(dtype=np.uint32)) & 0xFFFF
+
+
+def encode_frame(seq, samples, channels=1):
+    """Codifica muestras int16 en una trama; samples puede ser (count,) o (count, channels)"""
+    payload = np.ascontiguousarray(samples, dtype='<i2').tobytes()
+    count = len(payload) // (2 * channels)
+    if count == 0 or count > 255 or count * channels * 2 != len(payload):
+        raise ValueError(f"Cantidad de muestras inválida para una trama: {len(payload) // 2}")
+
+    header = HEADER.pack(SYNC_WORD, seq & 0xFFFF, channels, count)
+    return header + payload + CHECKSUM.pack(frame_checksum(header[2:] + payload))
+
+
+class FrameDecoder:
+    """Decodificador incremental de tramas con resincronización y contadores de errores"""
+
+    def __init__(self):
+        self._remainder = b""
+        self._expected_seq = None
+        self.frames_decoded = 0
+        self.corrupt_frames = 0
+        self.dropped_frames = 0   # Tramas perdidas según huecos en la secuencia
+        self.resync_bytes = 0     # Bytes descartados buscando la palabra de sincronía
+
+    def reset(self):
+        self._remainder = b""
+        self._expected_seq = None
+
+    def feed(self, chunk):
+        """Procesa bytes recibidos y devuelve un array (muestras, canales) con las tramas completas"""
+        data = self._remainder + bytes(chunk)
+        frames = []
+        position = 0
+
+        while True:
+            start = data.find(SYNC_BYTES, position)
+            if start < 0:
+                # Conservar el último byte por si es la mitad de la palabra de sincronía
+                keep_from = max(position, len(data) - 1)
+                self.resync_bytes += keep_from - position
+                position = keep_from
+                break
+
+            self.resync_bytes += start - position
+            if len(data) - start < HEADER.size:
+                position = start
+                break
+
+            _, seq, channels, count = HEADER.unpack_from(data, start)
+            if channels == 0 or count == 0:
+                self.corrupt_frames += 1
+                position = start + 1
+                continue
+
+            payload_start = start + HEADER.size
+            payload_end = payload_start + 2 * channels * count
+            if len(data) < payload_end + CHECKSUM.size:
+                position = start
+                break
+
+            (expected,) = CHECKSUM.unpack_from(data, payload_end)
+            if frame_checksum(data[start + 2:payload_end]) != expected:
+                # Sincronía falsa o trama dañada: seguir buscando desde el byte siguiente
+                self.corrupt_frames += 1
+                position = start + 1
+                continue
+
+            self._track_sequence(seq)
+            # Vista sin copia sobre los bytes recibidos
+            frames.append(
+                np.frombuffer(data, dtype='<i2', count=channels * count, offset=payload_start)
+                .reshape(count, channels)
+            )
+            position = payload_end + CHECKSUM.size
+
+        self._remainder = data[position:]
+        self.frames_decoded += len(frames)
+
+        if not frames:
+            return np.empty((0, 1), dtype=np.int16)
+        if len(frames) == 1:
+            return frames[0]
+        if len({frame.shape[1] for frame in frames}) > 1:
+            # Cambio de cantidad de canales dentro del chunk: quedarse con la configuración más reciente
+            channels = frames[-1].shape[1]
+            frames = [frame for frame in frames if frame.shape[1] == channels]
+        return np.concatenate(frames)
+
+    def _track_sequence(self, seq):
+        if self._expected_seq is not None:
+            gap = (seq - self._expected_seq) & 0xFFFF
+            if gap < MAX_SEQUENCE_GAP:
+                self.dropped_frames += gap
+        self._expected_seq = (seq + 1) & 0xFFFF
+
+    def get_stats(self):
+        return {
+            'frames_decoded': self.frames_decoded,
+            'corrupt_frames': self.corrupt_frames,
+            'dropped_frames': self.dropped_frames,
+            'resync_bytes': self.resync_bytes
+        }
@@ -1,31 +1,103 @@
 import requests
-import json
 import time
 import threading
-from queue import Queue
+import uuid
+import numpy as np
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from queue import Queue, Empty
 from PySide6.QtCore import QObject, Signal, QTimer
 from datetime import datetime
+from requests.adapters import HTTPAdapter
+from FeatureExtractor import FEATURE_NAMES
+from BatchCodec import columnar_batch, samples_batch, encode_batch, batch_headers
+from BatchSpool import BatchSpool
+from BatchIntervalController import BatchIntervalController
+
+# Lote codificado a la espera de entrega en memoria (times_ms para medir la latencia de red)
+PendingBatch = namedtuple('PendingBatch', ['batch_id', 'body', 'created', 'times_ms'])
+
+# Respuestas 4xx que indican un problema transitorio: se reintentan como los errores de red
+RETRYABLE_STATUS = (408, 429)
 
 class HTTPSender(QObject):
     transmission_status = Signal(bool, str)
+    delivery_status = Signal(str)  # Receptor caído / recuperado, lotes rechazados (la transmisión sigue)
     clear_status = Signal(str)
     
-    def __init__(self, receiver_url="https://tmeduca.org/emg/reciver.php", clear_url="https://tmeduca.org/emg/clear.php"):
+    def __init__(self, receiver_url="https://tmeduca.org/emg/reciver.php", clear_url="https://tmeduca.org/emg/clear.php",
+                 payload_format="columnar", compress=True, spool_directory=None, max_queued_batches=50,
+                 max_memory_batches=10, initial_backoff=0.5, max_backoff=30.0, max_in_flight=1,
+                 adaptive_interval=True):
         super().__init__()
         self.receiver_url = receiver_url
         self.clear_url = clear_url
+        self.payload_format = payload_format  # 'columnar' (BatchCodec) o 'samples' (un objeto por muestra)
+        self.compress = compress              # Cuerpo gzip con Content-Encoding
         self.is_transmitting = False
-        self.data_buffer = []
+        self.data_buffer = []     # Bloques (tiempos ms, raw, filtrado); se arman como lote en el hilo HTTP
+        self.feature_buffer = []  # Características por ventana (FeatureExtractor) para el próximo lote
+        self.event_buffer = []    # Eventos de activación (OnsetDetector) para el próximo lote
         self.session_start_time = None
         
-        # Queue para peticiones HTTP
+        # LatencyTracer opcional: latencia llegada -> respuesta del servidor
+        self.latency_tracer = None
+        
+        # Sesión persistente: reutiliza las conexiones TCP/TLS entre lotes (keep-alive),
+        # una por petición en vuelo. Más de una en vuelo solo con receptores que aceptan
+        # escrituras concurrentes y reordenan por batch_id (IngestServer)
+        self.max_in_flight = max_in_flight
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=max_in_flight)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        
+        # Estadísticas de envío
+        self.batches_sent = 0
+        self.wire_bytes = 0   # Bytes de cuerpo enviados (comprimidos si corresponde)
+        self.last_batch_ms = None
+        self.dropped_batches = 0   # Descartados por cola llena (o sin spool, por exceso en memoria)
+        self.rejected_batches = 0  # Rechazados por el receptor (4xx): no se reintentan
+        
+        # Identificadores de lote únicos e idempotentes: el receptor ignora los repetidos
+        self.sender_id = uuid.uuid4().hex[:8]
+        self._sequence = 0
+        
+        # Entrega en orden: primero el spool en disco, luego los pendientes en memoria.
+        # Tras un fallo (o si la memoria se llena) todo lo pendiente pasa al spool, y
+        # mientras el spool no se vacíe los lotes nuevos se agregan detrás
+        self.spool = BatchSpool(spool_directory) if spool_directory else None
+        self.max_memory_batches = max_memory_batches
+        self._pending = deque()
+        self.initial_backoff = initial_backoff  # Segundos antes del primer reintento; se duplica en cada fallo
+        self.max_backoff = max_backoff
+        self._failures = 0
+        self._retry_at = 0.0  # time.monotonic() del próximo intento
+        
+        # Hasta max_in_flight lotes se envían a la vez desde un pool de hilos; las respuestas
+        # pueden llegar en cualquier orden, pero un lote solo se quita de la cola (y del
+        # spool) cuando él y todos los anteriores fueron confirmados
+        self._in_flight = set()  # batch_id enviados sin respuesta todavía
+        self._acked = set()      # batch_id confirmados detrás de uno sin confirmar
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="http-upload")
+        
+        # Queue para peticiones HTTP y respuestas de los envíos; los lotes se limitan a
+        # max_queued_batches (50 lotes = 10 s de margen con el despachador atrasado)
         self.http_queue = Queue()
+        self.max_queued_batches = max_queued_batches
+        self._queued_batches = 0
+        self._queued_lock = threading.Lock()
         
-        # Hilo de trabajo para HTTP
+        # Hilo despachador HTTP
         self.http_thread = None
         self.http_thread_running = False
         
-        # Timer para envío de lotes cada 0.2 segundos (en hilo principal, pero no-bloqueante)
+        # Intervalo de lote: 200 ms, o adaptado al RTT y al rendimiento del receptor
+        self.adaptive_interval = adaptive_interval
+        self.interval_controller = BatchIntervalController(max_in_flight=max_in_flight)
+        self.batch_interval_ms = self.interval_controller.interval_ms
+        
+        # Timer para envío de lotes (en hilo principal, pero no-bloqueante)
         self.batch_timer = QTimer()
         self.batch_timer.timeout.connect(self._queue_batch_send)
         
@@ -40,22 +112,53 @@ class HTTPSender(QObject):
             self.http_thread.start()
     
     def _http_worker(self):
-        """Worker thread que procesa peticiones HTTP de forma continua"""
+        """Despachador: atiende peticiones y respuestas, y mantiene hasta max_in_flight lotes en vuelo"""
         while self.http_thread_running:
+            # Con lotes por enviar y lugar libre solo se espera hasta el próximo reintento
+            if self._unsent_count() > 0 and len(self._in_flight) < self.max_in_flight:
+                timeout = max(0.0, self._retry_at - time.monotonic())
+            else:
+                timeout = 1.0
+            self._drain_requests(timeout)
+            
+            try:
+                self._launch_uploads()
+            except Exception as e:
+                self.delivery_status.emit(f"Error: {str(e)}")
+    
+    def _drain_requests(self, timeout):
+        """Procesa todas las peticiones encoladas, esperando la primera hasta timeout segundos"""
+        try:
+            request = self.http_queue.get(timeout=timeout)
+        except Empty:
+            return
+        
+        while True:
             try:
-                # Obtener próxima petición con timeout
-                request = self.http_queue.get(timeout=1.0)
-                
                 if request['type'] == 'batch':
-                    self._send_batch_http(request['data'])
+                    with self._queued_lock:
+                        self._queued_batches -= 1
+                    self._enqueue_batch(request['data'])
+                elif request['type'] == 'ack':
+                    self._handle_ack(request)
                 elif request['type'] == 'clear':
-                    self._clear_server_http()
-                    
+                    self._executor.submit(self._clear_server_http)
+            except Exception as e:
+                self.delivery_status.emit(f"Error: {str(e)}")
+            finally:
                 self.http_queue.task_done()
-                
-            except:
-                # Timeout o queue vacía, continuar
-                continue
+            
+            try:
+                request = self.http_queue.get_nowait()
+            except Empty:
+                return
+    
+    def _unacked_count(self):
+        """Lotes armados todavía sin confirmar (spool + memoria)"""
+        return len(self._pending) + (len(self.spool) if self.spool is not None else 0)
+    
+    def _unsent_count(self):
+        return self._unacked_count() - len(self._in_flight) - len(self._acked)
     
     def start_transmission(self):
         """Inicia la transmisión de datos - NO BLOQUEANTE"""
@@ -63,7 +166,11 @@ class HTTPSender(QObject):
             self.is_transmitting = True
             self.session_start_time = time.time() * 1000  # Tiempo en ms
             self.data_buffer.clear()
-            self.batch_timer.start(200)  # 200ms = 0.2 segundos
+            self.feature_buffer.clear()
+            self.event_buffer.clear()
+            self.interval_controller.reset()
+            self.batch_interval_ms = self.interval_controller.interval_ms
+            self.batch_timer.start(self.batch_interval_ms)  # 200 ms al empezar
             self.transmission_status.emit(True, "Transmisión web iniciada")
             return True
         return False
@@ -87,55 +194,252 @@ class HTTPSender(QObject):
         if not self.is_transmitting or self.session_start_time is None:
             return
             
-        current_time = time.time() * 1000
-        relative_time = current_time - self.session_start_time
+        relative_time = time.time() * 1000 - self.session_start_time
+        self.data_buffer.append((relative_time, raw_value, filtered_value))
+    
+    def add_block(self, raw_values, filtered_values, timestamps=None):
+        """Agrega un bloque de muestras al buffer para envío en lote"""
+        if not self.is_transmitting or self.session_start_time is None:
+            return
         
-        sample = {
-            "time_ms": round(relative_time, 1),
-            "raw": raw_value,
-            "filtered": round(filtered_value, 1)
-        }
+        count = len(raw_values)
+        if count == 0:
+            return
+        if timestamps is None:
+            relative_times = np.full(count, time.time() * 1000 - self.session_start_time)
+        else:
+            relative_times = np.asarray(timestamps, dtype=float) * 1000 - self.session_start_time
         
-        self.data_buffer.append(sample)
+        # Se guardan los arrays tal cual: la conversión a JSON ocurre en el hilo HTTP
+        self.data_buffer.append((
+            relative_times,
+            np.array(raw_values, dtype=float).reshape(count, -1),
+            np.array(filtered_values, dtype=float).reshape(count, -1)
+        ))
+    
+    def add_features(self, features):
+        """Agrega un FeatureFrame al próximo lote, con un valor por canal en cada característica"""
+        if not self.is_transmitting or self.session_start_time is None:
+            return
+        
+        relative_times = (features.time * 1000 - self.session_start_time).tolist()
+        columns = [np.round(getattr(features, name), 2).tolist() for name in FEATURE_NAMES]
+        self.feature_buffer.extend(
+            {"time_ms": round(t_ms, 1), **dict(zip(FEATURE_NAMES, values))}
+            for t_ms, *values in zip(relative_times, *columns)
+        )
+    
+    def add_events(self, events):
+        """Agrega eventos de activación al próximo lote (se envían aunque no haya muestras nuevas)"""
+        if not self.is_transmitting or self.session_start_time is None:
+            return
+        
+        self.event_buffer.extend(
+            {
+                "time_ms": round(event.time * 1000 - self.session_start_time, 1),
+                "detected_ms": round(event.detected_at * 1000 - self.session_start_time, 1),
+                "channel": event.channel,
+                "event": event.kind,
+                "envelope_uv": round(event.envelope_uv, 1),
+                "threshold_uv": round(event.threshold_uv, 1)
+            }
+            for event in events
+        )
     
     def _queue_batch_send(self):
         """Encola el envío del lote actual - NO BLOQUEANTE"""
-        if not self.data_buffer:
+        if not self.data_buffer and not self.event_buffer:
             return
         
-        # Preparar datos del lote
+        # Preparar datos del lote (las muestras se serializan en el hilo HTTP)
         batch_data = {
             "timestamp": datetime.now().isoformat(),
             "batch_time_ms": time.time() * 1000,
-            "samples": self.data_buffer.copy()
+            "blocks": self.data_buffer.copy()
         }
         
+        if self.feature_buffer:
+            batch_data["features"] = self.feature_buffer.copy()
+            self.feature_buffer.clear()
+        if self.event_buffer:
+            batch_data["events"] = self.event_buffer.copy()
+            self.event_buffer.clear()
+        
         # Limpiar buffer después de copiar
         self.data_buffer.clear()
         
-        # Encolar para envío en hilo HTTP
+        # Encolar para envío en hilo HTTP; si el despachador está muy atrasado el lote se descarta
+        with self._queued_lock:
+            if self._queued_batches >= self.max_queued_batches:
+                self.dropped_batches += 1
+                return
+            self._queued_batches += 1
         self.http_queue.put({
             'type': 'batch',
             'data': batch_data
         })
+        
+        # Intervalo decidido por el controlador en el hilo despachador
+        if self.batch_timer.isActive() and self.batch_timer.interval() != self.batch_interval_ms:
+            self.batch_timer.setInterval(self.batch_interval_ms)
+    
+    def _join_blocks(self, blocks):
+        """Une los bloques de add_block / add_sample en columnas (tiempos, raw, filtrado)"""
+        if not blocks:
+            return np.zeros(0), np.zeros((0, 1)), np.zeros((0, 1))
+        times = [np.asarray(block[0], dtype=float).reshape(-1) for block in blocks]
+        counts = [len(block_times) for block_times in times]
+        raw = [np.asarray(block[1], dtype=float).reshape(count, -1) for block, count in zip(blocks, counts)]
+        filtered = [np.asarray(block[2], dtype=float).reshape(count, -1) for block, count in zip(blocks, counts)]
+        if len({values.shape[1] for values in raw}) > 1:
+            # Cambió la cantidad de canales dentro del lote: se envían solo los bloques del último formato
+            channels = raw[-1].shape[1]
+            keep = [i for i, values in enumerate(raw) if values.shape[1] == channels]
+            times, raw, filtered = ([column[i] for i in keep] for column in (times, raw, filtered))
+        return np.concatenate(times), np.concatenate(raw), np.concatenate(filtered)
+    
+    def _build_payload(self, batch_data):
+        """Arma el lote en el formato configurado; devuelve (lote, tiempos ms de sus muestras)"""
+        extra = {key: value for key, value in batch_data.items() if key != "blocks"}
+        times_ms, raw, filtered = self._join_blocks(batch_data["blocks"])
+        if self.payload_format == "columnar":
+            return columnar_batch(times_ms, raw, filtered, **extra), times_ms
+        return samples_batch(times_ms, raw, filtered, **extra), times_ms
+    
+    def _enqueue_batch(self, batch_data):
+        """Codifica el lote con un identificador nuevo y lo deja pendiente - EJECUTA EN HILO HTTP"""
+        self._sequence += 1
+        batch_id = f"{self.sender_id}-{self._sequence}"
+        payload, times_ms = self._build_payload({"batch_id": batch_id, **batch_data})
+        body, _ = encode_batch(payload, compress=self.compress)
+        self.interval_controller.record_batch(len(body))
+        
+        if self.spool is not None and len(self.spool) > 0:
+            self._spool_append(batch_id, body)
+            return
+        
+        self._pending.append(PendingBatch(batch_id, body, time.time(), times_ms))
+        if len(self._pending) > self.max_memory_batches:
+            if self.spool is not None:
+                self._spill()
+            else:
+                dropped = self._pending.popleft()
+                self._in_flight.discard(dropped.batch_id)  # Su respuesta se ignorará
+                self._acked.discard(dropped.batch_id)
+                self.dropped_batches += 1
+    
+    def _spill(self):
+        """Pasa al spool todos los lotes pendientes en memoria, en orden"""
+        if self.spool is None:
+            return
+        while self._pending:
+            batch = self._pending[0]
+            self._spool_append(batch.batch_id, batch.body, created=batch.created)
+            self._pending.popleft()
+    
+    def _spool_append(self, batch_id, body, created=None):
+        """Guarda un lote en el spool y olvida los que este descarte por tamaño"""
+        for dropped_id in self.spool.append(batch_id, body, compressed=self.compress, created=created):
+            self._in_flight.discard(dropped_id)  # Su respuesta se ignorará
+            self._acked.discard(dropped_id)
+    
+    def _unacked_batches(self):
+        """Lotes sin confirmar en orden de entrega: (batch_id, función que devuelve cuerpo, comprimido y tiempos)"""
+        if self.spool is not None:
+            for position in range(len(self.spool)):
+                yield self.spool.batch_id(position), lambda position=position: self._spooled(position)
+        for batch in list(self._pending):
+            yield batch.batch_id, lambda batch=batch: (batch.body, self.compress, batch.times_ms)
+    
+    def _spooled(self, position):
+        spooled = self.spool.peek(position)
+        return spooled.body, spooled.compressed, None
+    
+    def _launch_uploads(self):
+        """Envía los lotes más antiguos que no están en vuelo ni confirmados, hasta llenar la ventana"""
+        if time.monotonic() < self._retry_at:
+            return
+        for batch_id, load in self._unacked_batches():
+            if len(self._in_flight) >= self.max_in_flight:
+                break
+            if batch_id in self._in_flight or batch_id in self._acked:
+                continue
+            body, compressed, times_ms = load()
+            self._in_flight.add(batch_id)
+            self._executor.submit(self._upload, batch_id, body, compressed, times_ms)
+    
+    def _upload(self, batch_id, body, compressed, times_ms):
+        """Envía un lote y devuelve el resultado al despachador - EJECUTA EN EL POOL HTTP"""
+        start = time.perf_counter()
+        status = self._send_batch_http(body, compressed)
+        self.http_queue.put({
+            'type': 'ack',
+            'batch_id': batch_id,
+            'status': status,
+            'rtt': time.perf_counter() - start,
+            'bytes': len(body),
+            'times_ms': times_ms
+        })
+    
+    def _handle_ack(self, ack):
+        """Procesa la respuesta de un envío; si falló, programa el reintento - EJECUTA EN HILO HTTP"""
+        batch_id, status = ack['batch_id'], ack['status']
+        if batch_id not in self._in_flight:
+            return  # Descartado mientras estaba en vuelo
+        self._in_flight.discard(batch_id)
+        
+        if status is None or status >= 500 or status in RETRYABLE_STATUS:
+            self._failures += 1
+            backoff = min(self.max_backoff, self.initial_backoff * 2 ** (self._failures - 1))
+            self._retry_at = time.monotonic() + backoff
+            self._spill()  # Hasta que el receptor vuelva, todo se guarda en disco
+            if self._failures == 1:
+                reason = "sin conexión" if status is None else f"HTTP {status}"
+                self.delivery_status.emit(f"Receptor no disponible ({reason}): reintentando")
+            return
+        
+        if status == 200:
+            self.batches_sent += 1
+            self.wire_bytes += ack['bytes']
+            self.last_batch_ms = ack['rtt'] * 1000
+            self.interval_controller.record_ack(ack['rtt'], ack['bytes'])
+            if ack['times_ms'] is not None and self.latency_tracer is not None and self.session_start_time is not None:
+                self.latency_tracer.record('network', (ack['times_ms'] + self.session_start_time) / 1000)
+        else:
+            self.rejected_batches += 1
+            self.delivery_status.emit(f"Lote rechazado por el receptor: HTTP {status}")
+        
+        self._acked.add(batch_id)
+        self._pop_acked()
+        if self.adaptive_interval:
+            self.batch_interval_ms = self.interval_controller.update(self._unsent_count())
+        
+        if self._failures:
+            self._failures = 0
+            self._retry_at = 0.0
+            self.delivery_status.emit("Receptor disponible: reenviando lotes pendientes")
     
-    def _send_batch_http(self, batch_data):
-        """Envía el lote al servidor - EJECUTA EN HILO HTTP"""
+    def _pop_acked(self):
+        """Quita de la cola los lotes confirmados que ya no tienen ninguno anterior pendiente"""
+        while True:
+            if self.spool is not None and len(self.spool) > 0:
+                head = self.spool.batch_id()
+                if head not in self._acked:
+                    break
+                self.spool.pop()
+            elif self._pending and self._pending[0].batch_id in self._acked:
+                head = self._pending.popleft().batch_id
+            else:
+                break
+            self._acked.discard(head)
+    
+    def _send_batch_http(self, body, compressed):
+        """Envía un lote codificado; devuelve el código HTTP o None si no hubo respuesta - EJECUTA EN EL POOL HTTP"""
         try:
-            response = requests.post(
-                self.receiver_url,
-                json=batch_data,
-                timeout=5,
-                headers={'Content-Type': 'application/json'}
-            )
-            
-            if response.status_code != 200:
-                self.transmission_status.emit(False, f"Error HTTP: {response.status_code}")
-                
-        except requests.exceptions.RequestException as e:
-            self.transmission_status.emit(False, f"Error de conexión: {str(e)}")
-        except Exception as e:
-            self.transmission_status.emit(False, f"Error: {str(e)}")
+            response = self.session.post(self.receiver_url, data=body, headers=batch_headers(compressed), timeout=5)
+        except requests.exceptions.RequestException:
+            return None
+        return response.status_code
     
     def clear_server_data(self):
         """Encola petición para limpiar datos del servidor - NO BLOQUEANTE"""
@@ -144,7 +448,7 @@ class HTTPSender(QObject):
     def _clear_server_http(self):
         """Ejecuta la limpieza del servidor - EJECUTA EN HILO HTTP"""
         try:
-            response = requests.post(
+            response = self.session.post(
                 self.clear_url,
                 timeout=5,
                 headers={'Content-Type': 'application/json'}
@@ -160,8 +464,57 @@ class HTTPSender(QObject):
         except Exception as e:
             self.clear_status.emit(f"Error al borrar: {str(e)}")
     
+    def get_stats(self):
+        """Lotes enviados, bytes en el cable, demora de la última petición y estado de la cola de reenvío"""
+        try:
+            oldest = self._pending[0].created if self._pending else None
+        except IndexError:
+            oldest = None  # El hilo HTTP lo entregó mientras se leía
+        spool_age = self.spool.oldest_age() if self.spool is not None else None
+        if spool_age is not None:
+            oldest = time.time() - spool_age
+        
+        return {
+            'batches_sent': self.batches_sent,
+            'wire_bytes': self.wire_bytes,
+            'last_batch_ms': self.last_batch_ms,
+            'payload_format': self.payload_format,
+            'compress': self.compress,
+            'queued_batches': len(self._pending) + self._queued_batches,
+            'in_flight': len(self._in_flight),
+            'batch_interval_ms': self.batch_interval_ms,
+            'rtt_ms': None if self.interval_controller.rtt is None else self.interval_controller.rtt * 1000,
+            'spooled_batches': len(self.spool) if self.spool is not None else 0,
+            'spool_bytes': self.spool.bytes if self.spool is not None else 0,
+            'oldest_unsent_s': None if oldest is None else time.time() - oldest,
+            'dropped_batches': self.dropped_batches + (self.spool.dropped_batches if self.spool is not None else 0),
+            'rejected_batches': self.rejected_batches,
+            'retry_in_s': max(0.0, self._retry_at - time.monotonic()) if self._failures else None
+        }
+    
+    def format_status(self):
+        """Resumen de una línea para el panel de transmisión"""
+        stats = self.get_stats()
+        text = (f"Enviados: {stats['batches_sent']} · En vuelo: {stats['in_flight']} · "
+                f"En cola: {stats['queued_batches']} · Lote cada {stats['batch_interval_ms']} ms")
+        if stats['rtt_ms'] is not None:
+            text += f" · RTT {stats['rtt_ms']:.0f} ms"
+        if stats['spooled_batches']:
+            text += f" · En disco: {stats['spooled_batches']} ({stats['spool_bytes'] / 1024:.0f} kB)"
+        if stats['oldest_unsent_s'] is not None:
+            text += f" · Más antiguo: {stats['oldest_unsent_s']:.0f} s"
+        if stats['dropped_batches'] or stats['rejected_batches']:
+            text += f" · Descartados: {stats['dropped_batches']} · Rechazados: {stats['rejected_batches']}"
+        if stats['retry_in_s'] is not None:
+            text += f" · Reintento en {stats['retry_in_s']:.0f} s"
+        return text
+    
     def __del__(self):
         """Cleanup al destruir el objeto"""
         self.http_thread_running = False
         if self.http_thread:
-            self.http_thread.join(timeout=1.0)
\ No newline at end of file
+            self.http_thread.join(timeout=1.0)
+        self._executor.shutdown(wait=False)
+        self.session.close()
+        if self.spool is not None:
+            self.spool.close()
\ No newline at end of file
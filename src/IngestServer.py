@@ -0,0 +1,232 @@
+"""
+Receptor web local en Python, reemplazo de reciver.php / get_data.php / clear.php.
+
+Atiende las mismas rutas con las mismas respuestas (y sirve index.html y el
+resto de web/EMG), pero guarda los lotes en un IngestStore en lugar de
+reescribir emg_data.json completo en cada POST:
+
+    python src/IngestServer.py --port 8080
+    python main.py --server http://localhost:8080/ --in-flight 4
+
+Los visores piden solo lo nuevo con get_data.php?since=<seq>, o se suscriben
+a /stream (Server-Sent Events) y reciben cada lote en cuanto llega.
+/tiles?t0=&t1=&pixels= devuelve la señal ya reducida a mínimo/máximo por
+píxel junto con las estadísticas de la ventana; los visores que dibujan con
+/tiles agregan samples=0 a get_data.php y /stream y reciben los lotes sin
+muestras (eventos, características y sample_count).
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from BatchCodec import decode_batch
+from IngestStore import IngestStore
+
+WEB_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'web', 'EMG')
+KEEPALIVE_SECONDS = 15  # Comentario SSE para que proxies y navegadores no corten el stream inactivo
+CONTENT_TYPES = {'.html': 'text/html; charset=utf-8', '.js': 'application/javascript',
+                 '.css': 'text/css', '.json': 'application/json', '.png': 'image/png', '.svg': 'image/svg+xml'}
+
+
+class IngestRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'   # Keep-alive con HTTPSender
+    disable_nagle_algorithm = True  # Cabeceras y cuerpo van en escrituras separadas
+
+    def _cors_headers(self):
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Access-Control-Allow-Methods', 'POST, GET, OPTIONS')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type, Content-Encoding')
+
+    def _send(self, status, body, content_type='application/json'):
+        if isinstance(body, dict):
+            body = json.dumps(body, ensure_ascii=False)
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self._cors_headers()
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _error(self, status, message):
+        self._send(status, {'status': 'error', 'message': message,
+                            'timestamp': datetime.now().astimezone().isoformat(timespec='seconds')})
+
+    def _endpoint(self):
+        url = urlparse(self.path)
+        return os.path.basename(url.path) or 'index.html', parse_qs(url.query)
+
+    @staticmethod
+    def _flag(query, name, default):
+        value = query.get(name, [None])[0]
+        if value is None:
+            return default
+        return value.lower() in ('1', 'true', 'on', 'yes')
+
+    @staticmethod
+    def _int(value, default=None):
+        try:
+            return int(value) if value is not None else default
+        except ValueError:
+            return default
+
+    def do_OPTIONS(self):
+        self._send(200, b'')
+
+    def do_POST(self):
+        endpoint, _ = self._endpoint()
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if endpoint == 'reciver.php':
+            self._ingest(body)
+        elif endpoint == 'clear.php':
+            self._send(200, self.server.store.clear())
+        elif endpoint == 'get_data.php':
+            self._error(405, 'Solo se permiten requests GET')
+        else:
+            self._error(404, 'No encontrado')
+
+    def do_GET(self):
+        endpoint, query = self._endpoint()
+        if endpoint == 'get_data.php':
+            limit = self._int(query.get('limit', [None])[0])
+            since = self._int(query.get('since', [None])[0])
+            latest = self._flag(query, 'latest', False)
+            samples = self._flag(query, 'samples', True)
+            self._send(200, self.server.store.get_data(limit=limit, latest=latest, since=since, samples=samples))
+        elif endpoint == 'stream':
+            self._stream(query)
+        elif endpoint == 'tiles':
+            self._tiles(query)
+        elif endpoint == 'clear.php':
+            self._send(200, self.server.store.clear())
+        elif endpoint == 'reciver.php':
+            self._error(405, 'Solo se permiten requests POST')
+        else:
+            self._static(endpoint)
+
+    def _ingest(self, body):
+        try:
+            batch = decode_batch(body, self.headers.get('Content-Encoding'))
+        except (json.JSONDecodeError, UnicodeDecodeError, OSError, EOFError):
+            self._error(400, 'Datos JSON inválidos')
+            return
+        except ValueError:
+            batch = None  # JSON válido que no es un lote
+        if not isinstance(batch, dict) or 'timestamp' not in batch or not isinstance(batch.get('samples'), list):
+            self._error(400, 'Estructura de datos inválida')
+            return
+        self._send(200, self.server.store.append(batch))
+
+    def _stream(self, query):
+        """Server-Sent Events: cada lote nuevo se escribe como un evento con id = seq.
+
+        Todos los visores escriben los mismos bytes ya codificados por el store, así que
+        cada uno cuesta una escritura por lote. Sin since se empieza por lo próximo que
+        llegue; al reconectar, el navegador manda Last-Event-ID y se retoma desde ahí.
+        Con samples=0 los eventos llevan los lotes sin muestras.
+        """
+        store = self.server.store
+        samples = self._flag(query, 'samples', True)
+        cursor = self._int(self.headers.get('Last-Event-ID'), self._int(query.get('since', [None])[0]))
+        if cursor is None:
+            cursor = store.last_seq
+
+        self.close_connection = True  # Cuerpo sin longitud: termina al cerrar la conexión
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self._cors_headers()
+        self.end_headers()
+        try:
+            self.wfile.write(b"retry: 2000\n\n")
+            while not store.closed:
+                events, cursor = store.wait_for_events(cursor, timeout=KEEPALIVE_SECONDS, samples=samples)
+                self.wfile.write(b"".join(events) if events else b": ping\n\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # El visor se desconectó
+
+    def _tiles(self, query):
+        """Serie mínimo/máximo de como mucho pixels puntos y estadísticas para t0..t1 (ms del dispositivo)"""
+        def number(name):
+            try:
+                value = float(query[name][0])
+            except (KeyError, ValueError):
+                return None
+            return value if math.isfinite(value) else None
+
+        pixels = self._int(query.get('pixels', [None])[0], 1000)
+        window_ms = number('window') or 30000
+        self._send(200, self.server.store.get_tile(number('t0'), number('t1'), min(max(pixels, 1), 10000), window_ms))
+
+    def _static(self, name):
+        """Archivos de web/EMG (solo del directorio, sin subrutas)"""
+        path = os.path.join(self.server.web_directory, name)
+        if os.path.dirname(os.path.abspath(path)) != os.path.abspath(self.server.web_directory) or not os.path.isfile(path):
+            self._error(404, 'No encontrado')
+            return
+        with open(path, 'rb') as f:
+            content = f.read()
+        self._send(200, content, CONTENT_TYPES.get(os.path.splitext(name)[1], 'application/octet-stream'))
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class IngestServer(ThreadingHTTPServer):
+    """Servidor HTTP con un hilo por conexión sobre un IngestStore compartido"""
+
+    def __init__(self, address=('127.0.0.1', 8080), data_directory=os.path.join('data', 'ingest'),
+                 web_directory=WEB_DIRECTORY, verbose=False, **store_options):
+        super().__init__(address, IngestRequestHandler)
+        self.store = IngestStore(data_directory, **store_options)
+        self.web_directory = web_directory
+        self.verbose = verbose
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self):
+        """Atiende en un hilo de fondo (para pruebas o para integrarlo en otra aplicación)"""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        self.store.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Receptor web EMG local (reemplazo de los scripts PHP)")
+    parser.add_argument('--host', default='127.0.0.1', help="dirección donde escuchar (0.0.0.0 para la red local)")
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--data', default=os.path.join('data', 'ingest'), help="directorio del log de lotes")
+    parser.add_argument('--verbose', action='store_true', help="registrar cada petición")
+    args = parser.parse_args()
+
+    server = IngestServer((args.host, args.port), data_directory=args.data, verbose=args.verbose)
+    print(f"Receptor EMG en {server.url} (datos en {args.data})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,387 @@
+"""
+Almacén de lotes del receptor web: log segmentado append-only + anillo en memoria.
+
+Cada lote aceptado se agrega como una línea JSON compacta al segmento actual
+(ingest_00000001.jsonl, ...); al superar segment_bytes se abre otro y se
+borran los más antiguos por encima de max_segments. El anillo guarda los
+últimos ring_batches lotes ya serializados, así que una lectura solo concatena
+las líneas pedidas: agregar cuesta O(lote) y leer O(lotes devueltos),
+independientemente de cuánto se haya guardado. Al abrir se reconstruye el
+anillo leyendo los segmentos desde el final.
+
+Cada lote recibe un número de secuencia creciente (seq) que no se reinicia
+al borrar los datos: get_data(since=seq) devuelve solo lo posterior, y
+wait_for_events alimenta a los visores conectados por Server-Sent Events con
+el mismo evento ya codificado para todos. Con samples=False los dos entregan
+el lote sin sus muestras (solo sample_count): los visores que dibujan con
+get_tile reciben eventos y características sin que el tamaño dependa de la
+frecuencia de muestreo.
+
+Las muestras filtradas de cada lote alimentan además un TileAggregator:
+get_tile(t0, t1, pixels) devuelve una serie mínimo/máximo de tamaño acotado
+por pixels y las estadísticas de la ventana sin enviar muestras crudas.
+HTTPSender reinicia time_ms en cada inicio de transmisión: un lote de otro
+emisor, o uno nuevo (no un reintento atrasado) cuyo tiempo retrocede más que
+el intervalo más fino, empieza una sesión y los agregados vuelven a cero.
+append() solo encola el lote para los agregados: se suman fuera del candado
+de append, al pedir un tile o cuando la cola llega a ring_batches lotes.
+
+HTTPSender puede tener varios lotes en vuelo a la vez, que llegan en
+cualquier orden. batch_id es "<emisor>-<secuencia>": un lote cuyo anterior del
+mismo emisor todavía no se guardó espera (hasta reorder_timeout segundos, por
+si el emisor lo descartó) antes de guardarse, así que seq y el log siguen el
+orden en que se armaron los lotes. De un emisor desconocido se espera primero
+la secuencia 1; el spool de una ejecución anterior que ya no está en el anillo
+paga esa espera una sola vez. clear() conserva las secuencias por emisor.
+
+Las respuestas reproducen las de reciver.php, get_data.php y clear.php.
+"""
+
+import bisect
+import itertools
+import json
+import os
+import threading
+import time
+from collections import deque, namedtuple
+from datetime import datetime
+
+from BatchCodec import batch_times_ms, batch_values
+from TileAggregator import TileAggregator
+
+# Lote guardado: line es el JSON tal como está en el log y event el mismo lote como
+# evento SSE ("id: seq" + "data: line"), codificado una sola vez para todos los visores
+StoredBatch = namedtuple('StoredBatch', ['seq', 'line', 'event', 'timestamp', 'samples', 'batch_id'])
+
+
+def _sender_sequence(batch_id):
+    """(emisor, secuencia) de un batch_id de HTTPSender, o (None, None)"""
+    if not isinstance(batch_id, str):
+        return None, None
+    sender, _, sequence = batch_id.rpartition('-')
+    try:
+        return sender, int(sequence)
+    except ValueError:
+        return None, None
+
+
+def _now_iso():
+    return datetime.now().astimezone().isoformat(timespec='seconds')
+
+
+class IngestStore:
+    """Log segmentado de lotes con los últimos ring_batches en memoria; seguro entre hilos"""
+
+    def __init__(self, directory, ring_batches=1000, segment_bytes=8 * 1024 * 1024, max_segments=16,
+                 tile_resolutions_ms=(10, 100, 1000, 10000), reorder_timeout=2.0):
+        self.directory = directory
+        self.ring_batches = ring_batches  # Igual que el recorte a 1000 lotes de reciver.php
+        self.segment_bytes = segment_bytes
+        self.max_segments = max_segments
+        self._ring = deque(maxlen=ring_batches)
+        self._ids = set()  # batch_id presentes en el anillo (ventana de deduplicación)
+        self._senders = {}  # Última secuencia guardada de cada emisor
+        self._summaries = {}  # seq -> (línea, evento SSE) sin muestras, armados al pedirlos
+        self.reorder_timeout = reorder_timeout
+        self.tiles = TileAggregator(tile_resolutions_ms)  # Se reconstruye desde el anillo al abrir
+        self._tile_sender = None  # Emisor de la sesión que alimenta los agregados
+        self._tile_pending = deque()  # (lote, es el más nuevo de su emisor) todavía sin agregar
+        self._tiles_lock = threading.Lock()  # Orden de los candados: _lock y después _tiles_lock
+        self._lock = threading.Lock()
+        self._appended = threading.Condition(self._lock)  # Avisa a los visores en espera
+        self._segment = None
+        self._handle = None
+        self.log_bytes = 0
+        self.last_seq = 0
+        self.closed = False
+
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    def _segment_path(self, segment):
+        return os.path.join(self.directory, f"ingest_{segment:08d}.jsonl")
+
+    def _seq_path(self):
+        return os.path.join(self.directory, "seq")
+
+    def _segments(self):
+        segments = []
+        for name in os.listdir(self.directory):
+            if name.startswith("ingest_") and name.endswith(".jsonl"):
+                try:
+                    segments.append(int(name[7:-6]))
+                except ValueError:
+                    continue
+        return sorted(segments)
+
+    def _load(self):
+        """Reconstruye el anillo con las últimas líneas válidas de los segmentos.
+
+        Los segmentos se leen del más nuevo al más viejo y la lectura se corta en
+        cuanto se juntan ring_batches líneas: abrir no lee todo el log retenido.
+        """
+        segments = self._segments()
+        recent = deque(maxlen=self.ring_batches)
+        for segment in reversed(segments):
+            path = self._segment_path(segment)
+            self.log_bytes += os.path.getsize(path)
+            if len(recent) == self.ring_batches:
+                continue  # Solo se suma su tamaño
+            lines = []
+            with open(path, 'rb') as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # Línea incompleta por un cierre abrupto
+                    lines.append(line)
+            recent.extendleft(reversed(lines[-(self.ring_batches - len(recent)):]))
+        # Último número de secuencia usado antes de un borrado
+        try:
+            with open(self._seq_path()) as f:
+                self.last_seq = int(f.read())
+        except (OSError, ValueError):
+            pass
+
+        for line in recent:
+            try:
+                batch = json.loads(line)
+            except ValueError:
+                continue
+            self.last_seq = max(self.last_seq, batch.get('seq') or self.last_seq + 1)
+            self._remember(batch, line.decode('utf-8').rstrip("\n"), self.last_seq)
+            self._queue_tiles(batch)
+        self._flush_tiles()
+        self._segment = segments[-1] if segments else 0
+
+    def _remember(self, batch, line, seq):
+        if len(self._ring) == self._ring.maxlen:
+            self._ids.discard(self._ring[0].batch_id)
+        samples = batch.get('samples')
+        stored = StoredBatch(seq, line, f"id: {seq}\ndata: {line}\n\n".encode('utf-8'), batch.get('timestamp'),
+                             len(samples) if isinstance(samples, list) else 0, batch.get('batch_id'))
+        self._ring.append(stored)
+        if stored.batch_id is not None:
+            self._ids.add(stored.batch_id)
+            sender, sequence = _sender_sequence(stored.batch_id)
+            if sender is not None:
+                self._senders[sender] = max(self._senders.get(sender, 0), sequence)
+
+    def _queue_tiles(self, batch):
+        """Encola el lote para los agregados; se llama después de _remember, con _lock tomado"""
+        sender, sequence = _sender_sequence(batch.get('batch_id'))
+        self._tile_pending.append((batch, sender is None or sequence >= self._senders[sender]))
+
+    def _flush_tiles(self):
+        """Suma a los agregados los lotes encolados, con _tiles_lock tomado"""
+        while self._tile_pending:
+            self._aggregate(*self._tile_pending.popleft())
+
+    def _aggregate(self, batch, latest):
+        """Suma el lote a los agregados; latest: no es un reintento atrasado de su emisor"""
+        try:
+            times_ms, values = batch_times_ms(batch), batch_values(batch)
+        except (KeyError, TypeError, ValueError):
+            return  # Muestras sin filtered o con canales irregulares: no entran en los agregados
+        if len(times_ms) == 0:
+            return
+
+        sender, _ = _sender_sequence(batch.get('batch_id'))
+        last_time_ms = self.tiles.last_time_ms
+        if last_time_ms is not None:
+            rewound = times_ms.min() < last_time_ms - self.tiles.resolutions_ms[0]
+            if sender != self._tile_sender or (rewound and latest):
+                self.tiles.clear()  # Nueva sesión: no se mezcla con los intervalos de la anterior
+        self._tile_sender = sender
+        self.tiles.extend(times_ms, values)
+
+    def _open_segment(self):
+        if self._handle is not None:
+            self._handle.close()
+        self._segment += 1
+        self._handle = open(self._segment_path(self._segment), 'ab')
+        for segment in self._segments()[:-self.max_segments]:
+            path = self._segment_path(segment)
+            self.log_bytes -= os.path.getsize(path)
+            os.remove(path)
+
+    def append(self, batch):
+        """Guarda un lote ya validado; devuelve la respuesta de reciver.php"""
+        batch_id = batch.get('batch_id')
+        sender, sequence = _sender_sequence(batch_id)
+        with self._lock:
+            # Se espera a los lotes anteriores del mismo emisor que siguen en vuelo
+            deadline = time.monotonic() + self.reorder_timeout
+            while sender is not None and sequence > self._senders.get(sender, 0) + 1 and not self.closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break  # Hueco definitivo: el emisor descartó ese lote
+                self._appended.wait(remaining)
+
+            if batch_id is not None and batch_id in self._ids:
+                return {
+                    'status': 'success',
+                    'message': 'Lote ya recibido',
+                    'duplicate': True,
+                    'samples_received': 0,
+                    'total_batches': len(self._ring),
+                    'timestamp': _now_iso()
+                }
+
+            self.last_seq += 1
+            batch['seq'] = self.last_seq
+            now = _now_iso()
+            batch['server_timestamp'] = now
+            batch['server_time_ms'] = round(time.time() * 1000)
+            line = json.dumps(batch, separators=(',', ':'), ensure_ascii=False)
+            data = (line + "\n").encode('utf-8')
+
+            if self._handle is None or self._handle.tell() >= self.segment_bytes:
+                self._open_segment()
+            self._handle.write(data)
+            self._handle.flush()
+            self.log_bytes += len(data)
+            self._remember(batch, line, self.last_seq)
+            self._queue_tiles(batch)
+            self._appended.notify_all()
+
+            response = {
+                'status': 'success',
+                'message': 'Datos recibidos y guardados',
+                'seq': self.last_seq,
+                'samples_received': len(batch['samples']),
+                'total_batches': len(self._ring),
+                'timestamp': now
+            }
+
+        # Sin visores pidiendo tiles la cola no crece más que el anillo
+        if len(self._tile_pending) >= self.ring_batches:
+            with self._tiles_lock:
+                self._flush_tiles()
+        return response
+
+    def _summary(self, stored):
+        """(línea, evento SSE) del lote sin muestras, con sample_count; con _lock tomado"""
+        summary = self._summaries.get(stored.seq)
+        if summary is None:
+            batch = json.loads(stored.line)
+            batch.pop('samples', None)
+            batch['sample_count'] = stored.samples
+            line = json.dumps(batch, separators=(',', ':'), ensure_ascii=False)
+            summary = self._summaries[stored.seq] = (line, f"id: {stored.seq}\ndata: {line}\n\n".encode('utf-8'))
+            if len(self._summaries) > self.ring_batches:
+                del self._summaries[next(iter(self._summaries))]  # El armado hace más tiempo
+        return summary
+
+    def _after(self, since):
+        """Lotes del anillo con seq > since (el anillo está ordenado por seq)"""
+        start = bisect.bisect_right(self._ring, since, key=lambda batch: batch.seq)
+        return list(itertools.islice(self._ring, start, None))
+
+    def get_data(self, limit=None, latest=False, since=None, samples=True):
+        """Respuesta de get_data.php como texto JSON; los lotes se copian tal como están en el log.
+
+        Con since solo se devuelven los lotes posteriores a ese seq (los limit más antiguos,
+        para seguir pidiendo desde el último recibido); con samples=False, sin sus muestras
+        """
+        with self._lock:
+            batches = list(self._ring) if since is None else self._after(since)
+            first_seq = self._ring[0].seq if self._ring else None
+            last_seq = self.last_seq
+            log_bytes = self.log_bytes
+            if limit and limit > 0:
+                batches = batches[-limit:] if latest and since is None else batches[:limit]
+            lines = [batch.line if samples else self._summary(batch)[0] for batch in batches]
+
+        envelope = json.dumps({
+            'status': 'success',
+            'message': 'Datos recuperados exitosamente' if batches or log_bytes else 'No hay datos disponibles',
+            'data': None,
+            'total_batches': len(batches),
+            'total_samples': sum(batch.samples for batch in batches),
+            'first_timestamp': batches[0].timestamp if batches else None,
+            'last_timestamp': batches[-1].timestamp if batches else None,
+            'file_size': log_bytes,
+            'first_seq': first_seq,
+            'last_seq': last_seq,
+            'timestamp': _now_iso()
+        }, ensure_ascii=False)
+        head, tail = envelope.split('"data": null', 1)
+        return head + '"data": [' + ','.join(lines) + ']' + tail
+
+    def get_tile(self, t0_ms=None, t1_ms=None, pixels=1000, window_ms=30000):
+        """Serie agregada (ver TileAggregator.tile) como texto JSON.
+
+        Sin t1_ms la ventana termina en la última muestra recibida; sin t0_ms empieza
+        window_ms antes de t1_ms
+        """
+        with self._lock:
+            last_seq = self.last_seq
+        with self._tiles_lock:
+            self._flush_tiles()
+            if t1_ms is None:
+                t1_ms = self.tiles.last_time_ms or 0.0
+            if t0_ms is None:
+                t0_ms = t1_ms - window_ms
+            tile = self.tiles.tile(t0_ms, t1_ms, pixels)
+            total_samples = self.tiles.total_samples
+        return json.dumps({
+            'status': 'success',
+            't0_ms': t0_ms,
+            't1_ms': t1_ms,
+            **tile,
+            'total_samples': total_samples,
+            'last_seq': last_seq,
+            'timestamp': _now_iso()
+        }, ensure_ascii=False)
+
+    def clear(self):
+        """Borra el log y el anillo; devuelve la respuesta de clear.php"""
+        with self._lock:
+            deleted = len(self._ring)
+            previous_size = self.log_bytes
+            if self._handle is not None:
+                self._handle.close()
+                self._handle = None
+            for segment in self._segments():
+                os.remove(self._segment_path(segment))
+            self._ring.clear()
+            self._ids.clear()
+            self._summaries.clear()
+            with self._tiles_lock:
+                self._tile_pending.clear()
+                self.tiles.clear()
+            self.log_bytes = 0
+            # La secuencia sigue desde donde estaba: los cursores de los visores siguen valiendo
+            with open(self._seq_path(), 'w') as f:
+                f.write(str(self.last_seq))
+
+        return {
+            'status': 'success',
+            'message': "Datos borrados exitosamente" if previous_size else "No había datos para borrar",
+            'file_existed': previous_size > 0,
+            'deleted_batches': deleted,
+            'previous_file_size': previous_size,
+            'timestamp': _now_iso()
+        }
+
+    def wait_for_events(self, since, timeout=None, samples=True):
+        """Espera lotes con seq > since; devuelve (eventos SSE ya codificados, nuevo cursor).
+
+        Con samples=False los eventos llevan el lote sin muestras (ver get_data)
+        """
+        with self._appended:
+            if self.last_seq <= since and not self.closed:
+                self._appended.wait(timeout)
+            batches = self._after(since)
+            if not batches:
+                return [], min(since, self.last_seq)  # Cursor adelantado: el log se recreó desde cero
+            if not samples:
+                return [self._summary(batch)[1] for batch in batches], batches[-1].seq
+        return [batch.event for batch in batches], batches[-1].seq
+
+    def close(self):
+        with self._lock:
+            self.closed = True
+            self._appended.notify_all()
+            if self._handle is not None:
+                self._handle.close()
+                self._handle = None
@@ -0,0 +1,120 @@
+import json
+import threading
+import time
+import numpy as np
+
+# Etapas medidas desde la llegada de la muestra al puerto serie
+STAGES = ('dispatch', 'processing', 'plot', 'disk', 'network')
+STAGE_LABELS = {
+    'dispatch': "Despacho (señal Qt)",
+    'processing': "Procesamiento",
+    'plot': "Gráfico",
+    'disk': "Disco",
+    'network': "Red (ACK HTTP)"
+}
+
+# Buckets logarítmicos fijos: 10 por década entre 10 µs y 100 s
+BUCKET_EDGES = np.logspace(-5, 2, 71)
+
+
+class LatencyHistogram:
+    """Histograma de latencias (segundos) con buckets fijos; registrar un bloque es O(muestras)"""
+
+    def __init__(self):
+        self.counts = np.zeros(len(BUCKET_EDGES) + 1, dtype=np.int64)  # + desborde por arriba y por abajo
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, latencies):
+        latencies = np.asarray(latencies, dtype=float)
+        if len(latencies) == 0:
+            return
+        buckets = np.searchsorted(BUCKET_EDGES, latencies, side='right')
+        counts = np.bincount(buckets, minlength=len(self.counts))
+        with self._lock:
+            self.counts += counts
+            self.max = max(self.max, float(latencies.max()))
+
+    @property
+    def count(self):
+        return int(self.counts.sum())
+
+    def percentile(self, q):
+        """Percentil q (0-100) aproximado por el borde superior del bucket que lo contiene"""
+        with self._lock:
+            counts = self.counts.copy()
+            maximum = self.max
+        total = counts.sum()
+        if total == 0:
+            return None
+        bucket = int(np.searchsorted(np.cumsum(counts), q / 100 * total, side='left'))
+        if bucket >= len(BUCKET_EDGES):
+            return maximum
+        return min(float(BUCKET_EDGES[bucket]), maximum)
+
+    def reset(self):
+        with self._lock:
+            self.counts[:] = 0
+            self.max = 0.0
+
+
+class LatencyTracer:
+    """Latencias por etapa desde la marca de llegada (time.time() al leer el puerto)"""
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.histograms = {stage: LatencyHistogram() for stage in STAGES}
+        self.started_at = time.time()
+
+    def record(self, stage, arrival_timestamps, now=None):
+        """Registra la latencia de cada muestra de un bloque para una etapa"""
+        if not self.enabled or arrival_timestamps is None:
+            return
+        if now is None:
+            now = time.time()
+        self.histograms[stage].record(now - np.asarray(arrival_timestamps, dtype=float))
+
+    def reset(self):
+        for histogram in self.histograms.values():
+            histogram.reset()
+        self.started_at = time.time()
+
+    def summary(self):
+        """p50/p95/p99/máximo en milisegundos por etapa con datos"""
+        result = {}
+        for stage, histogram in self.histograms.items():
+            if histogram.count == 0:
+                continue
+            result[stage] = {
+                'count': histogram.count,
+                'p50_ms': histogram.percentile(50) * 1000,
+                'p95_ms': histogram.percentile(95) * 1000,
+                'p99_ms': histogram.percentile(99) * 1000,
+                'max_ms': histogram.max * 1000
+            }
+        return result
+
+    def format_summary(self):
+        """Texto de una línea por etapa para el panel de diagnóstico"""
+        summary = self.summary()
+        if not summary:
+            return "Sin datos de latencia"
+        return "\n".join(
+            f"{STAGE_LABELS[stage]}: p50 {stats['p50_ms']:.1f} / p95 {stats['p95_ms']:.1f} / "
+            f"p99 {stats['p99_ms']:.1f} ms"
+            for stage, stats in summary.items()
+        )
+
+    def dump(self, path):
+        """Guarda resumen e histogramas completos en JSON"""
+        data = {
+            'started_at': self.started_at,
+            'finished_at': time.time(),
+            'bucket_edges_s': BUCKET_EDGES.tolist(),
+            'summary': self.summary(),
+            'histograms': {stage: histogram.counts.tolist() for stage, histogram in self.histograms.items()
+                           if histogram.count}
+        }
+        with open(path, 'w') as f:
+            json.dump(data, f, indent=2)
+        return path
@@ -2,10 +2,23 @@ from PySide6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
                                QPushButton, QComboBox, QLabel, QGroupBox, 
                                QCheckBox, QDoubleSpinBox, QSpinBox, QTextEdit,
                                QSplitter, QFrame, QProgressBar, QScrollArea)
-from PySide6.QtCore import Qt, QTimer
+from PySide6.QtCore import Qt, QTimer, QRectF
 import pyqtgraph as pg
+import numpy as np
 import time
+from collections import deque
 from ThemeManager import ThemeManager
+from RingBuffer import RingBuffer
+from SlidingExtrema import SlidingMinMax
+from PlotDecimator import MinMaxPyramid
+
+# Canales máximos (entradas del ADS1115) y colores de los canales adicionales
+# (el canal 0 usa el color del tema)
+MAX_CHANNELS = 4
+CHANNEL_COLORS = ['#FFB000', '#00C2A8', '#FF5C8A']
+
+SPECTROGRAM_FLOOR_DB = -120.0  # 10·log10 del piso de 1e-12: columnas todavía sin datos
+SPECTROGRAM_TOP_DECAY_DB = 0.25  # Descenso del máximo del rango de colores por columna
 
 class MainWindow(QMainWindow):
     def __init__(self):
@@ -16,18 +29,51 @@ class MainWindow(QMainWindow):
         # Inicializar gestor de temas
         self.theme_manager = ThemeManager()
         
-        # Variables para gráficos con tiempo
-        self.plot_times = []  # Tiempos en milisegundos desde inicio
-        self.plot_data_raw = []
-        self.plot_data_filtered = []
-        
         # Configuración de ventana de tiempo dinámica
         self.time_window_ms = 10000  # Por defecto 10 segundos
         self.sample_rate = 100  # Hz - frecuencia de muestreo estimada
         self.max_points = self._calculate_max_points()  # Calcular dinámicamente
         
+        # Buffers circulares para gráficos con tiempo (uno por canal para tener vistas contiguas)
+        self.num_channels = 1
+        self.plot_times = RingBuffer(self.max_points)  # Tiempos en milisegundos desde inicio
+        self.plot_data_raw = [RingBuffer(self.max_points)]
+        self.plot_data_filtered = [RingBuffer(self.max_points)]
+        # Mínimo/máximo incremental de la ventana visible, por canal, para el autoescalado
+        self.plot_extrema = [SlidingMinMax()]
+        # Pirámides mínimo/máximo para dibujar ventanas largas a costo fijo
+        self.plot_lod_raw = [MinMaxPyramid(self.max_points)]
+        self.plot_lod_filtered = [MinMaxPyramid(self.max_points)]
+        self.points_per_pixel = 2  # Puntos entregados a pyqtgraph por píxel de ancho
+        
+        # Estimación de la frecuencia real a partir de las muestras recibidas
+        self._rate_count = 0
+        self._rate_since = None
+        
         self.start_time = None  # Se inicializa cuando empiece la adquisición
         
+        # LatencyTracer opcional: latencia llegada -> dibujo, por muestra nueva en cada cuadro
+        self.latency_tracer = None
+        self._drawn_count = 0  # total_count de plot_times en el último cuadro dibujado
+        
+        # HTTPSender opcional: estado de la cola de reenvío en el panel de transmisión
+        self.http_sender = None
+        
+        # Espectrograma desplazable: una columna por estimación de SpectralAnalyzer (canal 0)
+        self.spectrogram_columns = 240
+        self.spectrogram_hop_seconds = 0.25
+        self.spectrogram_frequencies = None
+        self.spectrogram_data = None  # RingBuffer de columnas en dB; se crea con configure_spectrogram
+        self.spectrogram_top_db = None  # Máximo móvil para el rango de colores (60 dB por debajo)
+        self._spectrogram_backing = None  # Arreglo que ya tiene la imagen (se asigna una sola vez)
+        self.median_freq_data = RingBuffer(self.spectrogram_columns)
+        self.mean_freq_data = RingBuffer(self.spectrogram_columns)
+        self._spectrogram_dirty = False
+        
+        # Marcadores de inicio/fin de activación: (canal, línea vertical), del más antiguo al más nuevo
+        self.activation_markers = deque()
+        self.max_activation_markers = 200
+        
         # Estado de calibración para ajuste de escala
         self.is_calibrated = False
         
@@ -41,31 +87,71 @@ class MainWindow(QMainWindow):
         self.plot_timer.start(50)  # Actualizar cada 50ms
         
         self.setup_ui()
+        
+        # Timer para refrescar el panel de diagnóstico
+        self.diagnostics_timer = QTimer()
+        self.diagnostics_timer.timeout.connect(self.update_latency_panel)
+        self.diagnostics_timer.timeout.connect(self.update_upload_panel)
+        self.diagnostics_timer.start(1000)
     
     def _calculate_max_points(self):
         """Calcula la cantidad máxima de puntos basándose en la ventana de tiempo"""
         # Agregar 50% extra para tener buffer adicional
         points_needed = int((self.time_window_ms / 1000) * self.sample_rate * 1.5)
-        # Mínimo 500 puntos, máximo 5000 para rendimiento
-        return max(500, min(5000, points_needed))
+        # Mínimo 500 puntos; el costo de dibujo lo acota la decimación, no el buffer
+        return max(500, points_needed)
     
     def _update_max_points(self):
         """Actualiza max_points y ajusta los buffers de datos"""
         old_max_points = self.max_points
         self.max_points = self._calculate_max_points()
         
-        # Si aumentó la capacidad, no necesitamos hacer nada (los datos se acumularán)
-        # Si disminuyó, recortar los datos más antiguos
-        if self.max_points < old_max_points:
-            if len(self.plot_times) > self.max_points:
-                excess = len(self.plot_times) - self.max_points
-                self.plot_times = self.plot_times[excess:]
-                self.plot_data_raw = self.plot_data_raw[excess:]
-                self.plot_data_filtered = self.plot_data_filtered[excess:]
+        # Redimensionar conservando los datos más recientes
+        for buffer in self._plot_buffers():
+            buffer.resize(self.max_points)
+        for pyramid in self.plot_lod_raw + self.plot_lod_filtered:
+            pyramid.resize(self.max_points)
         
         # Log del cambio para debug
         print(f"Max points actualizado: {old_max_points} -> {self.max_points} (ventana: {self.time_window_ms/1000}s)")
         
+    def _plot_buffers(self):
+        return [self.plot_times] + self.plot_data_raw + self.plot_data_filtered
+    
+    def _reset_plot_buffers(self):
+        self.plot_times = RingBuffer(self.max_points)
+        self.plot_data_raw = [RingBuffer(self.max_points) for _ in range(self.num_channels)]
+        self.plot_data_filtered = [RingBuffer(self.max_points) for _ in range(self.num_channels)]
+        self.plot_extrema = [SlidingMinMax() for _ in range(self.num_channels)]
+        self.plot_lod_raw = [MinMaxPyramid(self.max_points) for _ in range(self.num_channels)]
+        self.plot_lod_filtered = [MinMaxPyramid(self.max_points) for _ in range(self.num_channels)]
+        self._drawn_count = 0
+    
+    def set_sample_rate(self, sample_rate):
+        """Actualiza la frecuencia de muestreo y redimensiona los buffers para cubrir la ventana"""
+        if sample_rate == self.sample_rate:
+            return
+        self.sample_rate = sample_rate
+        self._update_max_points()
+    
+    def _track_sample_rate(self, count):
+        """Agranda los buffers si llegan más muestras por segundo de las estimadas"""
+        now = time.time()
+        if self._rate_since is None:
+            self._rate_since = now
+            return
+        self._rate_count += count
+        elapsed = now - self._rate_since
+        if elapsed >= 2.0:
+            measured_rate = self._rate_count / elapsed
+            if measured_rate > self.sample_rate * 1.2:
+                self.set_sample_rate(int(measured_rate))
+            self._rate_count = 0
+            self._rate_since = now
+    
+    def _max_plot_points(self, plot):
+        return max(200, self.points_per_pixel * plot.width())
+        
     def setup_ui(self):
         central_widget = QWidget()
         self.setCentralWidget(central_widget)
@@ -114,8 +200,19 @@ class MainWindow(QMainWindow):
         self.connect_btn = QPushButton("Conectar")
         self.connection_status = QLabel("Desconectado")
         
+        # Velocidad y protocolo del enlace
+        link_layout = QHBoxLayout()
+        self.baudrate_combo = QComboBox()
+        self.baudrate_combo.addItems(["9600", "115200", "230400", "460800", "921600"])
+        self.baudrate_combo.setCurrentText("9600")
+        self.protocol_combo = QComboBox()
+        self.protocol_combo.addItems(["Auto", "Texto", "Binario"])
+        link_layout.addWidget(self.baudrate_combo)
+        link_layout.addWidget(self.protocol_combo)
+        
         serial_layout.addWidget(QLabel("Puerto:"))
         serial_layout.addWidget(self.port_combo)
+        serial_layout.addLayout(link_layout)
         serial_layout.addWidget(self.refresh_ports_btn)
         serial_layout.addWidget(self.connect_btn)
         serial_layout.addWidget(self.connection_status)
@@ -178,7 +275,12 @@ class MainWindow(QMainWindow):
         
         time_window_layout.addWidget(self.time_window_combo)
         
+        self.show_spectrogram_check = QCheckBox("Mostrar espectrograma")
+        self.show_spectrogram_check.setChecked(False)
+        self.show_spectrogram_check.toggled.connect(self.toggle_spectrogram_plot)
+        
         visualization_layout.addWidget(self.show_raw_check)
+        visualization_layout.addWidget(self.show_spectrogram_check)
         visualization_layout.addLayout(time_window_layout)
         
         # Filtros
@@ -222,15 +324,42 @@ class MainWindow(QMainWindow):
         filters_layout.addWidget(self.moving_avg_check)
         filters_layout.addWidget(self.moving_avg_window)
         
+        # Características EMG por ventana deslizante
+        features_group = QGroupBox("Características")
+        features_layout = QVBoxLayout(features_group)
+        
+        self.feature_window = QSpinBox()
+        self.feature_window.setRange(20, 2000)
+        self.feature_window.setValue(250)
+        self.feature_window.setPrefix("Ventana: ")
+        self.feature_window.setSuffix(" ms")
+        self.feature_hop = QSpinBox()
+        self.feature_hop.setRange(10, 1000)
+        self.feature_hop.setValue(50)
+        self.feature_hop.setPrefix("Salto: ")
+        self.feature_hop.setSuffix(" ms")
+        self.features_label = QLabel("Sin datos")
+        self.activation_label = QLabel("Activación: calibrar para detectar")
+        
+        features_layout.addWidget(self.feature_window)
+        features_layout.addWidget(self.feature_hop)
+        features_layout.addWidget(self.features_label)
+        features_layout.addWidget(self.activation_label)
+        
         # Grabación
         recording_group = QGroupBox("Grabación")
         recording_layout = QVBoxLayout(recording_group)
         
         self.record_btn = QPushButton("Iniciar Grabación")
         self.record_status = QLabel("Sin grabación")
+        self.record_format_combo = QComboBox()
+        self.record_format_combo.addItems(["CSV", "Binario"])
+        self.export_csv_btn = QPushButton("Exportar Última a CSV")
         
+        recording_layout.addWidget(self.record_format_combo)
         recording_layout.addWidget(self.record_btn)
         recording_layout.addWidget(self.record_status)
+        recording_layout.addWidget(self.export_csv_btn)
         
         # Transmisión Web
         web_transmission_group = QGroupBox("Transmisión Web")
@@ -239,11 +368,22 @@ class MainWindow(QMainWindow):
         self.web_transmission_btn = QPushButton("Iniciar Transmisión Web")
         self.web_transmission_status = QLabel("Transmisión detenida")
         self.clear_server_btn = QPushButton("Limpiar Datos Servidor")
+        self.upload_label = QLabel("")
+        self.upload_label.setWordWrap(True)
         
         web_transmission_layout.addWidget(self.web_transmission_btn)
         web_transmission_layout.addWidget(self.web_transmission_status)
+        web_transmission_layout.addWidget(self.upload_label)
         web_transmission_layout.addWidget(self.clear_server_btn)
         
+        # Diagnóstico: percentiles de latencia por etapa
+        diagnostics_group = QGroupBox("Diagnóstico")
+        diagnostics_layout = QVBoxLayout(diagnostics_group)
+        
+        self.latency_label = QLabel("Sin datos de latencia")
+        self.latency_label.setWordWrap(True)
+        diagnostics_layout.addWidget(self.latency_label)
+        
         # Log
         log_group = QGroupBox("Log")
         log_layout = QVBoxLayout(log_group)
@@ -258,8 +398,10 @@ class MainWindow(QMainWindow):
         layout.addWidget(calibration_group)
         layout.addWidget(visualization_group)
         layout.addWidget(filters_group)
+        layout.addWidget(features_group)
         layout.addWidget(recording_group)
         layout.addWidget(web_transmission_group)
+        layout.addWidget(diagnostics_group)
         layout.addWidget(log_group)
         layout.addStretch()
         
@@ -276,6 +418,7 @@ class MainWindow(QMainWindow):
     def create_plot_panel(self):
         panel = QWidget()
         layout = QVBoxLayout(panel)
+        self.plot_layout = layout
         
         # Configurar pyqtgraph
         pg.setConfigOptions(antialias=True)
@@ -325,8 +468,143 @@ class MainWindow(QMainWindow):
         layout.addWidget(self.raw_plot)
         layout.addWidget(self.filtered_plot)
         
+        # Un gráfico y una curva cruda por canal; el canal 0 usa los existentes
+        self.channel_plots = [self.filtered_plot]
+        self.filtered_curves = [self.filtered_curve]
+        self.raw_curves = [self.raw_curve]
+        
+        # Los gráficos de los canales adicionales se crean ocultos desde el inicio
+        for channel in range(1, MAX_CHANNELS):
+            self._create_channel_plot(channel)
+        
+        self._create_spectrogram_plot()
+        
         return panel
     
+    def _create_spectrogram_plot(self):
+        """Espectrograma del canal 1 con las tendencias de frecuencia mediana y media"""
+        self.spectrogram_plot = pg.PlotWidget(title="Espectrograma - Canal 1")
+        self.spectrogram_plot.setLabel('left', 'Frecuencia', 'Hz')
+        self.spectrogram_plot.setLabel('bottom', 'Tiempo', 's')
+        self.theme_manager.apply_theme_to_plot(self.spectrogram_plot)
+        
+        self.spectrogram_image = pg.ImageItem()
+        self.spectrogram_image.setColorMap(pg.colormap.get('viridis'))
+        self.spectrogram_plot.addItem(self.spectrogram_image)
+        self.median_freq_curve = self.spectrogram_plot.plot(pen=pg.mkPen('w', width=2), name='Mediana')
+        self.mean_freq_curve = self.spectrogram_plot.plot(
+            pen=pg.mkPen('w', width=1, style=Qt.DashLine), name='Media')
+        
+        self.spectrogram_plot.setMouseEnabled(x=False, y=False)
+        self.spectrogram_plot.setMenuEnabled(False)
+        self.spectrogram_plot.setVisible(False)
+        self.plot_layout.addWidget(self.spectrogram_plot)
+    
+    def toggle_spectrogram_plot(self, checked):
+        self.spectrogram_plot.setVisible(checked)
+        self._spectrogram_dirty = checked
+    
+    def configure_spectrogram(self, frequencies, hop_seconds):
+        """Prepara el anillo de columnas para el eje de frecuencias de SpectralAnalyzer"""
+        self.spectrogram_frequencies = np.asarray(frequencies)
+        self.spectrogram_hop_seconds = hop_seconds
+        self.spectrogram_data = RingBuffer(self.spectrogram_columns, shape=(len(frequencies),),
+                                           fill_value=SPECTROGRAM_FLOOR_DB)
+        self.spectrogram_top_db = None
+        self.median_freq_data.clear()
+        self.mean_freq_data.clear()
+        self.spectrogram_plot.setYRange(0, frequencies[-1], padding=0)
+    
+    def update_spectrum(self, spectrum):
+        """Agrega las columnas de un SpectrumFrame; se dibujan en el próximo cuadro"""
+        if self.spectrogram_data is None or spectrum.psd.shape[2] != len(self.spectrogram_frequencies):
+            return
+        columns = 10 * np.log10(spectrum.psd[:, 0, :] + 1e-12)
+        self.spectrogram_data.extend(columns)
+        # El máximo baja de a poco para seguir una señal que se debilita
+        top = float(columns.max())
+        if self.spectrogram_top_db is not None:
+            top = max(top, self.spectrogram_top_db - SPECTROGRAM_TOP_DECAY_DB * len(columns))
+        self.spectrogram_top_db = top
+        self.median_freq_data.extend(spectrum.median_freq[:, 0])
+        self.mean_freq_data.extend(spectrum.mean_freq[:, 0])
+        self._spectrogram_dirty = True
+    
+    def _draw_spectrogram(self):
+        """La imagen es el arreglo de respaldo del anillo: update_spectrum ya escribió solo las
+        columnas nuevas, y aquí se vuelve a pintar y se desplaza con setRect"""
+        self._spectrogram_dirty = False
+        columns = len(self.spectrogram_data)
+        if columns == 0:
+            return
+        
+        # Eje x en segundos hasta la última estimación; 60 dB de rango dinámico
+        backing, end = self.spectrogram_data.backing()
+        hop = self.spectrogram_hop_seconds
+        step = self.spectrogram_frequencies[1] - self.spectrogram_frequencies[0]
+        levels = (self.spectrogram_top_db - 60, self.spectrogram_top_db)
+        if self._spectrogram_backing is not backing:
+            self._spectrogram_backing = backing
+            self.spectrogram_image.setImage(backing, autoLevels=False, levels=levels)
+        else:
+            self.spectrogram_image.setLevels(levels, update=False)
+            self.spectrogram_image.updateImage()
+        self.spectrogram_image.setRect(QRectF(-end * hop, -step / 2, len(backing) * hop,
+                                              self.spectrogram_frequencies[-1] + step))
+        
+        centers = (np.arange(columns) - columns + 0.5) * self.spectrogram_hop_seconds
+        self.median_freq_curve.setData(centers, self.median_freq_data.view(), connect='finite')
+        self.mean_freq_curve.setData(centers, self.mean_freq_data.view(), connect='finite')
+        self.spectrogram_plot.setXRange(-self.spectrogram_columns * self.spectrogram_hop_seconds, 0, padding=0)
+        
+        median_freq = self.median_freq_data.latest()
+        mean_freq = self.mean_freq_data.latest()
+        self.spectrogram_plot.setTitle(
+            f"Espectrograma - Canal 1 · mediana {median_freq:.0f} Hz · media {mean_freq:.0f} Hz")
+    
+    def _create_channel_plot(self, channel):
+        """Crea el gráfico de potencial y la curva cruda de un canal adicional"""
+        color = CHANNEL_COLORS[(channel - 1) % len(CHANNEL_COLORS)]
+        
+        plot = pg.PlotWidget(title=f"Potencial Muscular EMG - Canal {channel}")
+        plot.setLabel('left', 'Potencial', 'µV')
+        plot.setLabel('bottom', 'Tiempo', 'ms')
+        self.theme_manager.apply_theme_to_plot(plot)
+        curve = plot.plot(pen=color, name=f'EMG µV canal {channel}')
+        
+        plot.setYRange(-50, 3000, padding=0)
+        plot.setMouseEnabled(x=False, y=False)
+        plot.setMenuEnabled(False)
+        plot.getViewBox().setMouseEnabled(x=False, y=False)
+        plot.enableAutoRange(enable=False)
+        
+        plot.setVisible(False)
+        raw_curve = self.raw_plot.plot(pen=color, name=f'Raw canal {channel}')
+        raw_curve.setVisible(False)
+        
+        self.plot_layout.addWidget(plot)
+        self.channel_plots.append(plot)
+        self.filtered_curves.append(curve)
+        self.raw_curves.append(raw_curve)
+    
+    def set_channel_count(self, num_channels):
+        """Ajusta la cantidad de canales mostrados (un gráfico por canal)"""
+        if num_channels == self.num_channels:
+            return
+        if num_channels > MAX_CHANNELS:
+            raise ValueError(f"Se admiten hasta {MAX_CHANNELS} canales (recibidos {num_channels})")
+        
+        for channel, (plot, raw_curve) in enumerate(zip(self.channel_plots, self.raw_curves)):
+            plot.setVisible(channel < num_channels)
+            raw_curve.setVisible(channel < num_channels)
+            if channel >= num_channels:
+                self.filtered_curves[channel].setData([], [])
+                raw_curve.setData([], [])
+        
+        self.num_channels = num_channels
+        self._reset_plot_buffers()
+        self.log_message(f"Canales de adquisición: {num_channels}")
+    
     def add_measurement_lines(self):
         """Agrega tres líneas horizontales de medición con diferentes colores"""
         colors = ['#FF0000', '#00AA00', '#0066FF']  # Rojo, Verde oscuro, Azul oscuro
@@ -384,9 +662,9 @@ class MainWindow(QMainWindow):
     def reset_time_reference(self):
         """Reinicia el tiempo de referencia cuando empiece la adquisición"""
         self.start_time = time.time() * 1000  # Tiempo en milisegundos
-        self.plot_times.clear()
-        self.plot_data_raw.clear()
-        self.plot_data_filtered.clear()
+        self._reset_plot_buffers()
+        while self.activation_markers:
+            self._remove_oldest_marker()
     
     def toggle_raw_plot(self, checked):
         self.raw_plot.setVisible(checked)
@@ -421,66 +699,174 @@ class MainWindow(QMainWindow):
             self.update_measurement_label(line, i)
     
     def update_plots(self):
+        if self._spectrogram_dirty and self.spectrogram_plot.isVisible() and self.spectrogram_data is not None:
+            self._draw_spectrogram()
+        
         if len(self.plot_times) > 0:
-            # Actualizar gráfico crudo si está visible
-            if self.show_raw_check.isChecked() and len(self.plot_data_raw) > 0:
-                self.raw_curve.setData(self.plot_times, self.plot_data_raw)
-                
-            # Actualizar gráfico filtrado con ventana deslizante
-            if len(self.plot_data_filtered) > 0:
-                self.filtered_curve.setData(self.plot_times, self.plot_data_filtered)
+            # Vistas contiguas de los buffers: sin conversión de listas en cada cuadro
+            times = self.plot_times.view()
+            
+            # Configurar ventana deslizante con tiempo configurable
+            current_time = times[-1]
+            window_start = current_time - self.time_window_ms
+            
+            # Inicio de la ventana por búsqueda binaria en el eje de tiempo (índice global)
+            start_position = int(np.searchsorted(times, window_start, side='left'))
+            window_start_index = self.plot_times.total_count - len(times) + start_position
+            
+            # Actualizar gráfico crudo si está visible (decimado mínimo/máximo)
+            if self.show_raw_check.isChecked():
+                max_points = self._max_plot_points(self.raw_plot)
+                for channel in range(self.num_channels):
+                    self.raw_curves[channel].setData(*self.plot_lod_raw[channel].render(
+                        times, self.plot_data_raw[channel].view(), window_start_index, max_points))
+            
+            # Actualizar el gráfico filtrado de cada canal con ventana deslizante
+            for channel in range(self.num_channels):
+                plot = self.channel_plots[channel]
+                self.filtered_curves[channel].setData(*self.plot_lod_filtered[channel].render(
+                    times, self.plot_data_filtered[channel].view(), window_start_index,
+                    self._max_plot_points(plot)))
+                plot.setXRange(window_start, current_time, padding=0)
                 
-                # Configurar ventana deslizante con tiempo configurable
-                current_time = self.plot_times[-1]
-                window_start = current_time - self.time_window_ms
-                self.filtered_plot.setXRange(window_start, current_time, padding=0)
+                # Expirar lo que salió de la ventana (también mantiene acotadas las deques)
+                extrema = self.plot_extrema[channel]
+                extrema.expire(window_start_index)
                 
                 # Ajustar escala Y dinámicamente después de calibrar
                 if self.is_calibrated:
-                    # Solo ajustar si tenemos suficientes datos
-                    if len(self.plot_data_filtered) >= 100:
-                        # Obtener datos visibles en la ventana de tiempo actual
-                        visible_indices = [i for i, t in enumerate(self.plot_times) if t >= window_start]
-                        if visible_indices:
-                            visible_data = [self.plot_data_filtered[i] for i in visible_indices]
-                            
-                            if visible_data:
-                                min_val = min(visible_data)
-                                max_val = max(visible_data)
-                                
-                                # Asegurar un rango mínimo razonable
-                                range_val = max_val - min_val
-                                if range_val < 50:  # Rango mínimo de 50 µV
-                                    center = (min_val + max_val) / 2
-                                    min_val = center - 25
-                                    max_val = center + 25
-                                
-                                # Aplicar margen del 20%
-                                margin = range_val * 0.2
-                                y_min = min_val - margin
-                                y_max = max_val + margin
-                                
-                                self.filtered_plot.setYRange(y_min, y_max, padding=0)
-                
-                # Actualizar posiciones de los labels de medición
-                self.update_all_measurement_labels()
+                    self._autoscale_y(plot, extrema, len(times))
+            
+            # Actualizar posiciones de los labels de medición
+            self.update_all_measurement_labels()
+            
+            # Quitar los marcadores de activación que salieron de la ventana
+            while self.activation_markers and self.activation_markers[0][1].value() < window_start:
+                self._remove_oldest_marker()
+            
+            # Latencia de las muestras que se dibujan por primera vez en este cuadro
+            new_count = min(self.plot_times.total_count - self._drawn_count, len(times))
+            if self.latency_tracer is not None and new_count > 0:
+                self.latency_tracer.record('plot', (times[-new_count:] + self.start_time) / 1000)
+            self._drawn_count = self.plot_times.total_count
+    
+    def update_features(self, features):
+        """Muestra las características de la última ventana de un FeatureFrame"""
+        lines = []
+        for channel in range(features.rms.shape[1]):
+            prefix = f"Canal {channel + 1}: " if features.rms.shape[1] > 1 else ""
+            lines.append(
+                f"{prefix}RMS {features.rms[-1, channel]:.1f} µV · MAV {features.mav[-1, channel]:.1f} µV\n"
+                f"WL {features.wl[-1, channel]:.0f} µV · ZC {features.zc[-1, channel]:.0f} · "
+                f"SSC {features.ssc[-1, channel]:.0f}"
+            )
+        self.features_label.setText("\n".join(lines))
+    
+    def add_activation_events(self, events):
+        """Marca con una línea vertical cada inicio (verde) y fin (rojo) de activación"""
+        if self.start_time is None:
+            return
+        for event in events:
+            color = '#00C853' if event.kind == 'onset' else '#FF1744'
+            line = pg.InfiniteLine(pos=event.time * 1000 - self.start_time, angle=90, movable=False,
+                                   pen=pg.mkPen(color, width=2, style=Qt.DashLine))
+            self.channel_plots[event.channel].addItem(line)
+            self.activation_markers.append((event.channel, line))
+            
+            state = "activo" if event.kind == 'onset' else "reposo"
+            prefix = f"canal {event.channel + 1} " if self.num_channels > 1 else ""
+            self.activation_label.setText(f"Activación: {prefix}{state}")
+        
+        while len(self.activation_markers) > self.max_activation_markers:
+            self._remove_oldest_marker()
+    
+    def _remove_oldest_marker(self):
+        channel, line = self.activation_markers.popleft()
+        self.channel_plots[channel].removeItem(line)
+    
+    def update_latency_panel(self):
+        if self.latency_tracer is not None:
+            self.latency_label.setText(self.latency_tracer.format_summary())
+    
+    def update_upload_panel(self):
+        if self.http_sender is not None:
+            self.upload_label.setText(self.http_sender.format_status())
+    
+    def _autoscale_y(self, plot, extrema, sample_count):
+        """Ajusta el rango Y de un gráfico con el mínimo/máximo de la ventana visible (O(1))"""
+        # Solo ajustar si tenemos suficientes datos
+        if sample_count < 100:
+            return
+        
+        min_val = extrema.min()
+        max_val = extrema.max()
+        
+        # Asegurar un rango mínimo razonable
+        range_val = max_val - min_val
+        if range_val < 50:  # Rango mínimo de 50 µV
+            center = (min_val + max_val) / 2
+            min_val = center - 25
+            max_val = center + 25
+        
+        # Aplicar margen del 20%
+        margin = range_val * 0.2
+        y_min = min_val - margin
+        y_max = max_val + margin
+        
+        plot.setYRange(y_min, y_max, padding=0)
     
     def add_data_point(self, raw_value, muscle_potential_uv):
         # Calcular tiempo transcurrido en milisegundos
         if self.start_time is None:
             self.reset_time_reference()
         
+        # Escalar para un canal o un valor por canal
+        raw_values = np.atleast_1d(raw_value)
+        potentials = np.atleast_1d(muscle_potential_uv)
+        if len(raw_values) != self.num_channels:
+            self.set_channel_count(len(raw_values))
+        
         current_time_ms = (time.time() * 1000) - self.start_time
+        self._track_sample_rate(1)
         
+        # Los buffers circulares descartan solos el dato más antiguo (O(1))
         self.plot_times.append(current_time_ms)
-        self.plot_data_raw.append(raw_value)
-        self.plot_data_filtered.append(muscle_potential_uv)
+        for channel in range(self.num_channels):
+            self.plot_data_raw[channel].append(raw_values[channel])
+            self.plot_data_filtered[channel].append(potentials[channel])
+            self.plot_extrema[channel].push(float(potentials[channel]))
+            self.plot_lod_raw[channel].append(raw_values[channel])
+            self.plot_lod_filtered[channel].append(potentials[channel])
+    
+    def add_data_block(self, raw_values, muscle_potentials_uv, timestamps=None):
+        """Agrega un bloque de muestras (muestras,) o (muestras, canales); timestamps en segundos por muestra"""
+        if self.start_time is None:
+            self.reset_time_reference()
         
-        # Mantener solo los últimos max_points (ahora dinámico)
-        if len(self.plot_times) > self.max_points:
-            self.plot_times.pop(0)
-            self.plot_data_raw.pop(0)
-            self.plot_data_filtered.pop(0)
+        count = len(raw_values)
+        if count == 0:
+            return
+        
+        raw_values = np.asarray(raw_values, dtype=float).reshape(count, -1)
+        potentials = np.asarray(muscle_potentials_uv, dtype=float).reshape(count, -1)
+        if raw_values.shape[1] != self.num_channels:
+            self.set_channel_count(raw_values.shape[1])
+        
+        if timestamps is None:
+            # Sin marcas de llegada: repartir el bloque hacia atrás desde ahora
+            now_ms = time.time() * 1000
+            times_ms = now_ms - (np.arange(count)[::-1] * 1000.0 / self.sample_rate)
+        else:
+            times_ms = np.asarray(timestamps, dtype=float) * 1000
+        
+        self._track_sample_rate(count)
+        self.plot_times.extend(times_ms - self.start_time)
+        for channel in range(self.num_channels):
+            self.plot_data_raw[channel].extend(raw_values[:, channel])
+            self.plot_data_filtered[channel].extend(potentials[:, channel])
+            self.plot_extrema[channel].push_block(potentials[:, channel])
+            self.plot_lod_raw[channel].extend(raw_values[:, channel])
+            self.plot_lod_filtered[channel].extend(potentials[:, channel])
     
     def update_calibration_progress(self, progress):
         """Actualiza la barra de progreso de calibración (0.0 a 1.0)"""
@@ -495,7 +881,8 @@ class MainWindow(QMainWindow):
             self.calibrate_btn.setEnabled(False)
             self.calibration_status.setText("Calibrando - manténgase en reposo")
             # Mantener escala fija durante calibración
-            self.filtered_plot.setYRange(-50, 3000, padding=0)
+            for plot in self.channel_plots:
+                plot.setYRange(-50, 3000, padding=0)
         else:
             self.calibration_progress.setVisible(False)
             self.calibrate_btn.setText("Calibrar")
@@ -504,7 +891,8 @@ class MainWindow(QMainWindow):
     def set_calibration_result(self, success, offset_mv=0.0):
         """Muestra el resultado de la calibración"""
         if success:
-            self.calibration_status.setText(f"Calibrado (offset: {offset_mv:.1f}mV)")
+            offsets = ", ".join(f"{value:.1f}" for value in np.atleast_1d(offset_mv))
+            self.calibration_status.setText(f"Calibrado (offset: {offsets}mV)")
             self.is_calibrated = True  # Activar ajuste automático de escala
             # Forzar actualización del layout después de calibrar
             self.filtered_plot.getViewBox().updateViewRange()
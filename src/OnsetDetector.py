@@ -0,0 +1,204 @@
+import time
+import numpy as np
+from collections import namedtuple
+
+# Evento de activación: time es la marca (s) de la primera muestra que cruzó el umbral,
+# detected_at la de la muestra que confirmó el evento; kind es 'onset' u 'offset'
+ActivationEvent = namedtuple('ActivationEvent',
+                             ['time', 'detected_at', 'channel', 'kind', 'envelope_uv', 'threshold_uv'])
+
+
+class OnsetDetector:
+    """Detector en línea de inicio/fin de activación muscular sobre la señal filtrada en µV.
+
+    La señal se rectifica ('envelope') o pasa por el operador de energía de
+    Teager-Kaiser ('tkeo'), se suaviza con un promedio móvil causal y se compara
+    con dos umbrales relativos al reposo medido en la calibración:
+    media + on_sd·desvío para activar y media + off_sd·desvío para desactivar.
+    Un evento se confirma cuando la condición se sostiene min_on_ms / min_off_ms,
+    y se fecha en la primera muestra que cruzó: la demora de detección está
+    acotada por la ventana de suavizado más la duración mínima (max_latency_seconds).
+    """
+
+    MODES = ('envelope', 'tkeo')
+
+    def __init__(self, sample_rate=100, num_channels=1, mode='envelope', envelope_ms=50,
+                 on_sd=3.0, off_sd=1.5, min_on_ms=25, min_off_ms=50):
+        if mode not in self.MODES:
+            raise ValueError(f"Modo desconocido: {mode}")
+        self.sample_rate = sample_rate
+        self.num_channels = num_channels
+        self.mode = mode
+        self.envelope_ms = envelope_ms
+        self.on_sd = on_sd
+        self.off_sd = off_sd
+        self.min_on_ms = min_on_ms
+        self.min_off_ms = min_off_ms
+
+        # Reposo por canal (se fija con calibrate); sin él no se detecta nada
+        self.baseline_mean = None
+        self.baseline_std = None
+        self.reset()
+
+    def configure(self, sample_rate=None, mode=None, on_sd=None, off_sd=None):
+        """Cambia parámetros; el reposo medido se conserva salvo que cambie la frecuencia o el modo"""
+        if mode is not None and mode not in self.MODES:
+            raise ValueError(f"Modo desconocido: {mode}")
+        if (sample_rate is not None and sample_rate != self.sample_rate) or (mode is not None and mode != self.mode):
+            self.baseline_mean = self.baseline_std = None
+        if sample_rate is not None:
+            self.sample_rate = sample_rate
+        if mode is not None:
+            self.mode = mode
+        if on_sd is not None:
+            self.on_sd = on_sd
+        if off_sd is not None:
+            self.off_sd = off_sd
+        self.reset()
+
+    def reset(self):
+        """Descarta el estado de la señal (no el reposo)"""
+        self.window = max(1, int(round(self.envelope_ms * self.sample_rate / 1000)))
+        self.min_on = max(1, int(round(self.min_on_ms * self.sample_rate / 1000)))
+        self.min_off = max(1, int(round(self.min_off_ms * self.sample_rate / 1000)))
+        self._history = np.zeros((0, self.num_channels))  # Últimas muestras rectificadas/energía (ventana - 1)
+        self._previous = np.zeros((0, self.num_channels))  # Muestras pendientes para Teager-Kaiser
+        self._previous_times = np.zeros(0)
+        self.active = np.zeros(self.num_channels, dtype=bool)
+        self._run = np.zeros(self.num_channels, dtype=int)  # Muestras seguidas cumpliendo la condición
+        self._run_time = np.zeros(self.num_channels)          # Marca de la primera de esas muestras
+
+    @property
+    def is_calibrated(self):
+        return self.baseline_mean is not None
+
+    @property
+    def max_latency_seconds(self):
+        """Demora máxima entre el cruce real del umbral y la emisión del evento"""
+        lookahead = 1 if self.mode == 'tkeo' else 0
+        return (self.window + max(self.min_on, self.min_off) + lookahead) / self.sample_rate
+
+    @property
+    def on_threshold(self):
+        return self.baseline_mean + self.on_sd * self.baseline_std
+
+    @property
+    def off_threshold(self):
+        return self.baseline_mean + self.off_sd * self.baseline_std
+
+    def calibrate(self, rest_uv):
+        """Mide media y desvío de la envolvente en reposo (muestras,) o (muestras, canales)"""
+        rest = np.asarray(rest_uv, dtype=float)
+        rest = rest.reshape(len(rest), -1)
+        if rest.shape[1] != self.num_channels:
+            self.num_channels = rest.shape[1]
+        self.reset()
+        envelope = self._envelope(rest)
+        envelope = envelope[self.window:] if len(envelope) > 2 * self.window else envelope
+        if len(envelope) == 0:
+            return False
+        self.baseline_mean = envelope.mean(axis=0)
+        self.baseline_std = np.maximum(envelope.std(axis=0), 1e-6)
+        self.reset()
+        return True
+
+    def _envelope(self, values):
+        """Envolvente suavizada con estado entre bloques; con TKEO retrasa una muestra"""
+        if self.mode == 'tkeo':
+            # psi[n] = x[n]² - x[n-1]·x[n+1]: necesita la muestra siguiente
+            values = np.concatenate((self._previous, values))
+            if len(values) < 3:
+                self._previous = values
+                return np.zeros((0, self.num_channels))
+            energy = np.abs(values[1:-1] ** 2 - values[:-2] * values[2:])
+            self._previous = values[-2:]
+        else:
+            energy = np.abs(values)
+
+        # Promedio móvil causal con sumas acumuladas sobre la cola del bloque anterior
+        combined = np.concatenate((self._history, energy))
+        cumulative = np.concatenate((np.zeros((1, self.num_channels)), np.cumsum(combined, axis=0)))
+        ends = np.arange(len(self._history) + 1, len(combined) + 1)
+        starts = np.maximum(ends - self.window, 0)
+        self._history = combined[-(self.window - 1):] if self.window > 1 else combined[:0]
+        return (cumulative[ends] - cumulative[starts]) / (ends - starts)[:, np.newaxis]
+
+    def process_block(self, values, timestamps=None):
+        """Procesa un bloque (muestras,) o (muestras, canales); devuelve la lista de eventos nuevos"""
+        count = len(values)
+        if count == 0 or not self.is_calibrated:
+            return []
+        x = np.asarray(values, dtype=float).reshape(count, -1)
+        if x.shape[1] != self.num_channels:
+            return []  # El reposo medido corresponde a otra cantidad de canales
+        timestamps = np.full(count, time.time()) if timestamps is None else np.asarray(timestamps, dtype=float)
+
+        envelope = self._envelope(x)
+        if self.mode == 'tkeo':
+            # Cada valor de energía corresponde a la muestra central de su terna
+            times = np.concatenate((self._previous_times, timestamps))
+            self._previous_times = times[-2:] if len(times) >= 3 else times
+            times = times[1:-1]
+        else:
+            times = timestamps
+
+        events = []
+        for channel in range(self.num_channels):
+            events.extend(self._detect(channel, envelope[:, channel], times))
+        events.sort(key=lambda event: event.detected_at)
+        return events
+
+    def _detect(self, channel, envelope, times):
+        """Máquina de estados con histéresis; solo recorre los tramos donde puede haber transición"""
+        on_threshold = self.on_threshold[channel]
+        off_threshold = self.off_threshold[channel]
+        above = envelope > on_threshold
+        below = envelope < off_threshold
+        events = []
+        position = 0
+        n = len(envelope)
+
+        while position < n:
+            condition = below if self.active[channel] else above
+            needed = self.min_off if self.active[channel] else self.min_on
+
+            if self._run[channel] == 0:
+                candidates = np.flatnonzero(condition[position:])
+                if len(candidates) == 0:
+                    break
+                position += int(candidates[0])
+                self._run_time[channel] = times[position]
+
+            broken = np.flatnonzero(~condition[position:])
+            run_end = position + int(broken[0]) if len(broken) else n
+            if self._run[channel] + run_end - position >= needed:
+                confirmed = position + needed - self._run[channel] - 1
+                self.active[channel] = not self.active[channel]
+                events.append(ActivationEvent(
+                    time=float(self._run_time[channel]),
+                    detected_at=float(times[confirmed]),
+                    channel=channel,
+                    kind='onset' if self.active[channel] else 'offset',
+                    envelope_uv=float(envelope[confirmed]),
+                    threshold_uv=float(on_threshold if self.active[channel] else off_threshold)
+                ))
+                self._run[channel] = 0
+                position = confirmed + 1
+            else:
+                self._run[channel] += run_end - position
+                if run_end < n:
+                    self._run[channel] = 0  # Se cortó antes de confirmarse
+                position = run_end
+        return events
+
+    def get_settings(self):
+        return {
+            'mode': self.mode,
+            'envelope_ms': self.envelope_ms,
+            'on_sd': self.on_sd,
+            'off_sd': self.off_sd,
+            'min_on_ms': self.min_on_ms,
+            'min_off_ms': self.min_off_ms,
+            'baseline_mean_uv': None if self.baseline_mean is None else self.baseline_mean.tolist(),
+            'baseline_std_uv': None if self.baseline_std is None else self.baseline_std.tolist()
+        }
@@ -0,0 +1,107 @@
+import numpy as np
+from RingBuffer import RingBuffer
+
+class MinMaxPyramid:
+    """Pirámide de decimación mínimo/máximo para graficar ventanas largas.
+
+    Cada nivel guarda el mínimo y el máximo de bloques de muestras alineados al
+    índice global (nivel L: bloques de bucket_sizes[L] muestras). Los niveles se
+    actualizan de forma incremental al llegar muestras, y render() entrega como
+    mucho ~max_points puntos para la ventana pedida sin perder picos.
+    """
+
+    def __init__(self, capacity, factor=8, levels=4):
+        self.factor = factor
+        self.bucket_sizes = [factor ** (level + 1) for level in range(levels)]
+        self.capacity = int(capacity)
+        self._mins = [RingBuffer(self._level_capacity(size)) for size in self.bucket_sizes]
+        self._maxs = [RingBuffer(self._level_capacity(size)) for size in self.bucket_sizes]
+        # Mínimos/máximos del bloque incompleto de cada nivel (entradas del nivel anterior)
+        self._pending_min = [np.empty(0) for _ in self.bucket_sizes]
+        self._pending_max = [np.empty(0) for _ in self.bucket_sizes]
+        self.total_count = 0
+
+    def _level_capacity(self, bucket_size):
+        return self.capacity // bucket_size + 2
+
+    def extend(self, values):
+        """Agrega muestras; cada nivel agrupa los bloques completos del nivel anterior"""
+        values = np.asarray(values, dtype=float).ravel()
+        if len(values) == 0:
+            return
+        self.total_count += len(values)
+
+        level_min = level_max = values
+        for level in range(len(self.bucket_sizes)):
+            level_min = np.concatenate((self._pending_min[level], level_min))
+            level_max = np.concatenate((self._pending_max[level], level_max))
+            complete = len(level_min) // self.factor * self.factor
+            self._pending_min[level] = level_min[complete:]
+            self._pending_max[level] = level_max[complete:]
+            if complete == 0:
+                break
+
+            level_min = level_min[:complete].reshape(-1, self.factor).min(axis=1)
+            level_max = level_max[:complete].reshape(-1, self.factor).max(axis=1)
+            self._mins[level].extend(level_min)
+            self._maxs[level].extend(level_max)
+
+    def append(self, value):
+        self.extend([value])
+
+    def clear(self):
+        for buffer in self._mins + self._maxs:
+            buffer.clear()
+        self._pending_min = [np.empty(0) for _ in self.bucket_sizes]
+        self._pending_max = [np.empty(0) for _ in self.bucket_sizes]
+        self.total_count = 0
+
+    def resize(self, capacity):
+        """Cambia la capacidad (en muestras) conservando los bloques más recientes"""
+        self.capacity = int(capacity)
+        for level, size in enumerate(self.bucket_sizes):
+            self._mins[level].resize(self._level_capacity(size))
+            self._maxs[level].resize(self._level_capacity(size))
+
+    def render(self, times, values, start_index, max_points):
+        """Puntos (x, y) a graficar desde el índice global start_index hasta la última muestra.
+
+        times y values son las vistas de las muestras a resolución completa, que
+        terminan en la muestra total_count - 1. Se usa el nivel más fino cuyos
+        bloques entran en max_points; la cola que todavía no completa un bloque de
+        ese nivel se cubre con niveles más finos y, al final, con muestras crudas.
+        """
+        end = self.total_count
+        base = end - len(values)
+        start_index = max(start_index, base)
+        if end - start_index <= max_points:
+            return times[start_index - base:], values[start_index - base:]
+
+        top = len(self.bucket_sizes) - 1
+        for level, size in enumerate(self.bucket_sizes):
+            if 2 * ((end - start_index) // size + 1) <= max_points:
+                top = level
+                break
+
+        xs, ys = [], []
+        position = start_index
+        for level in range(top, -1, -1):
+            size = self.bucket_sizes[level]
+            completed = end // size
+            mins, maxs = self._mins[level].view(), self._maxs[level].view()
+            oldest = completed - len(mins)
+            # El primer bloque puede empezar antes de la ventana (queda fuera del rango X)
+            first = max(position // size, -(-base // size), oldest)
+            if completed <= first:
+                continue
+
+            buckets = np.arange(first, completed)
+            bucket_times = times[buckets * size - base]
+            xs.append(np.repeat(bucket_times, 2))
+            ys.append(np.column_stack((mins[buckets - oldest], maxs[buckets - oldest])).ravel())
+            position = completed * size
+
+        # Muestras que aún no completan el bloque más fino
+        xs.append(times[position - base:])
+        ys.append(values[position - base:])
+        return np.concatenate(xs), np.concatenate(ys)
@@ -0,0 +1,139 @@
+import os
+import time
+import threading
+import numpy as np
+from PySide6.QtCore import QThread, Signal
+from SessionReader import SessionReader
+
+class ReplaySource(QThread):
+    """Reproduce una grabación (.csv o .emgb) con la misma interfaz que SerialHandler.
+
+    Los valores se reconvierten de mV a unidades RAW del ADC y se emiten en bloques
+    por data_block_received respetando los tiempos originales divididos por speed.
+    Con speed = 0 se emite sin pausas, con a lo sumo max_pending_blocks bloques
+    sin procesar: la reproducción avanza al ritmo del pipeline, que llama a
+    block_consumed() al terminar cada bloque.
+    """
+    data_received = Signal(float)
+    data_block_received = Signal(object, object)  # (valores np.ndarray (muestras, canales), timestamps)
+    connection_status = Signal(bool, str)
+
+    def __init__(self, path, speed=1.0, block_interval=0.02, max_pending_blocks=4):
+        super().__init__()
+        self.path = path
+        self.speed = speed
+        self.block_interval = block_interval  # Segundos de grabación por bloque emitido
+        self.reader = None
+        self.port_name = os.path.basename(path)
+        self.is_running = False
+        self.is_connected = False
+
+        # Interfaz de SerialHandler (sin efecto en la reproducción)
+        self.protocol = 'replay'
+        self.baudrate = None
+        self.read_mode = 'block'
+
+        self.ads_resolution = 0.1875  # mV por LSB, si la grabación no lo indica
+        self.sample_rate = None
+        self.samples_received = 0
+        self.position = 0.0  # Segundos de grabación ya reproducidos
+
+        # Bloques emitidos que el consumidor todavía no terminó de procesar (solo con speed = 0)
+        self.max_pending_blocks = max_pending_blocks
+        self._pending_blocks = threading.Semaphore(max_pending_blocks)
+
+    def connect_serial(self, port_name=None, baudrate=None):
+        """Abre la grabación; port_name y baudrate se ignoran"""
+        try:
+            self.reader = SessionReader(self.path)
+            self.ads_resolution = self.reader.metadata.get('ads_resolution_mv', self.ads_resolution)
+            self.sample_rate = self.reader.metadata.get('sample_rate') or self._estimate_sample_rate()
+            self.is_connected = True
+            self.connection_status.emit(
+                True, f"Reproduciendo {self.port_name} ({self.reader.sample_count} muestras, {self.sample_rate} Hz)"
+            )
+            return True
+        except Exception as e:
+            self.connection_status.emit(False, f"Error: {str(e)}")
+            return False
+
+    def _estimate_sample_rate(self):
+        if self.reader.duration <= 0:
+            return 100
+        return int(round((self.reader.sample_count - 1) / self.reader.duration))
+
+    def disconnect_serial(self):
+        self.reader = None
+        self.is_connected = False
+        self.connection_status.emit(False, "Desconectado")
+
+    def start_reading(self):
+        if self.is_connected:
+            self.is_running = True
+            self._pending_blocks = threading.Semaphore(self.max_pending_blocks)
+            self.samples_received = 0
+            self.position = 0.0
+            self.start()
+
+    def stop_reading(self):
+        self.is_running = False
+        self.wait()
+
+    def run(self):
+        block_size = max(1, int(round(self.sample_rate * self.block_interval)))
+        replay_start = time.time()
+        first_time = None
+
+        for block in self.reader.iter_range():
+            if first_time is None:
+                first_time = float(block.time[0])
+
+            for start in range(0, len(block.time), block_size):
+                if not self.is_running:
+                    return
+                times = block.time[start:start + block_size]
+                offsets = times - first_time
+
+                if self.speed > 0:
+                    # Esperar hasta la hora de llegada de la última muestra del bloque
+                    delay = replay_start + offsets[-1] / self.speed - time.time()
+                    if delay > 0:
+                        time.sleep(delay)
+                    timestamps = replay_start + offsets / self.speed
+                else:
+                    if not self._wait_pipeline():
+                        return
+                    timestamps = np.full(len(times), time.time())
+
+                values = np.round(block.raw[start:start + block_size] / self.ads_resolution)
+                self.samples_received += len(values)
+                self.position = float(offsets[-1])
+                self.data_block_received.emit(values, timestamps)
+
+        self.is_running = False
+        self.connection_status.emit(True, f"Reproducción finalizada: {self.samples_received} muestras")
+
+    def _wait_pipeline(self):
+        """Espera lugar en la cola de bloques pendientes; False si se detuvo la reproducción"""
+        while self.is_running:
+            if self._pending_blocks.acquire(timeout=0.1):
+                return True
+        return False
+
+    def block_consumed(self):
+        """El consumidor terminó de procesar un bloque emitido: libera lugar para el siguiente"""
+        if self.speed == 0:
+            self._pending_blocks.release()
+
+    def get_stats(self):
+        return {
+            'protocol': 'replay',
+            'samples_received': self.samples_received,
+            'malformed_lines': 0,
+            'corrupt_frames': 0,
+            'dropped_frames': 0,
+            'replay_position_s': self.position
+        }
+
+    def get_available_ports(self):
+        return [self.port_name]
@@ -0,0 +1,103 @@
+import numpy as np
+
+class RingBuffer:
+    """Buffer circular de capacidad fija respaldado por un array de NumPy.
+
+    Cada valor se escribe dos veces (posición p y p + capacidad), de modo que los
+    elementos almacenados siempre forman una vista contigua del array: inserción
+    O(1) y lectura para graficar sin copias ni conversiones.
+
+    Con shape cada elemento es un array de esa forma (por ejemplo una columna
+    de espectrograma) y view() devuelve un array (elementos,) + shape.
+    Las posiciones sin datos valen fill_value.
+    """
+
+    def __init__(self, capacity, dtype=float, shape=(), fill_value=0):
+        if capacity < 1:
+            raise ValueError("La capacidad debe ser al menos 1")
+        self.capacity = int(capacity)
+        self.dtype = np.dtype(dtype)
+        self.shape = tuple(shape)
+        self.fill_value = fill_value
+        self._data = np.full((2 * self.capacity,) + self.shape, fill_value, dtype=self.dtype)
+        self._position = 0    # Próxima posición de escritura en [0, capacidad)
+        self._size = 0
+        self.total_count = 0  # Elementos agregados desde el último clear (índice global)
+
+    def __len__(self):
+        return self._size
+
+    def append(self, value):
+        self._data[self._position] = value
+        self._data[self._position + self.capacity] = value
+        self._position = (self._position + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+        self.total_count += 1
+
+    def extend(self, values):
+        """Agrega un bloque; si supera la capacidad solo se conservan los más recientes"""
+        values = np.asarray(values, dtype=self.dtype).reshape((-1,) + self.shape)
+        count = len(values)
+        if count == 0:
+            return
+
+        self.total_count += count
+        if count > self.capacity:
+            values = values[-self.capacity:]
+            count = self.capacity
+
+        # Como mucho dos tramos: hasta el final del anillo y desde el principio
+        first = min(count, self.capacity - self._position)
+        start = self._position
+        self._data[start:start + first] = values[:first]
+        self._data[start + self.capacity:start + self.capacity + first] = values[:first]
+
+        rest = count - first
+        if rest:
+            self._data[:rest] = values[first:]
+            self._data[self.capacity:self.capacity + rest] = values[first:]
+
+        self._position = (self._position + count) % self.capacity
+        self._size = min(self._size + count, self.capacity)
+
+    def view(self):
+        """Vista contigua (sin copia) de los elementos, del más antiguo al más reciente"""
+        end = self._position + self.capacity
+        return self._data[end - self._size:end]
+
+    def backing(self):
+        """Array de respaldo (2 × capacidad) y el índice siguiente al elemento más reciente.
+
+        view() es array[fin - len:fin] y array[fin - capacidad:fin] siempre es
+        contiguo; sirve para mostrar el anillo sin copiarlo (por ejemplo una
+        imagen que se desplaza con setRect en lugar de reemplazarse).
+        """
+        return self._data, self._position + self.capacity
+
+    def latest(self):
+        """Elemento más reciente"""
+        if self._size == 0:
+            raise IndexError("RingBuffer vacío")
+        return self._data[self._position + self.capacity - 1]
+
+    def clear(self):
+        self._data.fill(self.fill_value)
+        self._position = 0
+        self._size = 0
+        self.total_count = 0
+
+    def resize(self, capacity):
+        """Cambia la capacidad conservando los elementos más recientes"""
+        capacity = int(capacity)
+        if capacity == self.capacity:
+            return
+        if capacity < 1:
+            raise ValueError("La capacidad debe ser al menos 1")
+
+        kept = self.view()[-capacity:].copy()
+        self.capacity = capacity
+        self._data = np.full((2 * capacity,) + self.shape, self.fill_value, dtype=self.dtype)
+        self._size = len(kept)
+        self._data[:self._size] = kept
+        self._data[capacity:capacity + self._size] = kept
+        self._position = self._size % capacity
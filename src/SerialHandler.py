@@ -1,11 +1,14 @@
 import serial
 import serial.tools.list_ports
 from PySide6.QtCore import QThread, Signal
+import numpy as np
 import time
 import re
+from FrameProtocol import FrameDecoder, BINARY_HANDSHAKE, SYNC_BYTES
 
 class SerialHandler(QThread):
     data_received = Signal(float)
+    data_block_received = Signal(object, object)  # (valores np.ndarray (muestras, canales), timestamps de llegada)
     connection_status = Signal(bool, str)
     
     def __init__(self):
@@ -16,11 +19,35 @@ class SerialHandler(QThread):
         self.is_running = False
         self.is_connected = False
         
-    def connect_serial(self, port_name):
+        # Modo de lectura: 'block' (lee todo lo disponible y emite bloques) o 'line' (una señal por línea)
+        self.read_mode = 'block'
+        self.max_chunk_size = 65536
+        
+        # Protocolo: 'text' (una línea ASCII por muestra), 'binary' (tramas) o
+        # 'auto' (texto hasta que el firmware anuncia el modo binario o llegan tramas);
+        # lo detectado vale para toda la conexión
+        self.protocol = 'auto'
+        self._active_protocol = 'text'
+        self.frame_decoder = FrameDecoder()
+        
+        # Frecuencia nominal (Hz) para fechar las muestras de cada chunk; None si no se conoce
+        self.sample_rate = None
+        
+        # Estado del lector por bloques
+        self._pending = b""
+        self._last_arrival = None
+        self.malformed_lines = 0
+        self.samples_received = 0
+        
+    def connect_serial(self, port_name, baudrate=None):
+        if baudrate is not None:
+            self.baudrate = int(baudrate)
         try:
             self.serial_port = serial.Serial(port_name, self.baudrate, timeout=1)
             self.port_name = port_name
             self.is_connected = True
+            self._active_protocol = 'binary' if self.protocol == 'binary' else 'text'
+            self._pending = b""
             self.connection_status.emit(True, f"Conectado a {port_name}")
             return True
         except Exception as e:
@@ -36,6 +63,13 @@ class SerialHandler(QThread):
     def start_reading(self):
         if self.is_connected:
             self.is_running = True
+            self.malformed_lines = 0
+            self.samples_received = 0
+            # En modo automático se conserva lo detectado: el firmware anuncia el modo binario
+            # una sola vez, al arrancar, y no lo repite en cada inicio de lectura
+            if self.protocol != 'auto':
+                self._active_protocol = self.protocol
+            self.frame_decoder = FrameDecoder()
             self.start()
     
     def stop_reading(self):
@@ -43,18 +77,168 @@ class SerialHandler(QThread):
         self.wait()
     
     def run(self):
+        # Las tramas binarias solo se pueden leer por bloques
+        if self.read_mode == 'block' or self.protocol != 'text':
+            self._run_block_reader()
+        else:
+            self._run_line_reader()
+    
+    def _run_line_reader(self):
         while self.is_running and self.is_connected:
             try:
                 if self.serial_port.in_waiting > 0:
                     line = self.serial_port.readline().decode('utf-8').strip()
                     if line:
-                        value = float(line)
+                        # En modo línea solo se entrega el primer canal
+                        value = float(line.split(',')[0])
                         self.data_received.emit(value)
             except Exception as e:
                 self.connection_status.emit(False, f"Error de lectura: {str(e)}")
                 break
             time.sleep(0.001)  # Pequeña pausa para no saturar
     
+    def _run_block_reader(self):
+        """Drena todo lo disponible en cada lectura y emite un bloque por chunk"""
+        self._pending = b""
+        self._last_arrival = None
+        while self.is_running and self.is_connected:
+            try:
+                waiting = self.serial_port.in_waiting
+                if waiting == 0:
+                    time.sleep(0.001)
+                    continue
+                
+                chunk = self.serial_port.read(min(waiting, self.max_chunk_size))
+                arrival_time = time.time()
+            except Exception as e:
+                self.connection_status.emit(False, f"Error de lectura: {str(e)}")
+                break
+            
+            values = self._decode_chunk(chunk, arrival_time)
+            if len(values) > 0:
+                self._emit_block(values, arrival_time)
+    
+    def _emit_block(self, values, arrival_time):
+        self.samples_received += len(values)
+        timestamps = self._sample_times(len(values), arrival_time)
+        self.data_block_received.emit(values, timestamps)
+    
+    def _sample_times(self, count, arrival_time):
+        """Tiempo de llegada de cada muestra de un chunk.
+        
+        Las muestras de un chunk llegaron entre la lectura anterior y esta: se
+        reparten de forma pareja en ese intervalo y la última queda en
+        arrival_time. Si se conoce sample_rate, la separación no supera
+        1/sample_rate (primer chunk o después de una pausa del dispositivo).
+        """
+        span = 0.0 if self._last_arrival is None else arrival_time - self._last_arrival
+        if self.sample_rate:
+            span = count / self.sample_rate if self._last_arrival is None else min(span, count / self.sample_rate)
+        self._last_arrival = arrival_time
+        return arrival_time - span * np.arange(count - 1, -1, -1) / count
+    
+    def _decode_chunk(self, chunk, arrival_time=None):
+        """Decodifica un chunk según el protocolo activo"""
+        if self._active_protocol == 'binary':
+            return self._decode_frames(chunk)
+        
+        if self.protocol == 'auto':
+            data = self._pending + chunk
+            marker = data.find(BINARY_HANDSHAKE)
+            if marker >= 0:
+                self.frame_decoder.reset()
+                binary_values = self._decode_frames(data[marker + len(BINARY_HANDSHAKE):].lstrip(b"\r\n"))
+                return self._switch_to_binary(data[:marker], binary_values, arrival_time)
+            
+            # Conectado después del anuncio: las tramas se reconocen por la palabra de
+            # sincronismo, y solo se cambia de protocolo con una trama completa válida
+            sync = data.find(SYNC_BYTES)
+            if sync >= 0:
+                decoder = FrameDecoder()
+                binary_values = decoder.feed(data[sync:]).astype(float)
+                if len(binary_values) > 0:
+                    self.frame_decoder = decoder
+                    return self._switch_to_binary(data[:sync], binary_values, arrival_time)
+        
+        return self._parse_chunk(chunk)
+    
+    def _switch_to_binary(self, text, binary_values, arrival_time=None):
+        """Pasa al protocolo binario: text (lo anterior a las tramas) sigue siendo texto.
+        
+        Si las muestras de texto no se pueden unir a las binarias (otra cantidad de
+        canales) se emiten como un bloque propio antes de devolver las binarias.
+        """
+        self._pending = b""
+        values = self._parse_chunk(text)
+        self._pending = b""
+        self._active_protocol = 'binary'
+        self.connection_status.emit(True, f"Protocolo binario detectado en {self.port_name}")
+        if len(values) == 0:
+            return binary_values
+        if len(binary_values) == 0:
+            return values
+        if values.shape[1] != binary_values.shape[1]:
+            self._emit_block(values, time.time() if arrival_time is None else arrival_time)
+            return binary_values
+        return np.concatenate((values, binary_values))
+    
+    def _decode_frames(self, chunk):
+        return self.frame_decoder.feed(chunk).astype(float)
+    
+    def _parse_chunk(self, chunk):
+        """Separa y convierte en bloque las líneas completas; conserva la línea parcial final.
+        
+        Cada línea es un valor o varios separados por comas (uno por canal).
+        Devuelve un array (muestras, canales).
+        """
+        data = self._pending + chunk
+        last_newline = data.rfind(b"\n")
+        if last_newline < 0:
+            self._pending = data
+            return np.empty((0, 1))
+        
+        self._pending = data[last_newline + 1:]
+        lines = data[:last_newline].split(b"\n")
+        lines = [line.strip() for line in lines]
+        lines = [line for line in lines if line]
+        if not lines:
+            return np.empty((0, 1))
+        
+        try:
+            if b"," in lines[0]:
+                return np.array([line.split(b",") for line in lines]).astype(float)
+            return np.array(lines).astype(float)[:, np.newaxis]
+        except ValueError:
+            return self._parse_lines_slow(lines)
+    
+    def _parse_lines_slow(self, lines):
+        """Conversión línea a línea: descarta y cuenta líneas no numéricas o con otra cantidad de canales"""
+        rows = []
+        for line in lines:
+            try:
+                rows.append([float(value) for value in line.split(b",")])
+            except ValueError:
+                # Mensajes del firmware, basura en la línea
+                self.malformed_lines += 1
+        if not rows:
+            return np.empty((0, 1))
+        
+        # La configuración de canales vigente es la de la última línea válida
+        channels = len(rows[-1])
+        valid = [row for row in rows if len(row) == channels]
+        self.malformed_lines += len(rows) - len(valid)
+        return np.array(valid, dtype=float)
+    
+    def get_stats(self):
+        """Contadores del lector por bloques"""
+        stats = {
+            'protocol': self._active_protocol,
+            'samples_received': self.samples_received,
+            'malformed_lines': self.malformed_lines
+        }
+        stats.update(self.frame_decoder.get_stats())
+        return stats
+    
     @staticmethod
     def get_available_ports():
         # Lista todos los dispositivos disponibles
@@ -0,0 +1,275 @@
+"""
+Lectura de acceso aleatorio de grabaciones de DataLogger (.emgb y .csv).
+
+El archivo se abre con numpy.memmap y se mantiene un índice disperso
+tiempo -> posición en un archivo auxiliar "<grabación>.tidx", de modo que abrir
+una sesión larga no requiere recorrerla entera. Con grabaciones binarias cada
+entrada del índice es un chunk y los rangos se devuelven como vistas sin copia;
+con CSV cada entrada agrupa INDEX_ROWS filas y solo se parsean las filas del rango.
+
+El archivo puede estar siendo escrito por DataLogger: refresh() incorpora los
+chunks/filas completos que se hayan agregado desde la última lectura.
+"""
+
+import io
+import os
+import numpy as np
+from collections import namedtuple
+from datetime import datetime
+from BinaryRecording import FILE_EXTENSION, chunk_dtype, read_header
+
+INDEX_EXTENSION = ".tidx"
+INDEX_ROWS = 1024  # Filas de CSV por entrada del índice
+
+# Entrada del índice: tiempo absoluto (s) de la primera muestra, rango de bytes y cantidad de muestras
+INDEX_DTYPE = np.dtype([('time', '<f8'), ('start', '<u8'), ('end', '<u8'), ('count', '<u8')])
+
+# Bloque de muestras devuelto por iter_range: time en segundos epoch, raw/filtered (muestras, canales)
+SessionBlock = namedtuple('SessionBlock', ['time', 'sample', 'raw', 'filtered'])
+
+
+class SessionReader:
+    """Lector de una grabación con consultas por rango de tiempo relativo al inicio de la sesión"""
+
+    def __init__(self, path):
+        self.path = path
+        self.index_path = path + INDEX_EXTENSION
+        self.is_binary = path.endswith(FILE_EXTENSION)
+        self.metadata = {}
+        self._index = np.empty(0, dtype=INDEX_DTYPE)
+        self._mmap = None
+        self._mapped_size = 0
+
+        if self.is_binary:
+            with open(path, 'rb') as f:
+                self.metadata, self._data_offset = read_header(f)
+            self.channels = self.metadata['channels']
+            self._chunk_dtype = chunk_dtype(self.channels, self.metadata['chunk_samples'])
+            self.session_start_time = self.metadata['session_start_time']
+        else:
+            self._open_csv_header()
+
+        self._load_index()
+        self.refresh()
+
+    def _open_csv_header(self):
+        with open(self.path, 'rb') as f:
+            header = f.readline()
+            first_row = f.readline()
+        if not header.endswith(b"\n"):
+            raise ValueError(f"Grabación CSV sin encabezado completo: {self.path}")
+
+        columns = header.decode('utf-8').strip().split(',')
+        self.channels = (len(columns) - 3) // 2
+        self.metadata = {'channels': self.channels, 'columns': columns}
+        self._data_offset = len(header)
+
+        # Inicio de la sesión: timestamp absoluto de la primera fila menos su tiempo relativo
+        if first_row.endswith(b"\n"):
+            timestamp_iso, time_ms = first_row.decode('utf-8').split(',')[:2]
+            self.session_start_time = datetime.fromisoformat(timestamp_iso).timestamp() - float(time_ms) / 1000
+        else:
+            self.session_start_time = None
+
+    # --- Índice disperso ---
+
+    def _load_index(self):
+        """Carga el índice persistido si es coherente con el archivo actual"""
+        try:
+            index = np.load(self.index_path, allow_pickle=False)
+        except (OSError, ValueError):
+            return
+        if index.dtype != INDEX_DTYPE or len(index) == 0:
+            return
+        if index[0]['start'] != self._data_offset or index[-1]['end'] > os.path.getsize(self.path):
+            return
+        self._index = index
+
+    def _save_index(self):
+        try:
+            with open(self.index_path, 'wb') as f:
+                np.save(f, self._index, allow_pickle=False)
+        except OSError:
+            pass  # Directorio de solo lectura: el índice se reconstruye en la próxima apertura
+
+    def refresh(self):
+        """Mapea los datos agregados desde la última lectura y extiende el índice; devuelve muestras nuevas"""
+        size = os.path.getsize(self.path)
+        if size == self._mapped_size:
+            return 0
+        previous_count = self.sample_count
+
+        if self.is_binary:
+            chunks = (size - self._data_offset) // self._chunk_dtype.itemsize
+            self._mmap = np.memmap(self.path, dtype=self._chunk_dtype, mode='r',
+                                   offset=self._data_offset, shape=(chunks,)) if chunks else None
+            if not self._index_matches():
+                self._index = np.empty(0, dtype=INDEX_DTYPE)
+            new_entries = self._index_binary(len(self._index), chunks)
+        else:
+            self._mmap = np.memmap(self.path, dtype=np.uint8, mode='r', shape=(size,))
+            if not self._index_matches():
+                self._index = np.empty(0, dtype=INDEX_DTYPE)
+            new_entries = self._index_csv()
+        self._mapped_size = size
+
+        if len(new_entries):
+            self._index = np.concatenate((self._index, new_entries))
+            self._save_index()
+        return self.sample_count - previous_count
+
+    def _index_matches(self):
+        """Verifica la última entrada del índice persistido contra los datos (archivo reemplazado)"""
+        if len(self._index) == 0 or self._mapped_size:
+            return True
+        last = self._index[-1]
+        if self.is_binary:
+            chunk = (int(last['start']) - self._data_offset) // self._chunk_dtype.itemsize
+            return (self._mmap is not None and chunk < len(self._mmap) and
+                    self._mmap[chunk]['time'][0] == last['time'])
+        return (self.session_start_time is not None and self._mmap[int(last['end']) - 1] == ord('\n') and
+                self._csv_row_time(int(last['start'])) == last['time'])
+
+    def _index_binary(self, first_chunk, chunks):
+        """Una entrada por chunk: solo se lee el encabezado y el primer tiempo de los chunks nuevos"""
+        new_entries = np.zeros(chunks - first_chunk, dtype=INDEX_DTYPE)
+        if len(new_entries):
+            new_chunks = self._mmap[first_chunk:chunks]
+            starts = self._data_offset + np.arange(first_chunk, chunks) * self._chunk_dtype.itemsize
+            new_entries['time'] = new_chunks['time'][:, 0]
+            new_entries['start'] = starts
+            new_entries['end'] = starts + self._chunk_dtype.itemsize
+            new_entries['count'] = new_chunks['count']
+        return new_entries
+
+    def _index_csv(self):
+        """Una entrada cada INDEX_ROWS filas completas, buscando saltos de línea desde el último índice"""
+        position = int(self._index[-1]['end']) if len(self._index) else self._data_offset
+        line_ends = np.flatnonzero(self._mmap[position:] == ord('\n')) + position + 1
+
+        if self.session_start_time is None and len(line_ends):
+            self._open_csv_header()
+
+        # Solo grupos completos; las filas restantes se leen directamente en cada consulta
+        groups = len(line_ends) // INDEX_ROWS
+        new_entries = np.zeros(groups, dtype=INDEX_DTYPE)
+        if groups:
+            ends = line_ends[INDEX_ROWS - 1::INDEX_ROWS][:groups]
+            new_entries['start'] = np.concatenate(([position], ends[:-1]))
+            new_entries['end'] = ends
+            new_entries['count'] = INDEX_ROWS
+            new_entries['time'] = [self._csv_row_time(start) for start in new_entries['start']]
+        return new_entries
+
+    def _csv_row_time(self, start):
+        end = start + int(np.argmax(self._mmap[start:start + 256] == ord('\n')))
+        time_ms = bytes(self._mmap[start:end]).split(b',')[1]
+        return self.session_start_time + float(time_ms) / 1000
+
+    # --- Consultas ---
+
+    @property
+    def sample_count(self):
+        """Muestras completas disponibles (en CSV, las indexadas más la cola sin indexar)"""
+        indexed = int(self._index['count'].sum())
+        if self.is_binary or self._mmap is None:
+            return indexed
+        tail_start = int(self._index[-1]['end']) if len(self._index) else self._data_offset
+        return indexed + int(np.count_nonzero(self._mmap[tail_start:] == ord('\n')))
+
+    @property
+    def duration(self):
+        """Duración en segundos entre la primera y la última muestra disponibles"""
+        last = self._last_time()
+        if last is None:
+            return 0.0
+        return last - self.session_start_time
+
+    def _last_time(self):
+        if self.is_binary:
+            if self._mmap is None or len(self._mmap) == 0:
+                return None
+            chunk = self._mmap[-1]
+            return float(chunk['time'][chunk['count'] - 1])
+        blocks = list(self._iter_csv(self._tail_entry_start()))
+        if blocks:
+            return float(blocks[-1].time[-1])
+        if len(self._index):
+            return float(self._parse_csv(int(self._index[-1]['start']), int(self._index[-1]['end'])).time[-1])
+        return None
+
+    def iter_range(self, t0=None, t1=None):
+        """Itera bloques con las muestras de [t0, t1) (segundos desde el inicio de la sesión)
+
+        En grabaciones binarias cada bloque es una vista sin copia de un chunk del memmap.
+        """
+        start = -np.inf if t0 is None else self.session_start_time + t0
+        end = np.inf if t1 is None else self.session_start_time + t1
+        if self._mmap is None:
+            return
+
+        if self.is_binary:
+            first = max(int(np.searchsorted(self._index['time'], start, side='right')) - 1, 0)
+            for chunk in self._mmap[first:]:
+                times = chunk['time'][:chunk['count']]
+                if times[0] >= end:
+                    break
+                lo = int(np.searchsorted(times, start, side='left'))
+                hi = int(np.searchsorted(times, end, side='left'))
+                if hi > lo:
+                    yield SessionBlock(times[lo:hi], chunk['sample'][lo:hi],
+                                       chunk['raw'][lo:hi], chunk['filtered'][lo:hi])
+        else:
+            first = max(int(np.searchsorted(self._index['time'], start, side='right')) - 1, 0)
+            offset = int(self._index[first]['start']) if len(self._index) else self._data_offset
+            yield from self._iter_csv(offset, start, end)
+
+    def read_range(self, t0=None, t1=None):
+        """Igual que iter_range pero concatenado en un único SessionBlock (con copia)"""
+        blocks = list(self.iter_range(t0, t1))
+        if not blocks:
+            return SessionBlock(np.empty(0), np.empty(0, dtype=np.int64),
+                                np.empty((0, self.channels)), np.empty((0, self.channels)))
+        if len(blocks) == 1:
+            return blocks[0]
+        return SessionBlock(*(np.concatenate(column) for column in zip(*blocks)))
+
+    # --- CSV ---
+
+    def _tail_entry_start(self):
+        return int(self._index[-1]['end']) if len(self._index) else self._data_offset
+
+    def _iter_csv(self, offset, start=-np.inf, end=np.inf):
+        """Parsea grupos de filas desde offset y devuelve las de [start, end) hasta pasar end"""
+        entry = int(np.searchsorted(self._index['start'], offset, side='left'))
+        while offset < self._mapped_size:
+            if entry < len(self._index):
+                group_end = int(self._index[entry]['end'])
+                entry += 1
+            else:
+                # Cola sin indexar: hasta el último salto de línea completo
+                newlines = np.flatnonzero(self._mmap[offset:] == ord('\n'))
+                if len(newlines) == 0:
+                    return
+                group_end = offset + int(newlines[-1]) + 1
+
+            block = self._parse_csv(offset, group_end)
+            offset = group_end
+            lo = int(np.searchsorted(block.time, start, side='left'))
+            hi = int(np.searchsorted(block.time, end, side='left'))
+            if hi > lo:
+                yield SessionBlock(*(column[lo:hi] for column in block))
+            if hi < len(block.time):
+                return
+
+    def _parse_csv(self, start, end):
+        text = bytes(self._mmap[start:end]).decode('utf-8')
+        columns = np.loadtxt(io.StringIO(text), delimiter=',', usecols=range(1, 3 + 2 * self.channels),
+                             ndmin=2)
+        times = self.session_start_time + columns[:, 0] / 1000
+        return SessionBlock(times, columns[:, 1].astype(np.int64),
+                            columns[:, 2:2 + self.channels], columns[:, 2 + self.channels:])
+
+    def close(self):
+        self._mmap = None
+        self._mapped_size = 0
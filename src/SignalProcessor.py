@@ -3,16 +3,41 @@ from scipy import signal
 from collections import deque
 
 class SignalProcessor:
-    def __init__(self, sample_rate=100):
+    def __init__(self, sample_rate=100, num_channels=1):
         self.sample_rate = sample_rate
+        self.num_channels = num_channels
         self.buffer_size = 1000
-        self.data_buffer = deque(maxlen=self.buffer_size)
+        self.data_buffer = deque(maxlen=self.buffer_size)  # Una fila (lista por canal) por muestra
         
         # Parámetros de filtros
         self.lowpass_cutoff = 30.0
         self.highpass_cutoff = 0.5
         self.notch_freq = 50.0
         self.moving_avg_window = 10
+        self.filter_order = 2
+        self.notch_q = 30.0
+        
+        # Modo de filtrado:
+        #   'streaming'  -> IIR causal en secciones de segundo orden con estado persistente (costo constante)
+        #   'zero_phase' -> filtfilt sobre el bloque y las entradas anteriores (hasta buffer_size)
+        self.filter_mode = 'streaming'
+        
+        # Orden de aplicación de los filtros IIR
+        self.filter_chain = ('notch', 'lowpass', 'highpass')
+        
+        # Coeficientes SOS y estado zi por filtro (modo streaming); zi tiene forma
+        # (secciones, 2, canales) para filtrar todos los canales en una sola llamada
+        self._sos = {}
+        self._zi = {}
+        self._last_input = {}  # Última entrada de cada etapa (por canal), para reajustar el estado
+        
+        # Entradas ya promediadas de los bloques anteriores (modo zero_phase): contexto de filtfilt
+        self._zero_phase_history = deque(maxlen=self.buffer_size)
+        
+        # Caché de diseños: (tipo, frecuencia, orden/Q, sample_rate) -> sos
+        self._design_cache = {}
+        self.design_cache_hits = 0
+        self.design_cache_misses = 0
         
         # Estados de filtros
         self.active_filters = {
@@ -33,34 +58,91 @@ class SignalProcessor:
         self.is_calibrating = False
         self.calibration_samples = []
         self.calibration_target_count = 500  # Por defecto 5 segundos
-        self.baseline_offset_mv = 0.0  # Offset en mV
+        self.baseline_offset_mv = np.zeros(num_channels)  # Offset en mV por canal
         self.is_calibrated = False
         
     def add_sample(self, raw_value):
-        """Procesa una muestra RAW del ADS1115 y devuelve el potencial muscular en µV"""
+        """Procesa una muestra RAW del ADS1115 y devuelve el potencial muscular en µV.
+        
+        raw_value puede ser un escalar (un canal) o una secuencia con un valor por canal.
+        """
+        if self.num_channels == 1 and self.filter_mode == 'streaming' and np.ndim(raw_value) == 0:
+            return self._process_scalar(float(raw_value))
+        _, muscle_potential_uv = self.process_block([raw_value])
+        return muscle_potential_uv[0]
+    
+    def _process_scalar(self, raw_value):
+        """Camino rápido de add_sample para un canal en streaming: sin armar arrays por muestra.
         
-        # Convertir RAW a mV (salida del sistema de amplificación)
+        Comparte buffers y estado de filtros con process_block, así que ambos se pueden mezclar.
+        """
         voltage_mv = raw_value * self.ads_resolution
         
-        # Si estamos calibrando, almacenar muestra
         if self.is_calibrating:
-            self.calibration_samples.append(voltage_mv)
+            self.calibration_samples.append([voltage_mv])
             if len(self.calibration_samples) >= self.calibration_target_count:
                 self.finish_calibration()
             return 0.0  # Durante calibración devolver 0 µV
         
-        # Convertir a potencial muscular original en µV
-        if self.is_calibrated:
-            muscle_potential_uv = ((voltage_mv - self.baseline_offset_mv) / self.system_gain) * 1000
-        else:
-            # Sin calibrar, asumir offset de 666mV (valor típico observado)
-            muscle_potential_uv = ((voltage_mv - 666.0) / self.system_gain) * 1000
+        # Sin calibrar, asumir offset de 666mV (valor típico observado)
+        offset_mv = float(self.baseline_offset_mv[0]) if self.is_calibrated else 666.0
+        filtered = ((voltage_mv - offset_mv) / self.system_gain) * 1000
+        self.data_buffer.append([filtered])
+        
+        if self.active_filters['moving_avg']:
+            self.moving_avg_buffer.append([filtered])
+            filtered = sum(row[0] for row in self.moving_avg_buffer) / len(self.moving_avg_buffer)
+        
+        for filter_type in self.filter_chain:
+            if self.active_filters[filter_type]:
+                filtered = self._stream_filter_sample(filter_type, filtered)
+        return filtered
+    
+    def process_block(self, raw_values):
+        """Procesa un bloque de muestras RAW de una sola vez.
+        
+        raw_values tiene forma (muestras,) para un canal o (muestras, canales).
+        Devuelve (voltage_mv, muscle_potential_uv) con la misma forma; es equivalente
+        a llamar add_sample muestra a muestra, pero con todas las etapas vectorizadas.
+        """
+        raw_values = np.asarray(raw_values, dtype=float)
+        single_channel = raw_values.ndim == 1
+        block = raw_values[:, np.newaxis] if single_channel else raw_values
+        
+        if block.shape[1] != self.num_channels:
+            self.set_channel_count(block.shape[1])
+        
+        voltage_mv, muscle_potential_uv = self._process_channels(block)
+        if single_channel:
+            return voltage_mv[:, 0], muscle_potential_uv[:, 0]
+        return voltage_mv, muscle_potential_uv
+    
+    def _process_channels(self, raw_block):
+        """Conversión, calibración y filtros sobre un bloque (muestras, canales)"""
+        voltage_mv = raw_block * self.ads_resolution
+        muscle_potential_uv = np.zeros_like(voltage_mv)
+        
+        # Consumir las muestras que aún necesita la calibración
+        start = 0
+        if self.is_calibrating:
+            needed = self.calibration_target_count - len(self.calibration_samples)
+            start = min(max(needed, 0), len(voltage_mv))
+            self.calibration_samples.extend(voltage_mv[:start].tolist())
+            if len(self.calibration_samples) >= self.calibration_target_count:
+                self.finish_calibration()
+            if self.is_calibrating:
+                return voltage_mv, muscle_potential_uv  # Durante calibración devolver 0 µV
+        
+        if start == len(voltage_mv):
+            return voltage_mv, muscle_potential_uv
         
-        # Agregar al buffer para filtros
-        self.data_buffer.append(muscle_potential_uv)
+        # Sin calibrar, asumir offset de 666mV (valor típico observado)
+        offset_mv = self.baseline_offset_mv if self.is_calibrated else 666.0
+        potentials = ((voltage_mv[start:] - offset_mv) / self.system_gain) * 1000
         
-        # Aplicar filtros al potencial muscular
-        return self.apply_filters(muscle_potential_uv)
+        self.data_buffer.extend(potentials.tolist())
+        muscle_potential_uv[start:] = self.apply_filters_block(potentials)
+        return voltage_mv, muscle_potential_uv
     
     def start_calibration(self, duration_seconds=5):
         """Inicia el proceso de calibración"""
@@ -73,11 +155,29 @@ class SignalProcessor:
     def finish_calibration(self):
         """Finaliza la calibración y calcula el offset baseline"""
         if len(self.calibration_samples) > 0:
-            self.baseline_offset_mv = np.mean(self.calibration_samples)
+            self.baseline_offset_mv = np.mean(self.calibration_samples, axis=0)
             self.is_calibrated = True
             self.is_calibrating = False
             return True, self.baseline_offset_mv
-        return False, 0.0
+        return False, np.zeros(self.num_channels)
+    
+    def calibration_potentials(self):
+        """Reposo de la última calibración en µV (muestras, canales), filtrado como la señal en vivo
+        pero sin tocar el estado de los filtros del streaming"""
+        if not self.is_calibrated or not self.calibration_samples:
+            return np.zeros((0, self.num_channels))
+        
+        samples = np.asarray(self.calibration_samples, dtype=float).reshape(len(self.calibration_samples), -1)
+        potentials = ((samples - self.baseline_offset_mv) / self.system_gain) * 1000
+        if self.active_filters['moving_avg']:
+            window = np.ones(self.moving_avg_window) / self.moving_avg_window
+            potentials = signal.lfilter(window, 1.0, potentials, axis=0)
+        for filter_type in self.filter_chain:
+            if self.active_filters[filter_type]:
+                sos = self._get_sos(filter_type)
+                zi = signal.sosfilt_zi(sos)[:, :, np.newaxis] * potentials[0]
+                potentials, _ = signal.sosfilt(sos, potentials, axis=0, zi=zi)
+        return potentials
     
     def get_calibration_progress(self):
         """Retorna el progreso de calibración (0.0 a 1.0)"""
@@ -85,68 +185,228 @@ class SignalProcessor:
             return 0.0
         return len(self.calibration_samples) / self.calibration_target_count
     
+    def get_settings(self):
+        """Configuración actual de conversión, calibración y filtros (metadatos de grabación)"""
+        return {
+            'sample_rate': self.sample_rate,
+            'ads_resolution_mv': self.ads_resolution,
+            'system_gain': self.system_gain,
+            'calibrated': self.is_calibrated,
+            'baseline_offset_mv': [float(offset) for offset in self.baseline_offset_mv],
+            'filter_mode': self.filter_mode,
+            'active_filters': dict(self.active_filters),
+            'filter_params': {
+                'lowpass_cutoff': self.lowpass_cutoff,
+                'highpass_cutoff': self.highpass_cutoff,
+                'notch_freq': self.notch_freq,
+                'notch_q': self.notch_q,
+                'filter_order': self.filter_order,
+                'moving_avg_window': self.moving_avg_window
+            }
+        }
+    
     def set_system_gain(self, gain):
         """Permite ajustar la ganancia del sistema si se conoce"""
         self.system_gain = float(gain)
     
     def apply_filters(self, value):
-        filtered_value = value
+        """Filtra una sola muestra (escalar o un valor por canal)"""
+        value = np.asarray(value, dtype=float)
+        filtered = self.apply_filters_block(value.reshape(1, -1))
+        return filtered[0, 0] if value.ndim == 0 else filtered[0]
+    
+    def apply_filters_block(self, values):
+        """Versión vectorizada de apply_filters para un bloque (muestras, canales)"""
+        filtered = np.asarray(values, dtype=float)
+        if filtered.ndim == 1:
+            return self.apply_filters_block(filtered[:, np.newaxis])[:, 0]
         
-        # Filtro promedio móvil (aplicar primero)
         if self.active_filters['moving_avg']:
-            filtered_value = self._moving_average_filter(filtered_value)
-        
-        # Para filtros IIR necesitamos suficientes muestras
-        if len(self.data_buffer) < 10:
-            return filtered_value
-            
-        # Aplicar filtros digitales
-        data_array = np.array(list(self.data_buffer))
-        
-        if self.active_filters['notch']:
-            data_array = self._notch_filter(data_array)
-            
-        if self.active_filters['lowpass']:
-            data_array = self._lowpass_filter(data_array)
-            
-        if self.active_filters['highpass']:
-            data_array = self._highpass_filter(data_array)
-        
-        return data_array[-1]  # Retornar último valor filtrado
-    
-    def _moving_average_filter(self, value):
-        self.moving_avg_buffer.append(value)
-        return sum(self.moving_avg_buffer) / len(self.moving_avg_buffer)
+            filtered = self._moving_average_block(filtered)
+        
+        if self.filter_mode == 'streaming':
+            for filter_type in self.filter_chain:
+                if self.active_filters[filter_type]:
+                    filtered = self._stream_filter_block(filter_type, filtered)
+            return filtered
+        
+        # Fase cero: filtrar una vez el bloque precedido por las entradas anteriores
+        # (hasta buffer_size en total) y devolver la parte del bloque
+        history = np.array(self._zero_phase_history, dtype=float).reshape(-1, filtered.shape[1])
+        self._zero_phase_history.extend(filtered.tolist())
+        context = history[max(0, len(history) - (self.buffer_size - len(filtered))):]
+        data_array = np.concatenate((context, filtered))
+        if len(data_array) < 10 or not any(self.active_filters[f] for f in self.filter_chain):
+            return filtered
+        
+        filters = {'notch': self._notch_filter, 'lowpass': self._lowpass_filter, 'highpass': self._highpass_filter}
+        for filter_type in self.filter_chain:
+            if self.active_filters[filter_type]:
+                data_array = filters[filter_type](data_array)
+        return data_array[-len(filtered):]
     
-    def _lowpass_filter(self, data):
+    def _design_key(self, filter_type):
+        """Clave de caché con todos los parámetros que determinan los coeficientes"""
+        if filter_type == 'lowpass':
+            return ('lowpass', self.lowpass_cutoff, self.filter_order, self.sample_rate)
+        if filter_type == 'highpass':
+            return ('highpass', self.highpass_cutoff, self.filter_order, self.sample_rate)
+        if filter_type == 'notch':
+            return ('notch', self.notch_freq, self.notch_q, self.sample_rate)
+        raise ValueError(f"Filtro desconocido: {filter_type}")
+    
+    def _design_sos(self, filter_type):
+        """Diseña las secciones de segundo orden de un filtro IIR"""
         nyquist = self.sample_rate / 2
-        normal_cutoff = self.lowpass_cutoff / nyquist
-        b, a = signal.butter(2, normal_cutoff, btype='low', analog=False)
-        return signal.filtfilt(b, a, data)
+        if filter_type == 'lowpass':
+            return signal.butter(self.filter_order, self.lowpass_cutoff / nyquist, btype='low', output='sos')
+        if filter_type == 'highpass':
+            return signal.butter(self.filter_order, self.highpass_cutoff / nyquist, btype='high', output='sos')
+        if filter_type == 'notch':
+            b, a = signal.iirnotch(self.notch_freq / nyquist, self.notch_q)
+            return signal.tf2sos(b, a)
+        raise ValueError(f"Filtro desconocido: {filter_type}")
+    
+    def _get_sos(self, filter_type):
+        """Devuelve los coeficientes del filtro, diseñándolos solo si no están en caché"""
+        key = self._design_key(filter_type)
+        sos = self._design_cache.get(key)
+        if sos is None:
+            self.design_cache_misses += 1
+            sos = self._design_cache[key] = self._design_sos(filter_type)
+        else:
+            self.design_cache_hits += 1
+        return sos
+    
+    def get_design_cache_stats(self):
+        """Estadísticas de la caché de diseños de filtros"""
+        return {
+            'hits': self.design_cache_hits,
+            'misses': self.design_cache_misses,
+            'entries': len(self._design_cache)
+        }
+    
+    def _stream_filter_block(self, filter_type, values):
+        """Filtra un bloque (muestras, canales) con estado persistente: una llamada a sosfilt para todos los canales"""
+        sos = self._sos.get(filter_type)
+        if sos is None:
+            sos = self._sos[filter_type] = self._get_sos(filter_type)
+        
+        zi = self._zi.get(filter_type)
+        if zi is None:
+            # Arrancar en estado estacionario para evitar el transitorio inicial
+            zi = signal.sosfilt_zi(sos)[:, :, np.newaxis] * values[0]
+        
+        output, self._zi[filter_type] = signal.sosfilt(sos, values, axis=0, zi=zi)
+        self._last_input[filter_type] = values[-1].copy()
+        return output
+    
+    def _stream_filter_sample(self, filter_type, value):
+        """Una muestra de un canal por la cascada de secciones (forma directa II transpuesta, como sosfilt)"""
+        sos = self._sos.get(filter_type)
+        if sos is None:
+            sos = self._sos[filter_type] = self._get_sos(filter_type)
+        
+        zi = self._zi.get(filter_type)
+        if zi is None:
+            zi = signal.sosfilt_zi(sos)[:, :, np.newaxis] * value
+        
+        state = zi[:, :, 0].tolist()
+        output = value
+        for (b0, b1, b2, _, a1, a2), section in zip(sos.tolist(), state):
+            sample = output
+            output = b0 * sample + section[0]
+            section[0] = b1 * sample - a1 * output + section[1]
+            section[1] = b2 * sample - a2 * output
+        
+        self._zi[filter_type] = np.array(state)[:, :, np.newaxis]
+        self._last_input[filter_type] = np.array([value])
+        return output
+    
+    def _retune_stage(self, filter_type):
+        """Cambia los coeficientes de una etapa conservando su punto de operación"""
+        sos = self._sos[filter_type] = self._get_sos(filter_type)
+        if filter_type in self._zi and filter_type in self._last_input:
+            # Estado estacionario del nuevo filtro para la última entrada: sin saltos en la salida
+            self._zi[filter_type] = signal.sosfilt_zi(sos)[:, :, np.newaxis] * self._last_input[filter_type]
+    
+    def reset_filter_state(self):
+        """Descarta el estado de los filtros en modo streaming"""
+        self._zi.clear()
+        self.moving_avg_buffer.clear()
+        self._zero_phase_history.clear()
+    
+    def _moving_average_block(self, values):
+        """Promedio móvil causal vectorizado con sumas acumuladas"""
+        history = np.array(self.moving_avg_buffer, dtype=float).reshape(-1, values.shape[1])
+        combined = np.concatenate((history, values))
+        cumulative = np.concatenate((np.zeros((1, values.shape[1])), np.cumsum(combined, axis=0)))
+        
+        # Igual que el filtro por muestra: ventana creciente hasta llenar el buffer
+        ends = np.arange(len(history) + 1, len(combined) + 1)
+        starts = np.maximum(ends - self.moving_avg_window, 0)
+        
+        self.moving_avg_buffer.extend(values[-self.moving_avg_window:].tolist())
+        return (cumulative[ends] - cumulative[starts]) / (ends - starts)[:, np.newaxis]
+    
+    def _lowpass_filter(self, data):
+        return signal.sosfiltfilt(self._get_sos('lowpass'), data, axis=0)
     
     def _highpass_filter(self, data):
-        nyquist = self.sample_rate / 2
-        normal_cutoff = self.highpass_cutoff / nyquist
-        b, a = signal.butter(2, normal_cutoff, btype='high', analog=False)
-        return signal.filtfilt(b, a, data)
+        return signal.sosfiltfilt(self._get_sos('highpass'), data, axis=0)
     
     def _notch_filter(self, data):
-        nyquist = self.sample_rate / 2
-        normal_freq = self.notch_freq / nyquist
-        b, a = signal.iirnotch(normal_freq, 30.0)
-        return signal.filtfilt(b, a, data)
+        return signal.sosfiltfilt(self._get_sos('notch'), data, axis=0)
     
     def set_filter_state(self, filter_type, active):
         if filter_type in self.active_filters:
+            if active and not self.active_filters[filter_type]:
+                # Un filtro recién activado arranca desde la muestra actual
+                self._zi.pop(filter_type, None)
             self.active_filters[filter_type] = active
     
+    def set_channel_count(self, num_channels):
+        """Cambia la cantidad de canales; reinicia buffers, estado de filtros y calibración"""
+        if num_channels == self.num_channels:
+            return
+        self.num_channels = num_channels
+        self.data_buffer.clear()
+        self.reset_filter_state()
+        self._last_input.clear()
+        self.baseline_offset_mv = np.zeros(num_channels)
+        self.is_calibrated = False
+        if self.is_calibrating:
+            self.calibration_samples = []
+    
+    def set_filter_mode(self, mode):
+        """Selecciona 'streaming' (causal, con estado) o 'zero_phase' (filtfilt)"""
+        if mode not in ('streaming', 'zero_phase'):
+            raise ValueError(f"Modo de filtrado desconocido: {mode}")
+        if mode != self.filter_mode:
+            self.filter_mode = mode
+            self.reset_filter_state()
+    
     def set_filter_params(self, **kwargs):
-        if 'lowpass_cutoff' in kwargs:
-            self.lowpass_cutoff = kwargs['lowpass_cutoff']
-        if 'highpass_cutoff' in kwargs:
-            self.highpass_cutoff = kwargs['highpass_cutoff']
-        if 'notch_freq' in kwargs:
-            self.notch_freq = kwargs['notch_freq']
-        if 'moving_avg_window' in kwargs:
+        param_stages = {
+            'lowpass_cutoff': 'lowpass',
+            'highpass_cutoff': 'highpass',
+            'notch_freq': 'notch'
+        }
+        
+        for param, filter_type in param_stages.items():
+            if param in kwargs and kwargs[param] != getattr(self, param):
+                setattr(self, param, kwargs[param])
+                # Rediseñar solo la etapa afectada (si ya estaba en uso)
+                if filter_type in self._sos:
+                    self._retune_stage(filter_type)
+        
+        if 'moving_avg_window' in kwargs and kwargs['moving_avg_window'] != self.moving_avg_window:
             self.moving_avg_window = kwargs['moving_avg_window']
-            self.moving_avg_buffer = deque(maxlen=self.moving_avg_window)
\ No newline at end of file
+            self.moving_avg_buffer = deque(self.moving_avg_buffer, maxlen=self.moving_avg_window)
+    
+    def set_sample_rate(self, sample_rate):
+        """Cambia la frecuencia de muestreo y reajusta todas las etapas en uso"""
+        if sample_rate != self.sample_rate:
+            self.sample_rate = sample_rate
+            for filter_type in list(self._sos):
+                self._retune_stage(filter_type)
@@ -0,0 +1,71 @@
+import numpy as np
+from collections import deque
+
+class SlidingMinMax:
+    """Mínimo y máximo de una ventana deslizante con deques monótonas.
+
+    Cada muestra tiene un índice global creciente. Las deques guardan solo los
+    candidatos a extremo (índice, valor), así que agregar y expirar muestras cuesta
+    O(1) amortizado y consultar el mínimo/máximo es O(1).
+    """
+
+    def __init__(self):
+        self._max = deque()  # Valores estrictamente decrecientes
+        self._min = deque()  # Valores estrictamente crecientes
+        self.total_count = 0
+
+    def push(self, value):
+        index = self.total_count
+        while self._max and self._max[-1][1] <= value:
+            self._max.pop()
+        self._max.append((index, value))
+        while self._min and self._min[-1][1] >= value:
+            self._min.pop()
+        self._min.append((index, value))
+        self.total_count += 1
+
+    def push_block(self, values):
+        """Agrega un bloque; dentro del bloque los candidatos se filtran de forma vectorizada"""
+        values = np.asarray(values, dtype=float).ravel()
+        if len(values) == 0:
+            return
+        indices = np.arange(self.total_count, self.total_count + len(values))
+        self.total_count += len(values)
+
+        # Solo sobreviven las muestras mayores (menores) que todas las posteriores del bloque
+        later_max = np.empty_like(values)
+        later_max[:-1] = np.maximum.accumulate(values[::-1])[::-1][1:]
+        later_max[-1] = -np.inf
+        later_min = np.empty_like(values)
+        later_min[:-1] = np.minimum.accumulate(values[::-1])[::-1][1:]
+        later_min[-1] = np.inf
+
+        self._merge(self._max, indices, values, values > later_max, lambda back, new: back <= new)
+        self._merge(self._min, indices, values, values < later_min, lambda back, new: back >= new)
+
+    @staticmethod
+    def _merge(extrema, indices, values, candidates, dominated):
+        candidate_indices = indices[candidates].tolist()
+        candidate_values = values[candidates].tolist()
+        # El primer candidato es el extremo del bloque: descarta lo que domina en la deque
+        while extrema and dominated(extrema[-1][1], candidate_values[0]):
+            extrema.pop()
+        extrema.extend(zip(candidate_indices, candidate_values))
+
+    def expire(self, start_index):
+        """Descarta las muestras con índice global menor que start_index"""
+        while self._max and self._max[0][0] < start_index:
+            self._max.popleft()
+        while self._min and self._min[0][0] < start_index:
+            self._min.popleft()
+
+    def min(self):
+        return self._min[0][1]
+
+    def max(self):
+        return self._max[0][1]
+
+    def clear(self):
+        self._max.clear()
+        self._min.clear()
+        self.total_count = 0
@@ -0,0 +1,138 @@
+import time
+import numpy as np
+from collections import deque, namedtuple
+from scipy import fft, signal
+
+# Resultado por segmento: time (segmentos,) con la marca de la última muestra del segmento,
+# psd (segmentos, canales, frecuencias) promediada tipo Welch en µV²/Hz, y las
+# frecuencias mediana y media (segmentos, canales) en Hz dentro de la banda de análisis
+SpectrumFrame = namedtuple('SpectrumFrame', ['time', 'psd', 'median_freq', 'mean_freq'])
+
+
+class SpectralAnalyzer:
+    """STFT incremental con promedio de Welch sobre los últimos segmentos.
+
+    Ventana, escalas, eje de frecuencias y máscara de banda se calculan una sola
+    vez por configuración; las FFT de todos los segmentos que completa un bloque
+    se hacen en una única llamada a scipy.fft (que reutiliza su plan en caché).
+    El segmento dura segment_seconds (redondeado a potencia de 2 muestras) y
+    avanza un salto fijo, de modo que cada muestra entra en 1 / (1 - overlap)
+    FFT: el costo por muestra no crece con la frecuencia de muestreo más allá
+    del log del tamaño de la FFT.
+    """
+
+    def __init__(self, sample_rate=100, num_channels=1, segment_seconds=0.5, overlap=0.5,
+                 averages=4, band=(20.0, 450.0)):
+        self.sample_rate = sample_rate
+        self.num_channels = num_channels
+        self.segment_seconds = segment_seconds
+        self.overlap = overlap
+        self.averages = averages  # Periodogramas promediados por estimación (Welch)
+        self.band = band          # Rango de frecuencias para mediana y media (EMG de superficie)
+        self.reset()
+
+    def configure(self, sample_rate=None, segment_seconds=None, overlap=None, averages=None):
+        """Cambia parámetros y recalcula la ventana y las escalas; descarta lo acumulado"""
+        if sample_rate is not None:
+            self.sample_rate = sample_rate
+        if segment_seconds is not None:
+            self.segment_seconds = segment_seconds
+        if overlap is not None:
+            self.overlap = overlap
+        if averages is not None:
+            self.averages = averages
+        self.reset()
+
+    def reset(self):
+        self.nperseg = 1 << max(3, int(np.ceil(np.log2(self.sample_rate * self.segment_seconds))))
+        self.hop = max(1, int(round(self.nperseg * (1 - self.overlap))))
+        self.hop_seconds = self.hop / self.sample_rate
+
+        # Ventana y escala de densidad espectral (una cara), como scipy.signal.welch
+        self.window = signal.get_window('hann', self.nperseg)
+        self.frequencies = fft.rfftfreq(self.nperseg, 1.0 / self.sample_rate)
+        scale = np.full(len(self.frequencies), 2.0 / (self.sample_rate * np.sum(self.window ** 2)))
+        scale[0] /= 2
+        if self.nperseg % 2 == 0:
+            scale[-1] /= 2
+        self._scale = scale
+        self._window_column = self.window[:, np.newaxis]
+        self._band_mask = (self.frequencies >= self.band[0]) & (self.frequencies <= self.band[1])
+        self._band_frequencies = self.frequencies[self._band_mask]
+
+        self.sample_count = 0
+        self._buffer = np.zeros((0, self.num_channels))  # Muestras desde el inicio del próximo segmento
+        self._buffer_start = 0                           # Índice global de _buffer[0]
+        self._periodograms = deque(maxlen=self.averages)
+
+    def process_block(self, values, timestamps=None):
+        """Agrega un bloque (muestras,) o (muestras, canales); devuelve un SpectrumFrame o None"""
+        count = len(values)
+        if count == 0:
+            return None
+        x = np.asarray(values, dtype=float).reshape(count, -1)
+        if x.shape[1] != self.num_channels:
+            self.num_channels = x.shape[1]
+            self.reset()
+        if timestamps is None:
+            timestamps = np.full(count, time.time())
+
+        first = self.sample_count
+        self.sample_count += count
+        self._buffer = np.concatenate((self._buffer, x))
+
+        # Segmentos completos: el k-ésimo termina en nperseg - 1 + k * hop (índice global)
+        last_end = self.sample_count - 1
+        next_end = self._buffer_start + self.nperseg - 1
+        if next_end > last_end:
+            return None
+        ends = np.arange(next_end, last_end + 1, self.hop)
+        starts = ends - self.nperseg + 1 - self._buffer_start
+        segments = self._buffer[starts[:, np.newaxis] + np.arange(self.nperseg)]  # (segmentos, nperseg, canales)
+
+        # Sin la media (detrend 'constant'), ventana y FFT real de todos los segmentos juntos
+        segments = (segments - segments.mean(axis=1, keepdims=True)) * self._window_column
+        spectra = fft.rfft(segments, axis=1)
+        periodograms = (spectra.real ** 2 + spectra.imag ** 2) * self._scale[:, np.newaxis]
+        periodograms = periodograms.transpose(0, 2, 1)  # (segmentos, canales, frecuencias)
+
+        psd = np.empty_like(periodograms)
+        for row, periodogram in enumerate(periodograms):
+            self._periodograms.append(periodogram)
+            psd[row] = np.mean(self._periodograms, axis=0)
+
+        # Conservar solo desde el inicio del próximo segmento
+        next_start = int(ends[-1]) + self.hop - self.nperseg + 1
+        self._buffer = self._buffer[next_start - self._buffer_start:].copy()
+        self._buffer_start = next_start
+
+        median_freq, mean_freq = self._band_frequencies_of(psd)
+        return SpectrumFrame(
+            time=np.asarray(timestamps, dtype=float)[ends - first],
+            psd=psd,
+            median_freq=median_freq,
+            mean_freq=mean_freq
+        )
+
+    def _band_frequencies_of(self, psd):
+        """Frecuencia mediana (divide la potencia en mitades) y media ponderada por potencia"""
+        band_power = psd[..., self._band_mask]
+        if band_power.shape[-1] == 0:
+            nan = np.full(psd.shape[:-1], np.nan)
+            return nan, nan.copy()
+        cumulative = np.cumsum(band_power, axis=-1)
+        total = cumulative[..., -1]
+        median_index = np.argmax(cumulative >= total[..., np.newaxis] / 2, axis=-1)
+        median_freq = self._band_frequencies[median_index]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean_freq = np.where(total > 0, (band_power * self._band_frequencies).sum(axis=-1) / total, np.nan)
+        median_freq = np.where(total > 0, median_freq, np.nan)
+        return median_freq, mean_freq
+
+    def get_settings(self):
+        return {
+            'nperseg': self.nperseg,
+            'hop': self.hop,
+            'averages': self.averages,
+            'band_hz': list(self.band)
+        }
@@ -127,6 +127,16 @@ class ThemeManager:
             'filtered_curve_color': self.get_color('plot_curve')
         }
     
+    def apply_theme_to_plot(self, plot):
+        """Aplica el tema a un gráfico adicional (p. ej. canales extra)"""
+        plot.setBackground(self.get_color('plot_bg'))
+        axis_color = self.get_color('text_primary')
+        for axis_name in ['left', 'bottom']:
+            axis = plot.getAxis(axis_name)
+            axis.setPen(pg.mkPen(color=axis_color, width=1))
+            axis.setTextPen(pg.mkPen(color=axis_color))
+        plot.showGrid(x=True, y=True, alpha=0.3)
+    
     def get_widget_stylesheet(self):
         """Retorna stylesheet CSS para widgets específicos"""
         if CURRENT_THEME == "dark":
@@ -0,0 +1,190 @@
+import math
+import numpy as np
+
+EMPTY = np.iinfo(np.int64).min
+MIN, MAX, SUM, SQUARES = range(4)  # Agregados por intervalo: (intervalos, 4, canales)
+DECIMALS = 1  # Como filtered en los lotes (0.1 µV): números cortos en el JSON
+
+
+def _reduce(keys, starts, stats, counts):
+    """Agrupa las filas que empiezan en starts; devuelve claves, agregados y cantidades por grupo"""
+    reduced = np.empty((len(starts),) + stats.shape[1:])
+    reduced[:, MIN] = np.minimum.reduceat(stats[:, MIN], starts)
+    reduced[:, MAX] = np.maximum.reduceat(stats[:, MAX], starts)
+    reduced[:, SUM:] = np.add.reduceat(stats[:, SUM:], starts)
+    return keys[starts], reduced, np.add.reduceat(counts, starts)
+
+
+class TileAggregator:
+    """Agregados mínimo/máximo/media/RMS por intervalos de tiempo, a varias resoluciones.
+
+    Cada nivel divide el eje de tiempo (ms del dispositivo) en intervalos de
+    resolutions_ms[L] alineados a 0 y guarda, por canal, mínimo, máximo, suma,
+    suma de cuadrados y cantidad de muestras. Los intervalos viven en un arreglo
+    circular de buckets_per_level posiciones por nivel, indexado por número de
+    intervalo: extend() cuesta O(muestras del lote) y tile() O(puntos
+    devueltos), independientemente de la frecuencia de muestreo o del largo de
+    la ventana. Todos los niveles comparten un mismo arreglo, así que las
+    muestras se reducen y se acumulan en una sola pasada; extend() solo encola
+    los lotes y esa pasada se hace al pedir un tile o cada flush_samples
+    muestras, para que el costo fijo de numpy no se pague por cada lote chico.
+    """
+
+    def __init__(self, resolutions_ms=(10, 100, 1000, 10000), buckets_per_level=20000, flush_samples=4096):
+        self.resolutions_ms = tuple(resolutions_ms)
+        self.buckets_per_level = buckets_per_level
+        self.flush_samples = flush_samples
+        self._resolutions = np.array(self.resolutions_ms, dtype=float).reshape(-1, 1)
+        self.channels = None
+        self.last_time_ms = None
+        self.total_samples = 0
+        self._pending = []
+        self._pending_samples = 0
+
+    def _allocate(self, channels):
+        size = len(self.resolutions_ms) * self.buckets_per_level
+        self.channels = channels
+        # Número de intervalo guardado en cada posición (EMPTY: ninguno; los tiempos pueden ser negativos)
+        self._ids = np.full(size, EMPTY, dtype=np.int64)
+        self._stats = np.empty((size, 4, channels))
+        self._counts = np.zeros(size, dtype=np.int64)
+
+    def clear(self):
+        self.channels = None
+        self.last_time_ms = None
+        self.total_samples = 0
+        self._pending = []
+        self._pending_samples = 0
+
+    def extend(self, times_ms, values):
+        """Agrega muestras: times_ms (muestras,), values (muestras,) o (muestras, canales)"""
+        times_ms = np.asarray(times_ms, dtype=float)
+        values = np.asarray(values, dtype=float)
+        if len(times_ms) == 0:
+            return
+        values = values.reshape(len(times_ms), -1)
+        if self._pending and values.shape[1] != self._pending[-1][1].shape[1]:
+            self._flush()
+
+        self._pending.append((times_ms, values))
+        self._pending_samples += len(times_ms)
+        self.last_time_ms = float(times_ms.max())
+        self.total_samples += len(times_ms)
+        if self._pending_samples >= self.flush_samples:
+            self._flush()
+
+    def _flush(self):
+        """Acumula los lotes encolados"""
+        if not self._pending:
+            return
+        times_ms = np.concatenate([times for times, _ in self._pending])
+        values = np.concatenate([values for _, values in self._pending])
+        self._pending = []
+        self._pending_samples = 0
+        if values.shape[1] != self.channels:
+            self._allocate(values.shape[1])  # Otra configuración de canales: se empieza de cero
+
+        if np.any(times_ms[1:] < times_ms[:-1]):
+            order = np.argsort(times_ms, kind='stable')
+            times_ms, values = times_ms[order], values[order]
+
+        # Un lote que abarca más intervalos finos de los que se guardan se acumula por partes
+        span = self.buckets_per_level * self.resolutions_ms[0]
+        if times_ms[-1] - times_ms[0] >= span:
+            cuts = np.searchsorted(times_ms, np.arange(times_ms[0], times_ms[-1], span / 2)[1:])
+            for chunk_times, chunk_values in zip(np.split(times_ms, cuts), np.split(values, cuts)):
+                if len(chunk_times):
+                    self._accumulate(chunk_times, chunk_values)
+        else:
+            self._accumulate(times_ms, values)
+
+    def _accumulate(self, times_ms, values):
+        samples = len(times_ms)
+        levels = len(self.resolutions_ms)
+        # Intervalo de cada muestra en cada nivel: (niveles, muestras), ordenado en cada fila
+        buckets = np.floor(times_ms / self._resolutions).astype(np.int64)
+        change = np.ones(buckets.shape, dtype=bool)
+        change[:, 1:] = buckets[:, 1:] != buckets[:, :-1]
+        starts = np.flatnonzero(change)
+
+        stats = np.empty((samples, 4, self.channels))
+        stats[:, MIN] = stats[:, MAX] = stats[:, SUM] = values
+        stats[:, SQUARES] = values * values
+        stats = np.broadcast_to(stats, (levels,) + stats.shape).reshape(-1, 4, self.channels)
+        buckets, stats, counts = _reduce(buckets.ravel(), starts, stats, np.ones(levels * samples, dtype=np.int64))
+        slots = (starts // samples) * self.buckets_per_level + buckets % self.buckets_per_level
+
+        # Intervalos que ya tenían muestras (en general solo el primero de cada nivel) se combinan;
+        # el resto reemplaza lo que hubiera en la posición
+        existing = self._ids[slots] == buckets
+        if existing.any():
+            rows = slots[existing]
+            merged = self._stats[rows]
+            np.minimum(merged[:, MIN], stats[existing, MIN], out=merged[:, MIN])
+            np.maximum(merged[:, MAX], stats[existing, MAX], out=merged[:, MAX])
+            merged[:, SUM:] += stats[existing, SUM:]
+            stats[existing] = merged
+            counts[existing] += self._counts[rows]
+        self._ids[slots] = buckets
+        self._stats[slots] = stats
+        self._counts[slots] = counts
+
+    def _level_for(self, t0_ms, t1_ms, pixels):
+        """Nivel más fino que entra en pixels intervalos y todavía guarda t0; si no hay, el más grueso"""
+        for level, resolution in enumerate(self.resolutions_ms):
+            first, last = math.floor(t0_ms / resolution), math.floor(t1_ms / resolution)
+            newest = math.floor(self.last_time_ms / resolution)
+            if last - first + 1 <= pixels and first > newest - self.buckets_per_level:
+                return level
+        return len(self.resolutions_ms) - 1
+
+    def tile(self, t0_ms, t1_ms, pixels):
+        """Serie de como mucho pixels intervalos entre t0_ms y t1_ms más estadísticas de la ventana.
+
+        Devuelve un dict con resolution_ms y, por intervalo con muestras, time_ms (inicio
+        del intervalo), min y max como listas por canal; stats tiene mínimo, máximo,
+        media y RMS de la ventana completa (los intervalos de los extremos pueden
+        exceder t0_ms/t1_ms).
+        Si ningún nivel alcanza, los intervalos del más grueso se agrupan de a varios.
+        """
+        self._flush()
+        pixels = max(1, int(pixels))
+        empty = {'resolution_ms': self.resolutions_ms[0], 'channels': self.channels or 0, 'time_ms': [],
+                 'min': [], 'max': [], 'stats': None}
+        if self.channels is None or t1_ms < t0_ms:
+            return empty
+
+        level = self._level_for(t0_ms, t1_ms, pixels)
+        resolution = self.resolutions_ms[level]
+        first, last = math.floor(t0_ms / resolution), math.floor(t1_ms / resolution)
+        first = max(first, last - self.buckets_per_level + 1)
+        buckets = np.arange(first, last + 1, dtype=np.int64)
+        slots = level * self.buckets_per_level + buckets % self.buckets_per_level
+        present = self._ids[slots] == buckets
+        buckets, slots = buckets[present], slots[present]
+        if len(buckets) == 0:
+            return dict(empty, resolution_ms=resolution)
+
+        group = max(1, math.ceil((last - first + 1) / pixels))
+        keys = (buckets - first) // group
+        starts = np.concatenate(([0], np.flatnonzero(keys[1:] != keys[:-1]) + 1))
+        keys, stats, counts = _reduce(keys, starts, self._stats[slots], self._counts[slots])
+        mins, maxs, sums, squares = stats[:, MIN], stats[:, MAX], stats[:, SUM], stats[:, SQUARES]
+
+        times = (first + keys * group) * resolution
+        total = int(counts.sum())
+        stats = {
+            'min': np.round(mins.min(axis=0), DECIMALS).tolist(),
+            'max': np.round(maxs.max(axis=0), DECIMALS).tolist(),
+            'mean': np.round(sums.sum(axis=0) / total, DECIMALS).tolist(),
+            'rms': np.round(np.sqrt(squares.sum(axis=0) / total), DECIMALS).tolist(),
+            'count': total
+        }
+        return {
+            'resolution_ms': resolution * group,
+            'channels': self.channels,
+            'time_ms': times.tolist(),
+            'min': np.round(mins.T, DECIMALS).tolist(),
+            'max': np.round(maxs.T, DECIMALS).tolist(),
+            'stats': stats
+        }
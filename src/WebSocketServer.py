@@ -1,5 +1,6 @@
 import asyncio
 import json
+import numpy as np
 import websockets
 from PySide6.QtCore import QThread, Signal
 import threading
@@ -109,6 +110,51 @@ class WebSocketServer(QThread):
                 self.loop
             )
     
+    def send_block(self, raw_values, filtered_values, timestamps=None):
+        """Envía un bloque de muestras en un solo mensaje, con una columna por canal"""
+        if not self.connected_clients or not self.is_running:
+            return
+        
+        count = len(raw_values)
+        raw_columns = np.asarray(raw_values, dtype=float).reshape(count, -1).T
+        filtered_columns = np.asarray(filtered_values, dtype=float).reshape(count, -1).T
+        
+        message = {
+            "type": "emg_block",
+            "timestamp": datetime.now().isoformat(),
+            "channels": raw_columns.shape[0],
+            "timestamps": None if timestamps is None else np.asarray(timestamps, dtype=float).tolist(),
+            "raw_values": raw_columns.tolist(),
+            "filtered_values": filtered_columns.tolist()
+        }
+        
+        if self.loop:
+            asyncio.run_coroutine_threadsafe(
+                self._broadcast_message(json.dumps(message)),
+                self.loop
+            )
+    
+    def send_events(self, events):
+        """Reenvía eventos de activación (OnsetDetector) ya detectados, sin la señal"""
+        if not self.connected_clients or not self.is_running or not events:
+            return
+        
+        message = {
+            "type": "emg_events",
+            "timestamp": datetime.now().isoformat(),
+            "events": [
+                {"time": event.time, "detected_at": event.detected_at, "channel": event.channel,
+                 "event": event.kind, "envelope_uv": event.envelope_uv, "threshold_uv": event.threshold_uv}
+                for event in events
+            ]
+        }
+        
+        if self.loop:
+            asyncio.run_coroutine_threadsafe(
+                self._broadcast_message(json.dumps(message)),
+                self.loop
+            )
+    
     async def _broadcast_message(self, message):
         if self.connected_clients:
             disconnected = set()
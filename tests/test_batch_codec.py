@@ -0,0 +1,222 @@
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pytest
+from PySide6.QtCore import QCoreApplication
+
+from BatchCodec import columnar_batch, decode_batch, encode_batch, samples_batch
+
+
+@pytest.fixture
+def qt_app():
+    return QCoreApplication.instance() or QCoreApplication([])
+
+
+class _Receiver(BaseHTTPRequestHandler):
+    """Receptor local: decodifica cada lote como reciver.php y anota la conexión usada"""
+    protocol_version = 'HTTP/1.1'  # Keep-alive
+    disable_nagle_algorithm = True  # Cabeceras y cuerpo de la respuesta van en escrituras separadas
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        if self.server.fail_next > 0:
+            self.server.fail_next -= 1
+            self.send_response(503)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        batch = decode_batch(body, self.headers.get('Content-Encoding'))
+        if batch.get('batch_id') in {stored.get('batch_id') for stored in self.server.batches}:
+            batch['samples'] = []  # Repetido: se confirma sin guardarlo (como reciver.php)
+        else:
+            self.server.batches.append(batch)
+        self.server.wire_bytes.append(len(body))
+        self.server.connections.add(self.client_address)
+
+        response = json.dumps({'status': 'success', 'samples_received': len(batch['samples'])}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(response)))
+        self.end_headers()
+        self.wfile.write(response)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def receiver():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _Receiver)
+    server.batches, server.wire_bytes, server.connections = [], [], set()
+    server.fail_next = 0  # Cantidad de peticiones a responder con 503
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "tiempo de espera agotado"
+        time.sleep(0.01)
+
+
+def _by_sequence(batches):
+    """Lotes ordenados por número de secuencia (con varios en vuelo pueden llegar desordenados)"""
+    return sorted(batches, key=lambda batch: int(batch['batch_id'].rsplit('-', 1)[1]))
+
+
+def _block(count, channels, start_ms=0.0):
+    rng = np.random.default_rng(channels)
+    times_ms = start_ms + np.arange(count) * 10.0 + rng.uniform(-0.3, 0.3, count)
+    raw = np.round(rng.integers(3000, 4000, (count, channels)) * 0.1875, 4)
+    filtered = rng.normal(0, 80, (count, channels))
+    return times_ms, raw, filtered
+
+
+@pytest.mark.parametrize('channels', [1, 3])
+def test_columnar_round_trip_matches_per_sample_format(channels):
+    times_ms, raw, filtered = _block(200, channels, start_ms=123456.7)
+    extra = {"timestamp": "2024-01-01T00:00:00", "batch_time_ms": 1.0, "events": [{"time_ms": 5.0}]}
+
+    body, headers = encode_batch(columnar_batch(times_ms, raw, filtered, **extra))
+    assert headers['Content-Encoding'] == 'gzip'
+    assert decode_batch(body, 'gzip') == samples_batch(times_ms, raw, filtered, **extra)
+
+    # El formato por muestra sin comprimir (el original) pasa sin cambios
+    legacy, legacy_headers = encode_batch(samples_batch(times_ms, raw, filtered, **extra), compress=False)
+    assert 'Content-Encoding' not in legacy_headers
+    assert decode_batch(legacy) == samples_batch(times_ms, raw, filtered, **extra)
+    assert len(body) * 3 < len(legacy)
+
+
+def test_empty_columnar_batch():
+    body, _ = encode_batch(columnar_batch(np.zeros(0), np.zeros((0, 1)), np.zeros((0, 1)), timestamp="t"))
+    assert decode_batch(body, 'gzip') == {"timestamp": "t", "samples": []}
+
+
+def test_http_sender_reuses_connection_and_round_trips(qt_app, receiver):
+    from HTTPSender import HTTPSender
+    sender = HTTPSender(receiver_url=f"http://127.0.0.1:{receiver.server_port}/reciver.php", max_in_flight=4)
+    sender.start_transmission()
+    sender.batch_timer.stop()
+
+    start = sender.session_start_time / 1000
+    expected = []
+    for batch in range(5):
+        times_ms, raw, filtered = _block(20, 2, start_ms=batch * 200.0)
+        sender.add_block(raw, filtered, timestamps=start + times_ms / 1000)
+        expected.append(samples_batch(times_ms, raw, filtered)["samples"])
+        sender._queue_batch_send()
+    _wait_for(lambda: sender.batches_sent == 5)
+
+    assert len(receiver.batches) == 5
+    for batch, samples in zip(_by_sequence(receiver.batches), expected):
+        np.testing.assert_allclose([s["time_ms"] for s in batch["samples"]], [s["time_ms"] for s in samples], atol=0.051)
+        assert [s["raw"] for s in batch["samples"]] == [s["raw"] for s in samples]
+        assert [s["filtered"] for s in batch["samples"]] == [s["filtered"] for s in samples]
+    assert len(receiver.connections) <= sender.max_in_flight  # Conexiones reutilizadas entre lotes
+    assert sender.get_stats()['wire_bytes'] == sum(receiver.wire_bytes)
+    assert sender.batches_sent == 5
+
+
+def test_http_sender_spools_and_replays_in_order_after_outage(qt_app, receiver, tmp_path):
+    from HTTPSender import HTTPSender
+    receiver.fail_next = 3
+    sender = HTTPSender(receiver_url=f"http://127.0.0.1:{receiver.server_port}/reciver.php",
+                        spool_directory=str(tmp_path), initial_backoff=0.05, max_backoff=0.2)
+    sender.start_transmission()
+    sender.batch_timer.stop()
+
+    start = sender.session_start_time / 1000
+    for batch in range(8):
+        times_ms, raw, filtered = _block(10, 1, start_ms=batch * 100.0)
+        sender.add_block(raw, filtered, timestamps=start + times_ms / 1000)
+        sender._queue_batch_send()
+        if batch == 0:
+            _wait_for(lambda: sender.get_stats()['spooled_batches'] > 0)  # Primer fallo: pasa a disco
+
+    # El contador sube antes de que la confirmación borre el spool
+    _wait_for(lambda: sender.batches_sent == 8 and os.listdir(tmp_path) == [])
+    ids = [batch['batch_id'] for batch in _by_sequence(receiver.batches)]
+    assert ids == [f"{sender.sender_id}-{sequence}" for sequence in range(1, 9)]  # Todos, una sola vez
+
+    stats = sender.get_stats()
+    assert stats['spooled_batches'] == 0 and stats['queued_batches'] == 0
+    assert stats['oldest_unsent_s'] is None and stats['retry_in_s'] is None
+    assert stats['dropped_batches'] == 0 and os.listdir(tmp_path) == []
+
+
+def test_http_sender_single_connection_when_one_in_flight(qt_app, receiver):
+    from HTTPSender import HTTPSender
+    sender = HTTPSender(receiver_url=f"http://127.0.0.1:{receiver.server_port}/reciver.php", max_in_flight=1)
+    sender.start_transmission()
+    sender.batch_timer.stop()
+    for batch in range(5):
+        sender.add_block(*_block(10, 1)[1:])
+        sender._queue_batch_send()
+    _wait_for(lambda: sender.batches_sent == 5)
+
+    ids = [batch['batch_id'] for batch in receiver.batches]
+    assert ids == [f"{sender.sender_id}-{sequence}" for sequence in range(1, 6)]  # En orden
+    assert len(receiver.connections) == 1
+
+
+def test_acknowledgements_release_batches_in_order(qt_app, tmp_path):
+    from HTTPSender import HTTPSender, PendingBatch
+    sender = HTTPSender(receiver_url="http://127.0.0.1:9/", spool_directory=str(tmp_path))
+    sender.http_thread_running = False  # Las respuestas se simulan a mano
+    sender.http_thread.join()
+    for sequence in range(1, 4):
+        sender.spool.append(f"s-{sequence}", b"x")
+    sender._pending.extend(PendingBatch(f"m-{sequence}", b"y", 0.0, None) for sequence in range(1, 4))
+    sender._in_flight.update(["s-1", "s-2", "s-3", "m-1"])
+
+    def ack(batch_id, status=200):
+        sender._handle_ack({'batch_id': batch_id, 'status': status, 'rtt': 0.05, 'bytes': 100, 'times_ms': None})
+
+    ack("s-2")
+    ack("m-1")
+    assert len(sender.spool) == 3 and len(sender._pending) == 3  # Falta confirmar s-1
+    ack("s-1")
+    assert len(sender.spool) == 1 and sender.spool.batch_id() == "s-3"
+
+    ack("s-3", status=503)  # Falla: queda primero para el reintento, los de memoria pasan al spool
+    assert sender._failures == 1 and sender._retry_at > 0
+    assert [sender.spool.batch_id(i) for i in range(len(sender.spool))] == ["s-3", "m-1", "m-2", "m-3"]
+    assert sender._unsent_count() == 3  # m-1 ya confirmado
+
+    sender._in_flight.add("s-3")
+    ack("s-3")
+    assert [sender.spool.batch_id(i) for i in range(len(sender.spool))] == ["m-2", "m-3"]
+    assert sender._failures == 0 and sender.batches_sent == 4 and sender._acked == set()
+
+
+def test_spool_overflow_forgets_in_flight_and_acked_batches(qt_app, tmp_path):
+    from HTTPSender import HTTPSender
+    sender = HTTPSender(receiver_url="http://127.0.0.1:9/", spool_directory=str(tmp_path), max_in_flight=4)
+    sender.http_thread_running = False  # Las respuestas se simulan a mano
+    sender.http_thread.join()
+    sender.spool.max_bytes, sender.spool.segment_bytes = 1500, 500
+    for sequence in range(1, 5):
+        sender._spool_append(f"s-{sequence}", b"x" * 100)
+    sender._in_flight.update(["s-1", "s-2", "s-3"])
+    sender._acked.add("s-4")  # Confirmado detrás de s-1..s-3
+
+    for sequence in range(5, 20):
+        sender._spool_append(f"s-{sequence}", b"x" * 100)
+
+    remaining = [sender.spool.batch_id(i) for i in range(len(sender.spool))]
+    assert "s-1" not in remaining and sender.spool.dropped_batches == 19 - len(remaining)
+    assert sender._in_flight == set() and sender._acked == set()
+    assert sender._unsent_count() == len(remaining)
+
+    # La respuesta tardía de un lote descartado se ignora
+    sender._handle_ack({'batch_id': "s-2", 'status': 200, 'rtt': 0.05, 'bytes': 100, 'times_ms': None})
+    assert sender.batches_sent == 0 and len(sender.spool) == len(remaining)
@@ -0,0 +1,45 @@
+from BatchIntervalController import BatchIntervalController
+
+
+def test_interval_floor_follows_rtt_over_concurrency():
+    controller = BatchIntervalController(base_interval_ms=200, max_in_flight=4, headroom=1.5, smoothing=1.0)
+    controller.record_ack(0.1, 1000)
+    assert controller.update(backlog=0) == 190  # 1.5 · 100 ms / 4 < 100 ms: baja hacia min_interval_ms
+
+    controller.record_ack(2.0, 1000)  # Enlace lento: 1.5 · 2 s / 4 = 750 ms
+    assert controller.update(backlog=0) == 750
+
+    controller = BatchIntervalController(max_in_flight=1, max_interval_ms=2000, smoothing=1.0)
+    controller.record_ack(5.0, 1000)
+    assert controller.update(backlog=0) == 2000
+
+
+def test_backlog_grows_interval_and_recovery_returns_to_base():
+    controller = BatchIntervalController(base_interval_ms=200, max_in_flight=4)
+    intervals = [controller.update(backlog=10) for _ in range(5)]
+    assert intervals == sorted(intervals) and intervals[-1] > 500
+
+    for _ in range(100):
+        interval = controller.update(backlog=0)
+    assert interval == 200
+
+
+def test_fast_link_drives_interval_below_base():
+    controller = BatchIntervalController(base_interval_ms=200, min_interval_ms=100, max_in_flight=4, smoothing=1.0)
+    controller.record_ack(0.02, 1000)
+    intervals = [controller.update(backlog=0) for _ in range(100)]
+    assert intervals == sorted(intervals, reverse=True)
+    assert intervals[-1] == 100
+
+    controller.record_ack(0.4, 1000)  # Piso del RTT: 1.5 · 400 ms / 4 = 150 ms
+    for _ in range(100):
+        interval = controller.update(backlog=0)
+    assert interval == 150
+
+
+def test_offered_rate_above_capacity_counts_as_saturation():
+    controller = BatchIntervalController(base_interval_ms=200, max_in_flight=2, smoothing=1.0)
+    controller.record_ack(0.05, 1000)   # 20 kB/s por petición, 40 kB/s en total
+    controller.record_batch(10000)      # 10 kB cada 200 ms = 50 kB/s ofrecidos
+    assert controller.update(backlog=0) == 250
+    assert controller.get_settings()['rtt_ms'] == 50.0
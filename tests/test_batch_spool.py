@@ -0,0 +1,58 @@
+import os
+
+from BatchSpool import BatchSpool
+
+
+def _fill(spool, count, size=100, start=0):
+    for index in range(start, start + count):
+        spool.append(f"id-{index}", bytes([index % 256]) * size, created=1000.0 + index)
+
+
+def _drain(spool):
+    batches = []
+    while len(spool):
+        batches.append(spool.peek())
+        spool.pop()
+    return batches
+
+
+def test_fifo_across_segments_and_reopen(tmp_path):
+    spool = BatchSpool(str(tmp_path), segment_bytes=1000)
+    _fill(spool, 30)
+    assert len(spool) == 30 and len(os.listdir(tmp_path)) > 3
+
+    for _ in range(12):
+        spool.pop()
+    assert spool.oldest_age(now=1020.0) == 8.0
+    spool.close()
+
+    # Al reabrir continúa desde el cursor; los segmentos confirmados ya no están
+    reopened = BatchSpool(str(tmp_path), segment_bytes=1000)
+    assert len(reopened) == 18
+    _fill(reopened, 5, start=30)
+    batches = _drain(reopened)
+    assert [batch.batch_id for batch in batches] == [f"id-{index}" for index in range(12, 35)]
+    assert batches[0].body == bytes([12]) * 100 and batches[0].compressed
+    assert os.listdir(tmp_path) == [] and reopened.bytes == 0
+
+
+def test_truncated_tail_is_discarded(tmp_path):
+    spool = BatchSpool(str(tmp_path))
+    _fill(spool, 3)
+    spool.close()
+    segment = os.path.join(tmp_path, sorted(os.listdir(tmp_path))[0])
+    with open(segment, 'r+b') as f:
+        f.truncate(os.path.getsize(segment) - 10)  # Último registro a medio escribir
+
+    reopened = BatchSpool(str(tmp_path))
+    assert [batch.batch_id for batch in _drain(reopened)] == ["id-0", "id-1"]
+
+
+def test_size_limit_drops_oldest_segments(tmp_path):
+    spool = BatchSpool(str(tmp_path), max_bytes=3000, segment_bytes=1000)
+    _fill(spool, 50)
+    assert spool.bytes <= 3000 + 1000
+    assert spool.dropped_batches + len(spool) == 50
+    assert spool.dropped_batches > 0
+    ids = [batch.batch_id for batch in _drain(spool)]
+    assert ids == [f"id-{index}" for index in range(50 - len(ids), 50)]
@@ -0,0 +1,429 @@
+"""
+Benchmarks de throughput por etapa del pipeline.
+
+Por defecto solo corre la verificación numérica contra scipy. Los benchmarks se
+habilitan con la variable de entorno EMG_BENCHMARKS:
+
+    EMG_BENCHMARKS=1 python -m pytest -q tests/test_benchmarks.py -s       # comparar con las bases
+    EMG_BENCHMARKS=update python -m pytest -q tests/test_benchmarks.py -s  # reescribir las bases
+
+Cada etapa reporta operaciones por segundo y el costo p50/p99 por llamada, y
+falla si el throughput cae por debajo de la base guardada en
+benchmark_baselines.json menos la tolerancia (EMG_BENCHMARK_TOLERANCE, 0.5 por defecto).
+
+Para que una corrida ruidosa no falle sola: cada medición se repite
+EMG_BENCHMARK_REPEATS veces (3 por defecto) y cuenta la repetición mediana, y
+una carga de referencia fija medida en la misma corrida escala la base cuando
+la máquina está más lenta que cuando se grabaron las bases. Una base solo se
+cambia en un commit que explique por qué.
+"""
+
+import asyncio
+import itertools
+import json
+import os
+import threading
+import time
+
+import numpy as np
+import pytest
+from scipy import signal
+
+from SignalProcessor import SignalProcessor
+
+BENCHMARK_MODE = os.environ.get('EMG_BENCHMARKS', '')
+TOLERANCE = float(os.environ.get('EMG_BENCHMARK_TOLERANCE', '0.5'))
+REPEATS = max(1, int(os.environ.get('EMG_BENCHMARK_REPEATS', '3')))
+REFERENCE_NAME = "_referencia[json.dumps + numpy chico]"
+BASELINES_PATH = os.path.join(os.path.dirname(__file__), 'benchmark_baselines.json')
+FILTERS = ('notch', 'lowpass', 'highpass', 'moving_avg')
+
+benchmark = pytest.mark.skipif(not BENCHMARK_MODE, reason="Definir EMG_BENCHMARKS=1 para correr los benchmarks")
+
+
+def _filter_combinations():
+    return [combination for size in range(len(FILTERS) + 1)
+            for combination in itertools.combinations(FILTERS, size)]
+
+
+def _combination_name(combination):
+    return '+'.join(combination) or 'none'
+
+
+def _test_signal(n, sample_rate=100, channels=1):
+    t = np.arange(n) / sample_rate
+    rng = np.random.default_rng(0)
+    base = 3552 + 200 * np.sin(2 * np.pi * 7 * t) + 50 * np.sin(2 * np.pi * 50 * t)
+    return base[:, np.newaxis] + rng.normal(0, 20, (n, channels))
+
+
+# --- Verificación numérica (siempre activa) ---
+
+def _scipy_reference(processor, raw):
+    """Salida esperada con scipy directamente: promedio móvil causal y luego la cadena de sosfilt"""
+    values = (raw * processor.ads_resolution - 666.0) / processor.system_gain * 1000
+
+    if processor.active_filters['moving_avg']:
+        window = processor.moving_avg_window
+        cumulative = np.concatenate((np.zeros((1, values.shape[1])), np.cumsum(values, axis=0)))
+        ends = np.arange(1, len(values) + 1)
+        starts = np.maximum(ends - window, 0)
+        values = (cumulative[ends] - cumulative[starts]) / (ends - starts)[:, np.newaxis]
+
+    for filter_type in processor.filter_chain:
+        if processor.active_filters[filter_type]:
+            sos = processor._design_sos(filter_type)
+            zi = signal.sosfilt_zi(sos)[:, :, np.newaxis] * values[0]
+            values, _ = signal.sosfilt(sos, values, axis=0, zi=zi)
+    return values
+
+
+@pytest.mark.parametrize('combination', _filter_combinations(), ids=_combination_name)
+def test_fast_filter_paths_match_scipy_reference(combination):
+    raw = _test_signal(600, channels=2)
+    block_sizes = itertools.cycle([1, 7, 64, 3, 150])
+
+    per_sample = SignalProcessor(num_channels=2)
+    block = SignalProcessor(num_channels=2)
+    for processor in (per_sample, block):
+        for filter_type in combination:
+            processor.set_filter_state(filter_type, True)
+
+    output_per_sample = np.array([per_sample.add_sample(row) for row in raw])
+    output_block = []
+    position = 0
+    while position < len(raw):
+        size = next(block_sizes)
+        output_block.append(block.process_block(raw[position:position + size])[1])
+        position += size
+    output_block = np.concatenate(output_block)
+
+    expected = _scipy_reference(per_sample, raw)
+    np.testing.assert_allclose(output_per_sample, expected, rtol=1e-9, atol=1e-9)
+    np.testing.assert_allclose(output_block, expected, rtol=1e-9, atol=1e-9)
+
+
+# --- Medición y comparación con las bases ---
+
+_results = {}
+
+
+def _measure(function, arguments, items_per_call=1, warmup=100, repeats=None):
+    """Mide cada llamada por separado, repeats veces sobre los mismos argumentos.
+
+    Devuelve el throughput de la repetición mediana y los percentiles del costo
+    por ítem de todas las llamadas.
+    """
+    for argument in arguments[:warmup]:
+        function(argument)
+
+    repeats = repeats or REPEATS
+    durations = np.empty((repeats, len(arguments)))
+    clock = time.perf_counter_ns
+    for repeat in range(repeats):
+        for i, argument in enumerate(arguments):
+            start = clock()
+            function(argument)
+            durations[repeat, i] = clock() - start
+
+    throughputs = len(arguments) * items_per_call / (durations.sum(axis=1) / 1e9)
+    per_item_us = durations.ravel() / 1000 / items_per_call
+    return {
+        'items_per_second': round(float(np.median(throughputs))),
+        'p50_us': round(float(np.percentile(per_item_us, 50)), 3),
+        'p99_us': round(float(np.percentile(per_item_us, 99)), 3)
+    }
+
+
+_reference = {}
+
+
+def _reference_result():
+    """Carga fija parecida a las etapas (Python puro y numpy chico), medida una vez por corrida"""
+    if 'result' not in _reference:
+        values = np.arange(64.0)
+        payload = {"time_ms": 1.0, "raw": 666.1875, "filtered": 12.3}
+
+        def work(index):
+            json.dumps(payload)
+            float(np.sum(values * index))
+
+        _reference['result'] = _measure(work, list(range(20000)), repeats=5)
+    return _reference['result']
+
+
+def _machine_scale(baselines):
+    """Velocidad de esta corrida respecto de la de las bases (como mucho 1: no se endurece la base)"""
+    reference = _reference_result()
+    _results[REFERENCE_NAME] = reference
+    recorded = baselines.get(REFERENCE_NAME)
+    if recorded is None:
+        return 1.0
+    return min(1.0, reference['items_per_second'] / recorded['items_per_second'])
+
+
+def _check(name, result):
+    _results[name] = result
+    print(f"\n{name:<60} {result['items_per_second']:>12,} /s   "
+          f"p50 {result['p50_us']:>9.2f} µs   p99 {result['p99_us']:>9.2f} µs", end='')
+    with open(BASELINES_PATH) as f:
+        baselines = json.load(f)
+    scale = _machine_scale(baselines)
+    if BENCHMARK_MODE == 'update':
+        return
+
+    baseline = baselines.get(name)
+    if baseline is None:
+        pytest.fail(f"Sin base para {name}: correr con EMG_BENCHMARKS=update")
+    minimum = baseline['items_per_second'] * (1 - TOLERANCE) * scale
+    assert result['items_per_second'] >= minimum, (
+        f"{name}: {result['items_per_second']:,}/s por debajo de la base "
+        f"{baseline['items_per_second']:,}/s (tolerancia {TOLERANCE:.0%}, máquina al {scale:.0%})"
+    )
+
+
+@pytest.fixture(scope='module', autouse=True)
+def _write_baselines():
+    yield
+    if BENCHMARK_MODE == 'update' and _results:
+        baselines = {}
+        if os.path.exists(BASELINES_PATH):
+            with open(BASELINES_PATH) as f:
+                baselines = json.load(f)
+        baselines.update(_results)
+        with open(BASELINES_PATH, 'w') as f:
+            json.dump(dict(sorted(baselines.items())), f, indent=2, ensure_ascii=False)
+            f.write('\n')
+
+
+@pytest.fixture(scope='module')
+def qt_app():
+    from PySide6.QtWidgets import QApplication
+    return QApplication.instance() or QApplication([])
+
+
+# --- Etapas ---
+
+@benchmark
+@pytest.mark.parametrize('combination', _filter_combinations(), ids=_combination_name)
+def test_signal_processor_add_sample(combination):
+    processor = SignalProcessor()
+    for filter_type in combination:
+        processor.set_filter_state(filter_type, True)
+    raw = _test_signal(3000)[:, 0].tolist()
+    _check(f"SignalProcessor.add_sample[{_combination_name(combination)}]",
+           _measure(processor.add_sample, raw))
+
+
+@benchmark
+def test_signal_processor_process_block():
+    processor = SignalProcessor()
+    for filter_type in FILTERS:
+        processor.set_filter_state(filter_type, True)
+    blocks = list(_test_signal(100 * 3000).reshape(3000, 100))
+    _check("SignalProcessor.process_block[all, 100 muestras]",
+           _measure(processor.process_block, blocks, items_per_call=100))
+
+
+@benchmark
+def test_spectral_analyzer_process_block():
+    from SpectralAnalyzer import SpectralAnalyzer
+    analyzer = SpectralAnalyzer(sample_rate=4000)
+    blocks = list(_test_signal(100 * 3000, sample_rate=4000).reshape(3000, 100))
+    _check("SpectralAnalyzer.process_block[4 kHz, 100 muestras]",
+           _measure(analyzer.process_block, blocks, items_per_call=100))
+
+
+@benchmark
+def test_main_window_add_data_point(qt_app):
+    from MainWindow import MainWindow
+    window = MainWindow()
+    window.plot_timer.stop()
+    potentials = _test_signal(5000)[:, 0].tolist()
+    _check("MainWindow.add_data_point",
+           _measure(lambda value: window.add_data_point(value, value), potentials))
+
+
+@benchmark
+def test_main_window_update_plots(qt_app):
+    from MainWindow import MainWindow
+    window = MainWindow()
+    window.plot_timer.stop()
+    window.time_window_ms = 120000
+    window.set_sample_rate(1000)
+    window.is_calibrated = True
+
+    # Ventana de 120 s completa a 1 kHz
+    start = time.time() - 120
+    for second in range(120):
+        values = _test_signal(1000)[:, 0]
+        window.add_data_block(values, values, timestamps=start + second + np.arange(1000) / 1000)
+    _check("MainWindow.update_plots[120 s a 1 kHz, por cuadro]",
+           _measure(lambda _: window.update_plots(), list(range(200)), warmup=10))
+
+
+@benchmark
+def test_data_logger_log_sample(tmp_path):
+    from DataLogger import DataLogger
+    logger = DataLogger(base_directory=str(tmp_path), queue_max_blocks=100000)
+    logger.start_logging()
+    values = _test_signal(20000)[:, 0].tolist()
+    try:
+        _check("DataLogger.log_sample", _measure(lambda value: logger.log_sample(value, value), values))
+    finally:
+        logger.stop_logging()
+    assert logger.dropped_samples == 0
+
+
+@benchmark
+def test_http_sender_add_sample_batching(qt_app):
+    from HTTPSender import HTTPSender
+    sender = HTTPSender()
+    sender.http_thread_running = False  # Sin envíos reales: solo armado de lotes
+    sender.start_transmission()
+    sender.batch_timer.stop()
+
+    def add_and_batch(index):
+        sender.add_sample(float(index), float(index))
+        if index % 20 == 19:
+            sender._queue_batch_send()  # Lote cada 200 ms a 100 Hz
+
+    _check("HTTPSender.add_sample[lotes de 20]", _measure(add_and_batch, list(range(20000))))
+
+
+class _NullClient:
+    async def send(self, message):
+        pass
+
+
+@benchmark
+def test_websocket_server_broadcast(qt_app):
+    from WebSocketServer import WebSocketServer
+    server = WebSocketServer()
+    server.loop = asyncio.new_event_loop()
+    server.is_running = True
+    server.connected_clients = {_NullClient() for _ in range(10)}
+    thread = threading.Thread(target=server.loop.run_forever, daemon=True)
+    thread.start()
+
+    values = _test_signal(5000)[:, 0].tolist()
+    try:
+        _check("WebSocketServer.send_data[10 clientes]",
+               _measure(lambda value: server.send_data(value, value), values))
+
+        message = json.dumps({"type": "emg_data", "raw_value": 1.0, "filtered_value": 1.0})
+        broadcast = lambda _: asyncio.run_coroutine_threadsafe(
+            server._broadcast_message(message), server.loop).result()
+        _check("WebSocketServer._broadcast_message[10 clientes]", _measure(broadcast, list(range(2000))))
+    finally:
+        server.loop.call_soon_threadsafe(server.loop.stop)
+        thread.join()
+
+
+# --- Receptor web: IngestServer frente al diseño de reciver.php / get_data.php ---
+
+def _web_batch(index, samples=20):
+    """Lote por muestra como lo guarda el receptor (200 ms a 100 Hz)"""
+    return {
+        "timestamp": f"2024-01-01T00:00:{index % 60:02d}",
+        "batch_time_ms": 1.7e12 + index * 200,
+        "samples": [{"time_ms": round(index * 200 + i * 10.0, 1), "raw": 666.1875, "filtered": round(12.3 * i, 1)}
+                    for i in range(samples)]
+    }
+
+
+def _php_ingest(path, batch):
+    """Lo que hace reciver.php en cada POST: leer todo, decodificar, agregar, recortar a 1000 y reescribir"""
+    existing = []
+    if os.path.exists(path):
+        with open(path) as f:
+            content = f.read()
+        if content.strip():
+            existing = json.loads(content)
+    existing.append(dict(batch, server_timestamp="2024-01-01T00:00:00+00:00", server_time_ms=round(time.time() * 1000)))
+    existing = existing[-1000:]
+    with open(path, 'w') as f:
+        f.write(json.dumps(existing, indent=4))
+
+
+def _php_get_data(path, limit=10):
+    """Lo que hace get_data.php?latest=true&limit=10: leer y decodificar todo para devolver los últimos"""
+    with open(path) as f:
+        data = json.loads(f.read())[-limit:]
+    return json.dumps({"status": "success", "data": data, "total_batches": len(data),
+                       "total_samples": sum(len(batch["samples"]) for batch in data)})
+
+
+@benchmark
+def test_ingest_store_against_php_design(tmp_path):
+    from IngestStore import IngestStore
+    batches = [_web_batch(index) for index in range(1300)]
+
+    # Estado estable: los dos ya tienen 1000 lotes guardados
+    php_path = str(tmp_path / 'emg_data.json')
+    with open(php_path, 'w') as f:
+        f.write(json.dumps(batches[:1000], indent=4))
+    store = IngestStore(str(tmp_path / 'ingest'))
+    for batch in batches[:1000]:
+        store.append(dict(batch))
+
+    _check("reciver.php (emulado)[POST con 1000 lotes guardados]",
+           _measure(lambda batch: _php_ingest(php_path, batch), batches[1000:1100], warmup=10))
+    _check("IngestStore.append[POST con 1000 lotes guardados]",
+           _measure(lambda batch: store.append(dict(batch)), batches[1000:1300], warmup=10))
+    _check("get_data.php (emulado)[latest 10 de 1000]",
+           _measure(lambda _: _php_get_data(php_path), list(range(100)), warmup=10))
+    _check("IngestStore.get_data[latest 10 de 1000]",
+           _measure(lambda _: store.get_data(limit=10, latest=True), list(range(2000)), warmup=10))
+    # Visor al día: solo el lote nuevo, por cursor o como evento SSE ya codificado
+    _check("IngestStore.get_data[since: 1 lote nuevo de 1000]",
+           _measure(lambda _: store.get_data(since=store.last_seq - 1), list(range(2000)), warmup=10))
+    _check("IngestStore.wait_for_events[1 lote nuevo de 1000]",
+           _measure(lambda _: store.wait_for_events(store.last_seq - 1, timeout=0), list(range(2000)), warmup=10))
+    store.close()
+
+
+@benchmark
+def test_ingest_store_tiles_against_client_recompute(tmp_path):
+    from IngestStore import IngestStore
+    store = IngestStore(str(tmp_path / 'ingest'))
+    batches = [_web_batch(index) for index in range(1000)]  # 200 s a 100 Hz
+    for batch in batches:
+        store.append(dict(batch))
+
+    # Lo que hace index.html en cada actualización con 30 s en pantalla: ordenar y recorrer todo
+    window = [sample for batch in batches[-150:] for sample in batch["samples"]]
+
+    def client_recompute(_):
+        ordered = sorted(window, key=lambda sample: sample["time_ms"])
+        values = [sample["filtered"] for sample in ordered]
+        return (sum(values) / len(values), max(values), min(values),
+                (sum(value * value for value in values) / len(values)) ** 0.5)
+
+    _check("index.html (emulado)[ordenar + estadísticas, 30 s a 100 Hz]",
+           _measure(client_recompute, list(range(300)), warmup=10))
+    _check("IngestStore.get_tile[30 s, 1000 px]",
+           _measure(lambda _: store.get_tile(pixels=1000), list(range(2000)), warmup=10))
+    _check("IngestStore.get_tile[200 s, 1000 px]",
+           _measure(lambda _: store.get_tile(pixels=1000, window_ms=200_000), list(range(2000)), warmup=10))
+    store.close()
+
+
+@benchmark
+def test_ingest_server_http_post(tmp_path):
+    import requests
+    from BatchCodec import columnar_batch, encode_batch
+    from IngestServer import IngestServer
+    server = IngestServer(('127.0.0.1', 0), data_directory=str(tmp_path / 'ingest'))
+    server.start()
+    session = requests.Session()
+    times_ms = np.arange(20) * 10.0
+    values = _test_signal(20, channels=4)
+    body, headers = encode_batch(columnar_batch(times_ms, values, values, timestamp="2024-01-01T00:00:00"))
+    try:
+        _check("IngestServer POST reciver.php[keep-alive, 20 muestras x 4 canales]",
+               _measure(lambda _: session.post(server.url + 'reciver.php', data=body, headers=headers).raise_for_status(),
+                        list(range(1000)), warmup=50))
+    finally:
+        session.close()
+        server.stop()
@@ -0,0 +1,96 @@
+import csv
+import threading
+
+import numpy as np
+
+from BinaryRecording import read_chunks
+from DataLogger import DataLogger
+
+
+def _read_rows(path):
+    with open(path, newline='') as f:
+        return list(csv.reader(f))
+
+
+def test_blocks_are_written_by_writer_thread(tmp_path):
+    logger = DataLogger(base_directory=str(tmp_path))
+    assert logger.start_logging(num_channels=2)
+    path = logger.get_current_file()
+
+    for start in range(0, 1000, 100):
+        raw = np.column_stack((np.arange(start, start + 100), -np.arange(start, start + 100))) * 0.5
+        logger.log_block(raw, raw * 10)
+    logger.log_sample([1.0, 2.0], [3.0, 4.0])
+    logger.stop_logging()
+
+    rows = _read_rows(path)
+    assert rows[0][3:] == ['raw_value_mv_ch0', 'raw_value_mv_ch1',
+                           'filtered_value_uv_ch0', 'filtered_value_uv_ch1']
+    assert len(rows) == 1 + 1001
+    assert [int(row[2]) for row in rows[1:]] == list(range(1, 1002))
+    assert rows[11][3:] == ['5.000', '-5.000', '50.0', '-50.0']
+
+    stats = logger.get_stats()
+    assert stats['samples_written'] == 1001
+    assert stats['dropped_samples'] == 0
+    assert stats['bytes_written'] == (tmp_path / path.split('/')[-1]).stat().st_size
+
+
+def test_full_queue_drops_blocks_without_blocking(tmp_path):
+    logger = DataLogger(base_directory=str(tmp_path), queue_max_blocks=2)
+    release = threading.Event()
+    write_batch = logger._write_batch
+
+    def slow_write(blocks):
+        release.wait(5)  # Disco "trabado"
+        write_batch(blocks)
+
+    logger._write_batch = slow_write
+    logger.start_logging()
+    path = logger.get_current_file()
+
+    for _ in range(20):
+        logger.log_block(np.ones(10), np.ones(10))
+    assert logger.dropped_samples > 0
+
+    release.set()
+    logger.stop_logging()
+
+    numbers = [int(row[2]) for row in _read_rows(path)[1:]]
+    assert len(numbers) == logger.samples_written == 200 - logger.dropped_samples
+    # Los bloques descartados quedan como huecos en la numeración
+    assert numbers == sorted(numbers) and numbers[-1] <= 200
+
+
+def test_binary_recording_round_trip_and_csv_export(tmp_path):
+    logger = DataLogger(base_directory=str(tmp_path))
+    assert logger.start_logging(num_channels=2, file_format='binary',
+                                metadata={'sample_rate': 1000, 'system_gain': 1200.0})
+    path = logger.get_current_file()
+    assert path.endswith('.emgb')
+
+    t0 = 1_700_000_000.0
+    raw = np.column_stack((np.arange(2500), np.arange(2500) * 2)) * 0.1875
+    for start in range(0, 2500, 250):
+        end = start + 250
+        logger.log_block(raw[start:end], raw[start:end] * 1000,
+                         timestamps=t0 + np.arange(start, end) / 1000)
+    logger.stop_logging()
+
+    metadata, chunks = read_chunks(path)
+    assert metadata['channels'] == 2 and metadata['sample_rate'] == 1000
+    # Dos chunks completos y el último con el resto
+    assert chunks['count'].tolist() == [1024, 1024, 452]
+    samples = np.concatenate([chunk['sample'][:chunk['count']] for chunk in chunks])
+    times = np.concatenate([chunk['time'][:chunk['count']] for chunk in chunks])
+    values = np.concatenate([chunk['raw'][:chunk['count']] for chunk in chunks])
+    np.testing.assert_array_equal(samples, np.arange(1, 2501))
+    np.testing.assert_array_equal(times, t0 + np.arange(2500) / 1000)
+    np.testing.assert_allclose(values, raw, rtol=1e-6)
+    assert logger.bytes_written == (tmp_path / path.split('/')[-1]).stat().st_size
+
+    rows = _read_rows(logger.export_csv())
+    assert rows[0][2:] == ['sample_number', 'raw_value_mv_ch0', 'raw_value_mv_ch1',
+                           'filtered_value_uv_ch0', 'filtered_value_uv_ch1']
+    assert len(rows) == 2501
+    assert rows[2][2:] == ['2', '0.188', '0.375', '187.5', '375.0']
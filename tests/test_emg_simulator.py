@@ -0,0 +1,72 @@
+import time
+
+import numpy as np
+import serial
+
+from EMGSimulator import EMGSimulator, ADS_RESOLUTION_MV
+from SerialHandler import SerialHandler
+
+
+def _read_for(port, seconds):
+    data = b""
+    deadline = time.time() + seconds
+    while time.time() < deadline:
+        try:
+            data += port.read(port.in_waiting or 1)
+        except serial.SerialException:
+            break  # El simulador cerró el pty
+    return data
+
+
+def test_generated_signal_has_baseline_mains_and_bursts():
+    quiet = EMGSimulator(sample_rate=2000, seed=1, burst_rate=0)
+    mv = quiet.generate(20000)[:, 0] * ADS_RESOLUTION_MV
+    assert abs(mv.mean() - 666.0) < 1.0
+    assert np.max(np.abs(mv - 666.0)) < 5.0
+
+    # Pico de 50 Hz en el espectro
+    spectrum = np.abs(np.fft.rfft(mv - mv.mean()))
+    frequencies = np.fft.rfftfreq(len(mv), 1 / 2000)
+    assert frequencies[np.argmax(spectrum)] == 50.0
+
+    active = EMGSimulator(sample_rate=2000, channels=2, seed=1, burst_rate=1.0)
+    samples = np.concatenate([active.generate(size) for size in (7, 993, 19000)])
+    assert samples.shape == (20000, 2)
+    # Activaciones muy por encima del ruido de base
+    assert np.max(np.abs(samples * ADS_RESOLUTION_MV - 666.0)) > 40.0
+
+
+def test_text_stream_is_parsed_by_serial_handler_with_faults():
+    simulator = EMGSimulator(sample_rate=5000, seed=2, garbage_rate=20.0)
+    # Abrir el puerto antes de arrancar: pyserial descarta lo recibido antes de abrir
+    port = serial.Serial(simulator.open(), timeout=0.05)
+    simulator.start()
+    data = _read_for(port, 1.0)
+    simulator.stop()
+    port.close()
+
+    handler = SerialHandler()
+    values = handler._decode_chunk(data)
+    stats = simulator.get_stats()
+    assert len(values) > 0.8 * 5000
+    assert len(values) <= stats['samples_sent']
+    # Las dos líneas del banner también se descartan como inválidas
+    assert handler.malformed_lines >= stats['garbage_lines'] > 0
+    assert abs(np.median(values) * ADS_RESOLUTION_MV - 666.0) < 5.0
+
+
+def test_binary_stream_and_disconnect():
+    simulator = EMGSimulator(sample_rate=4000, channels=3, protocol='binary', seed=3, disconnect_after=0.5)
+    port = serial.Serial(simulator.open(), timeout=0.05)
+    simulator.start()
+    data = _read_for(port, 1.0)
+    port.close()
+    simulator.stop()
+
+    handler = SerialHandler()
+    values = handler._decode_chunk(data)
+    assert simulator.get_stats()['disconnected']
+    assert handler.get_stats()['protocol'] == 'binary'
+    assert values.shape[1] == 3 and len(values) > 1000
+    assert handler.frame_decoder.corrupt_frames == 0
+    assert handler.frame_decoder.dropped_frames == 0
@@ -0,0 +1,85 @@
+import csv
+import itertools
+
+import numpy as np
+
+from DataLogger import DataLogger
+from FeatureExtractor import FEATURE_NAMES, FeatureExtractor
+
+
+def _brute_force(x, end, window, threshold):
+    """Características de la ventana que termina en end, recalculadas desde cero"""
+    samples = x[end - window + 1:end + 1]
+    with_previous = x[max(end - window, 0):end + 1]  # Diferencias hacia la primera muestra
+    deltas = np.diff(with_previous, axis=0)
+    slopes = np.diff(x[max(end - window - 1, 0):end + 1], axis=0)
+    turns = -slopes[:-1] * slopes[1:]  # Positivo si la pendiente cambia de signo
+    return {
+        'rms': np.sqrt((samples ** 2).mean(axis=0)),
+        'mav': np.abs(samples).mean(axis=0),
+        'wl': np.abs(deltas).sum(axis=0),
+        'zc': ((with_previous[1:] * with_previous[:-1] < 0) & (np.abs(deltas) >= threshold)).sum(axis=0),
+        'ssc': ((turns > 0) & (turns >= threshold ** 2)).sum(axis=0)
+    }
+
+
+def test_features_match_brute_force_with_any_block_sizes():
+    x = np.random.default_rng(1).normal(0, 50, (3001, 2))
+    extractor = FeatureExtractor(sample_rate=1000, num_channels=2, window_ms=100, hop_ms=30, threshold_uv=5)
+
+    frames = []
+    position = 0
+    for size in itertools.cycle([1, 7, 64, 3, 150]):
+        if position >= len(x):
+            break
+        block = x[position:position + size]
+        frame = extractor.process_block(block, np.arange(position, position + len(block), dtype=float))
+        if frame is not None:
+            frames.append(frame)
+        position += size
+
+    ends = np.concatenate([frame.time for frame in frames]).astype(int)
+    np.testing.assert_array_equal(ends, np.arange(99, len(x), 30))
+    for name in FEATURE_NAMES:
+        values = np.concatenate([getattr(frame, name) for frame in frames])
+        expected = np.array([_brute_force(x, end, 100, 5)[name] for end in ends])
+        np.testing.assert_allclose(values, expected, rtol=1e-9, atol=1e-6)
+
+    # Memoria acotada por ventana / salto, no por la cantidad de muestras
+    assert len(extractor._starts) <= 100 // 30 + 2
+
+
+def test_configure_and_channel_change_restart_windows():
+    extractor = FeatureExtractor(sample_rate=100, window_ms=200, hop_ms=100)
+    assert extractor.window == 20 and extractor.hop == 10
+    assert extractor.process_block(np.ones(19)) is None
+    assert len(extractor.process_block(np.ones(1)).rms) == 1
+
+    frame = extractor.process_block(np.ones((20, 3)))  # Cambio de canales: se reinicia
+    assert frame.rms.shape == (1, 3)
+    np.testing.assert_allclose(frame.rms, 1.0)
+
+    extractor.configure(sample_rate=1000)
+    assert extractor.window == 200 and extractor.sample_count == 0
+
+
+def test_data_logger_writes_features_sidecar(tmp_path):
+    logger = DataLogger(base_directory=str(tmp_path))
+    logger.start_logging()
+    extractor = FeatureExtractor(sample_rate=100, window_ms=100, hop_ms=50)
+
+    start = logger.session_start_time / 1000
+    for position in range(0, 200, 20):
+        values = np.sin(np.arange(position, position + 20))
+        logger.log_block(values, values)
+        frame = extractor.process_block(values, start + np.arange(position, position + 20) / 100)
+        if frame is not None:
+            logger.log_features(frame)
+    logger.stop_logging()
+
+    with open(logger.features_file, newline='') as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ['time_ms', 'rms_uv', 'mav_uv', 'wl_uv', 'zc', 'ssc']
+    assert len(rows) == 1 + 4 * 10 - 1  # Ventanas que terminan en 9, 14, ..., 199
+    assert [float(row[0]) for row in rows[1:3]] == [90.0, 140.0]
+    assert logger.get_stats()['samples_written'] == 200
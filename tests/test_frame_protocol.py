@@ -0,0 +1,115 @@
+import os
+import tty
+
+import numpy as np
+import pytest
+import serial
+
+from FrameProtocol import FrameDecoder, encode_frame, BINARY_HANDSHAKE
+from SerialHandler import SerialHandler
+
+
+@pytest.fixture
+def pty_loopback():
+    """Par pseudo-terminal: se escribe en master y se lee con pyserial desde el esclavo"""
+    master, slave = os.openpty()
+    tty.setraw(slave)
+    port = serial.Serial(os.ttyname(slave), 921600, timeout=0.5)
+    yield master, port
+    port.close()
+    os.close(master)
+    os.close(slave)
+
+
+def _read_all(port, size):
+    data = b""
+    while len(data) < size:
+        chunk = port.read(size - len(data))
+        if not chunk:
+            break
+        data += chunk
+    return data
+
+
+def test_frames_round_trip_over_pty(pty_loopback):
+    master, port = pty_loopback
+    samples = np.arange(-1000, 1000, dtype=np.int16).reshape(-1, 10)
+    stream = b"".join(encode_frame(seq, block) for seq, block in enumerate(samples))
+    os.write(master, stream)
+
+    decoder = FrameDecoder()
+    received = _read_all(port, len(stream))
+    # Entregar en trozos arbitrarios para ejercitar tramas partidas
+    decoded = np.concatenate([decoder.feed(received[i:i + 7]) for i in range(0, len(received), 7)])
+
+    np.testing.assert_array_equal(decoded[:, 0], samples.ravel())
+    assert decoder.get_stats()['frames_decoded'] == len(samples)
+    assert decoder.dropped_frames == 0
+    assert decoder.corrupt_frames == 0
+
+
+def test_decoder_reports_corrupt_and_dropped_frames():
+    frames = [encode_frame(seq, [seq] * 4) for seq in range(6)]
+    damaged = bytearray(frames[2])
+    damaged[8] ^= 0xFF
+    stream = frames[0] + frames[1] + b"\x00garbage" + bytes(damaged) + frames[3] + frames[5]
+
+    decoder = FrameDecoder()
+    decoded = decoder.feed(stream)
+
+    np.testing.assert_array_equal(decoded[:, 0], [0] * 4 + [1] * 4 + [3] * 4 + [5] * 4)
+    assert decoder.corrupt_frames == 1
+    assert decoder.dropped_frames == 2  # La trama dañada (2) y la no enviada (4)
+
+
+def test_serial_handler_switches_to_binary_after_handshake():
+    handler = SerialHandler()
+    handler.port_name = "pty"
+
+    stream = b"3550\r\n3551\r\n" + BINARY_HANDSHAKE + b"\r\n" + encode_frame(0, [10, 11, 12])
+    values = np.concatenate([handler._decode_chunk(stream[:9]), handler._decode_chunk(stream[9:])])
+
+    np.testing.assert_array_equal(values[:, 0], [3550, 3551, 10, 11, 12])
+    assert handler.get_stats()['protocol'] == 'binary'
+
+
+def test_serial_handler_keeps_text_values_in_mixed_chunk():
+    handler = SerialHandler()
+    handler.port_name = "pty"
+    blocks = []
+    handler.data_block_received.connect(lambda values, timestamps: blocks.append(values))
+
+    # Texto de dos canales y tramas de uno en el mismo chunk: el texto sale como bloque propio
+    stream = b"3550,3560\r\n3551,3561\r\n" + BINARY_HANDSHAKE + b"\r\n" + encode_frame(0, [10, 11])
+    values = handler._decode_chunk(stream, arrival_time=100.0)
+    np.testing.assert_array_equal(values[:, 0], [10, 11])
+    assert len(blocks) == 1
+    np.testing.assert_array_equal(blocks[0], [[3550, 3560], [3551, 3561]])
+    assert handler.samples_received == 2
+
+    # Anuncio sin tramas todavía: las líneas de texto anteriores no se pierden
+    handler = SerialHandler()
+    handler.port_name = "pty"
+    values = handler._decode_chunk(b"3550\r\n3551\r\n" + BINARY_HANDSHAKE + b"\r\n")
+    np.testing.assert_array_equal(values[:, 0], [3550, 3551])
+    assert handler.get_stats()['protocol'] == 'binary'
+    np.testing.assert_array_equal(handler._decode_chunk(encode_frame(0, [12]))[:, 0], [12])
+
+
+def test_serial_handler_detects_frames_without_handshake_and_keeps_protocol():
+    handler = SerialHandler()
+    handler.port_name = "pty"
+    handler.is_connected = True
+    handler.start = lambda: None  # Sin hilo: solo el cambio de estado de start_reading
+
+    # Conectado después del anuncio: una trama inválida no alcanza, una válida sí
+    assert len(handler._decode_chunk(b"3550\r\n\xa5\x5agarbage\n")) == 1
+    assert handler.get_stats()['protocol'] == 'text'
+    values = handler._decode_chunk(encode_frame(0, [10, 11]) + encode_frame(1, [12]))
+    np.testing.assert_array_equal(values[:, 0], [10, 11, 12])
+    assert handler.get_stats()['protocol'] == 'binary'
+
+    # Detener e iniciar otra vez la lectura no vuelve a texto: el anuncio no se repite
+    handler.start_reading()
+    np.testing.assert_array_equal(handler._decode_chunk(encode_frame(2, [13]))[:, 0], [13])
+    assert handler.get_stats()['protocol'] == 'binary'
@@ -0,0 +1,301 @@
+import json
+import os
+import time
+
+import numpy as np
+import pytest
+import requests
+from PySide6.QtCore import QCoreApplication
+
+from BatchCodec import columnar_batch, encode_batch
+from IngestServer import IngestServer
+from IngestStore import IngestStore
+
+
+@pytest.fixture
+def qt_app():
+    return QCoreApplication.instance() or QCoreApplication([])
+
+
+@pytest.fixture
+def server(tmp_path):
+    server = IngestServer(('127.0.0.1', 0), data_directory=str(tmp_path / 'ingest'))
+    server.start()
+    yield server
+    server.stop()
+
+
+def _batch(index, samples=3, **extra):
+    return {"timestamp": f"t{index}", "samples": [{"time_ms": index * 10.0 + i, "raw": 1.0, "filtered": 0.5}
+                                                 for i in range(samples)], **extra}
+
+
+def test_store_serves_latest_and_first_batches_from_memory(tmp_path):
+    store = IngestStore(str(tmp_path), ring_batches=5)
+    for index in range(8):
+        assert store.append(_batch(index))['samples_received'] == 3
+
+    response = json.loads(store.get_data(limit=2, latest=True))
+    assert [batch['timestamp'] for batch in response['data']] == ['t6', 't7']
+    assert response['total_batches'] == 2 and response['total_samples'] == 6
+    assert (response['first_timestamp'], response['last_timestamp']) == ('t6', 't7')
+    assert 'server_time_ms' in response['data'][0]
+
+    response = json.loads(store.get_data(limit=2))
+    assert [batch['timestamp'] for batch in response['data']] == ['t3', 't4']  # Los 5 más recientes
+    assert json.loads(store.get_data())['total_batches'] == 5
+
+
+def test_store_deduplicates_batch_ids_and_survives_reopen(tmp_path):
+    store = IngestStore(str(tmp_path), segment_bytes=300, max_segments=100)
+    for index in range(6):
+        store.append(_batch(index, batch_id=f"a-{index}"))
+    assert store.append(_batch(2, batch_id="a-2"))['duplicate']
+    assert len(os.listdir(tmp_path)) > 1
+    store.close()
+
+    # Línea final a medio escribir: se ignora al reabrir
+    last = os.path.join(tmp_path, sorted(os.listdir(tmp_path))[-1])
+    with open(last, 'ab') as f:
+        f.write(b'{"timestamp": "roto"')
+
+    reopened = IngestStore(str(tmp_path))
+    response = json.loads(reopened.get_data())
+    assert [batch['batch_id'] for batch in response['data']] == [f"a-{index}" for index in range(6)]
+    assert reopened.append(_batch(5, batch_id="a-5"))['duplicate']
+    assert not reopened.append(_batch(6, batch_id="a-6")).get('duplicate')
+
+    cleared = reopened.clear()
+    assert cleared['deleted_batches'] == 7 and cleared['file_existed']
+    assert json.loads(reopened.get_data())['data'] == [] and os.listdir(tmp_path) == ['seq']
+
+
+def test_store_retention_drops_oldest_segments(tmp_path):
+    store = IngestStore(str(tmp_path), segment_bytes=200, max_segments=3)
+    for index in range(50):
+        store.append(_batch(index))
+    assert len(os.listdir(tmp_path)) == 3
+    assert store.log_bytes == sum(os.path.getsize(os.path.join(tmp_path, name)) for name in os.listdir(tmp_path))
+
+
+def test_store_reopen_reads_only_newest_segments(tmp_path, monkeypatch):
+    import IngestStore as ingest_store
+    store = IngestStore(str(tmp_path), ring_batches=5, segment_bytes=300, max_segments=100)
+    for index in range(40):
+        store.append(_batch(index))
+    store.close()
+    segments = sorted(name for name in os.listdir(tmp_path) if name.startswith("ingest_"))
+    assert len(segments) > 10
+
+    opened = []
+
+    def tracking_open(path, *args, **kwargs):
+        opened.append(os.path.basename(path))
+        return open(path, *args, **kwargs)
+
+    monkeypatch.setattr(ingest_store, 'open', tracking_open, raising=False)
+    reopened = IngestStore(str(tmp_path), ring_batches=5, segment_bytes=300, max_segments=100)
+    assert [batch['timestamp'] for batch in json.loads(reopened.get_data())['data']] == [f"t{i}" for i in range(35, 40)]
+    # Dos lotes por segmento: alcanza con los tres más nuevos, del último hacia atrás
+    assert [name for name in opened if name.startswith("ingest_")] == segments[-1:-4:-1]
+    assert reopened.log_bytes == sum(os.path.getsize(os.path.join(tmp_path, name)) for name in segments)
+
+
+def test_server_endpoints_match_php_scripts(server):
+    base = server.url
+    body, headers = encode_batch(columnar_batch(np.arange(4) * 10.0, np.ones(4), np.zeros(4),
+                                                timestamp="2024-01-01T00:00:00", batch_id="x-1"))
+    response = requests.post(base + 'reciver.php', data=body, headers=headers, timeout=5)
+    assert response.status_code == 200 and response.json()['samples_received'] == 4
+    assert response.headers['Access-Control-Allow-Origin'] == '*'
+
+    data = requests.get(base + 'get_data.php?latest=true&limit=10', timeout=5).json()
+    assert data['status'] == 'success' and data['total_samples'] == 4
+    assert data['data'][0]['samples'][1] == {"time_ms": 10.0, "raw": 1.0, "filtered": 0.0}
+
+    assert requests.post(base + 'reciver.php', data=b'{"samples": []}', timeout=5).status_code == 400
+    assert requests.post(base + 'reciver.php', data=b'no json', timeout=5).status_code == 400
+    # JSON válido que no es un lote: la respuesta de error de reciver.php, no una conexión cortada
+    for malformed in (b'{"format": "columnar-v1"}', b'[1, 2]', b'{"format": "columnar-v1", "channels": 1, "time_ms": 5}'):
+        response = requests.post(base + 'reciver.php', data=malformed, timeout=5)
+        assert response.status_code == 400 and response.json()['message'] == 'Estructura de datos inválida'
+    assert requests.post(base + 'otro.php', data=b'{}', timeout=5).status_code == 404
+    assert requests.get(base + 'reciver.php', timeout=5).status_code == 405
+    assert 'EMG' in requests.get(base, timeout=5).text  # index.html
+    assert requests.get(base + '..%2Fsrc%2FIngestServer.py', timeout=5).status_code == 404
+
+    assert requests.post(base + 'clear.php', timeout=5).json()['deleted_batches'] == 1
+    assert requests.get(base + 'get_data.php', timeout=5).json()['total_batches'] == 0
+
+
+def test_http_sender_streams_into_ingest_server(qt_app, server):
+    from HTTPSender import HTTPSender
+    sender = HTTPSender(receiver_url=server.url + 'reciver.php', clear_url=server.url + 'clear.php', max_in_flight=4)
+    sender.start_transmission()
+    sender.batch_timer.stop()
+    for batch in range(10):
+        sender.add_block(np.full((20, 2), 666.0), np.full((20, 2), float(batch)))
+        sender._queue_batch_send()
+
+    deadline = time.monotonic() + 5
+    while sender.batches_sent < 10:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+    data = json.loads(server.store.get_data())
+    assert data['total_batches'] == 10 and data['total_samples'] == 200
+    # Con varios lotes en vuelo, seq sigue igual el orden en que se armaron
+    assert [batch['samples'][0]['filtered'][0] for batch in data['data']] == [float(b) for b in range(10)]
+
+
+def test_store_orders_in_flight_batches_by_sender_sequence(tmp_path):
+    import threading
+    store = IngestStore(str(tmp_path), reorder_timeout=5)
+    store.append(_batch(1, batch_id="s-1"))
+
+    # 4 y 3 llegan antes que 2: esperan a que se guarde el anterior
+    threads = []
+    for index in (4, 3):
+        threads.append(threading.Thread(target=store.append, args=(_batch(index, batch_id=f"s-{index}"),)))
+        threads[-1].start()
+        time.sleep(0.05)
+    store.append(_batch(2, batch_id="s-2"))
+    for thread in threads:
+        thread.join(5)
+    assert [batch['batch_id'] for batch in json.loads(store.get_data())['data']] == ["s-1", "s-2", "s-3", "s-4"]
+
+    # Un hueco que no se llena (lote descartado por el emisor) solo demora hasta reorder_timeout
+    store.reorder_timeout = 0.1
+    started = time.monotonic()
+    assert store.append(_batch(6, batch_id="s-6"))['seq'] == 5
+    assert 0.1 <= time.monotonic() - started < 2
+    started = time.monotonic()
+    assert store.append(_batch(7, batch_id="nuevo-1"))['seq'] == 6
+    assert time.monotonic() - started < 0.1
+
+
+def test_store_since_cursor_survives_reopen_and_clear(tmp_path):
+    store = IngestStore(str(tmp_path), ring_batches=5)
+    assert [store.append(_batch(index))['seq'] for index in range(8)] == list(range(1, 9))
+
+    response = json.loads(store.get_data(since=6))
+    assert [batch['seq'] for batch in response['data']] == [7, 8]
+    assert (response['first_seq'], response['last_seq']) == (4, 8)
+    assert [batch['seq'] for batch in json.loads(store.get_data(since=0, limit=2))['data']] == [4, 5]
+    assert json.loads(store.get_data(since=8))['data'] == []
+
+    events, cursor = store.wait_for_events(6, timeout=0)
+    assert cursor == 8 and events[0].startswith(b"id: 7\ndata: {")
+    store.close()
+
+    reopened = IngestStore(str(tmp_path))
+    assert reopened.append(_batch(8))['seq'] == 9
+    reopened.clear()
+    reopened.close()
+    assert IngestStore(str(tmp_path)).append(_batch(9))['seq'] == 10
+
+
+def _read_events(response, count):
+    """Lee count eventos SSE (id, lote) del stream"""
+    events, event_id = [], None
+    for line in response.iter_lines(chunk_size=1):  # Sin esperar a llenar un bloque
+        if line.startswith(b"id: "):
+            event_id = int(line[4:])
+        elif line.startswith(b"data: "):
+            events.append((event_id, json.loads(line[6:])))
+            if len(events) == count:
+                return events
+    return events
+
+
+def test_stream_pushes_new_batches_to_every_viewer(server):
+    base = server.url
+    requests.post(base + 'reciver.php', data=json.dumps(_batch(0)), timeout=5)
+
+    viewers = [requests.get(base + 'stream', stream=True, timeout=5) for _ in range(3)]
+    resumed = requests.get(base + 'stream', headers={'Last-Event-ID': '0'}, stream=True, timeout=5)
+    # Con las cabeceras recibidas el cursor ya está fijado: lo que llegue después se empuja
+    assert viewers[0].headers['Content-Type'] == 'text/event-stream'
+
+    for index in (1, 2):
+        requests.post(base + 'reciver.php', data=json.dumps(_batch(index)), timeout=5)
+
+    for viewer in viewers:
+        assert [(seq, batch['timestamp']) for seq, batch in _read_events(viewer, 2)] == [(2, 't1'), (3, 't2')]
+        viewer.close()
+    assert [seq for seq, _ in _read_events(resumed, 3)] == [1, 2, 3]
+    resumed.close()
+
+
+def test_sample_free_stream_and_fetch_for_tile_viewers(server):
+    base = server.url
+    viewer = requests.get(base + 'stream?since=0&samples=0', stream=True, timeout=5)
+    for samples in (3, 300):
+        requests.post(base + 'reciver.php', timeout=5,
+                      data=json.dumps(_batch(samples, samples=samples, events=[{"event": "onset", "channel": 0}])))
+
+    # El tamaño de cada evento no depende de la cantidad de muestras del lote
+    events = _read_events(viewer, 2)
+    viewer.close()
+    assert [batch['sample_count'] for _, batch in events] == [3, 300]
+    assert all('samples' not in batch and batch['events'][0]['event'] == 'onset' for _, batch in events)
+
+    response = requests.get(base + 'get_data.php?since=0&samples=0', timeout=5).json()
+    assert [batch['sample_count'] for batch in response['data']] == [3, 300]
+    assert response['total_samples'] == 303 and 'samples' not in response['data'][1]
+    assert len(requests.get(base + 'get_data.php?since=0', timeout=5).json()['data'][1]['samples']) == 300
+
+
+def test_tiles_endpoint_returns_pixel_bounded_series(server):
+    base = server.url
+    for index in range(50):
+        times_ms = index * 200 + np.arange(200) * 1.0
+        body, headers = encode_batch(columnar_batch(times_ms, np.zeros(200), np.sin(times_ms / 50) * 100,
+                                                    timestamp=f"t{index}"))
+        requests.post(base + 'reciver.php', data=body, headers=headers, timeout=5)
+
+    tile = requests.get(base + 'tiles?window=5000&pixels=100', timeout=5).json()
+    assert (tile['t0_ms'], tile['t1_ms']) == (4999.0, 9999.0)
+    # Intervalos completos de 100 ms: el primero empieza en 4900
+    assert tile['resolution_ms'] == 100 and len(tile['time_ms']) <= 100
+    assert tile['stats']['count'] == 5100 and tile['stats']['max'][0] == pytest.approx(100, abs=0.1)
+    assert tile['total_samples'] == 10_000 and tile['last_seq'] == 50
+
+    tile = requests.get(base + 'tiles?t0=0&t1=999&pixels=1000&window=nan', timeout=5).json()
+    assert tile['resolution_ms'] == 10 and tile['time_ms'][:2] == [0.0, 10.0]
+
+    # Los agregados se reconstruyen desde el anillo al reabrir y se borran con clear.php
+    reopened = IngestStore(server.store.directory)
+    assert json.loads(reopened.get_tile(0, 999, 1000))['stats']['count'] == 1000
+    reopened.close()
+    requests.post(base + 'clear.php', timeout=5)
+    assert requests.get(base + 'tiles', timeout=5).json()['stats'] is None
+
+
+def test_store_restarts_tiles_on_new_session(tmp_path):
+    store = IngestStore(str(tmp_path), reorder_timeout=0)
+
+    def send(batch_id, t0_ms, value):
+        samples = [{"time_ms": t0_ms + i * 10.0, "raw": 0.0, "filtered": value} for i in range(100)]
+        store.append({"timestamp": "t", "samples": samples, "batch_id": batch_id})
+
+    def stats():
+        return json.loads(store.get_tile(0, 10_000, 100))['stats']
+
+    send("s-1", 0, 1.0)
+    assert store.tiles.total_samples == 0  # append solo encola: se agrega al pedir un tile
+    send("s-3", 2000, 3.0)
+    send("s-2", 1000, 2.0)  # Reintento atrasado: retrocede pero no es otra sesión
+    assert stats()['count'] == 300 and stats()['mean'] == [2.0]
+
+    # Inicio de transmisión: time_ms vuelve a 0 y no se mezcla con la sesión anterior
+    send("s-4", 0, 100.0)
+    assert (stats()['count'], stats()['min'], stats()['max']) == (100, [100.0], [100.0])
+
+    # Otro emisor (otra ejecución) también empieza de cero aunque el tiempo avance
+    send("otro-1", 5000, 7.0)
+    assert (stats()['count'], stats()['mean']) == (100, [7.0])
+
+    # Al reabrir se reconstruye solo la última sesión
+    store.close()
+    assert json.loads(IngestStore(str(tmp_path)).get_tile(0, 10_000, 100))['stats']['count'] == 100
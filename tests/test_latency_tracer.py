@@ -0,0 +1,76 @@
+import json
+import time
+
+import numpy as np
+
+from DataLogger import DataLogger
+from LatencyTracer import BUCKET_EDGES, LatencyHistogram, LatencyTracer
+
+
+def test_histogram_percentiles_within_bucket_resolution():
+    histogram = LatencyHistogram()
+    latencies = np.random.default_rng(0).lognormal(np.log(0.005), 0.8, 50000)
+    for block in np.array_split(latencies, 100):
+        histogram.record(block)
+
+    assert histogram.count == len(latencies)
+    assert histogram.max == latencies.max()
+    step = BUCKET_EDGES[1] / BUCKET_EDGES[0]
+    for q in (50, 95, 99):
+        expected = np.percentile(latencies, q)
+        # El percentil se reporta como el borde superior de su bucket
+        assert expected <= histogram.percentile(q) <= expected * step
+
+
+def test_histogram_out_of_range_values():
+    histogram = LatencyHistogram()
+    histogram.record([-0.001, 0.0, 1e-7])  # Relojes desfasados: caen en el bucket inferior
+    histogram.record([500.0])
+    assert histogram.count == 4
+    assert histogram.percentile(50) <= BUCKET_EDGES[0]
+    assert histogram.percentile(100) == 500.0
+    histogram.reset()
+    assert histogram.count == 0
+    assert histogram.percentile(50) is None
+
+
+def test_tracer_summary_and_dump(tmp_path):
+    tracer = LatencyTracer()
+    now = time.time()
+    tracer.record('processing', now - np.full(100, 0.002), now=now)
+    tracer.record('disk', now - np.linspace(0.01, 0.1, 100), now=now)
+    tracer.record('plot', None)
+
+    summary = tracer.summary()
+    assert set(summary) == {'processing', 'disk'}
+    assert summary['processing']['count'] == 100
+    assert 2.0 <= summary['processing']['p50_ms'] <= 2.6
+    assert summary['disk']['p50_ms'] <= summary['disk']['p99_ms'] <= summary['disk']['max_ms'] + 1e-9
+    assert "Disco" in tracer.format_summary()
+
+    path = tracer.dump(str(tmp_path / 'latency.json'))
+    with open(path) as f:
+        report = json.load(f)
+    assert report['summary']['disk']['count'] == 100
+    assert sum(report['histograms']['processing']) == 100
+    assert len(report['histograms']['disk']) == len(report['bucket_edges_s']) + 1
+
+
+def test_disabled_tracer_records_nothing():
+    tracer = LatencyTracer(enabled=False)
+    tracer.record('network', [time.time()])
+    assert tracer.summary() == {}
+
+
+def test_data_logger_records_disk_latency(tmp_path):
+    tracer = LatencyTracer()
+    logger = DataLogger(base_directory=str(tmp_path), flush_interval=0.05)
+    logger.latency_tracer = tracer
+    logger.start_logging()
+    for _ in range(10):
+        logger.log_block(np.zeros(50), np.zeros(50), np.full(50, time.time()))
+    logger.stop_logging()
+
+    summary = tracer.summary()
+    assert summary['disk']['count'] == 500
+    assert summary['disk']['max_ms'] < 5000
@@ -0,0 +1,110 @@
+import csv
+
+import numpy as np
+import pytest
+
+from DataLogger import DataLogger
+from OnsetDetector import OnsetDetector
+from SignalProcessor import SignalProcessor
+
+SAMPLE_RATE = 1000
+
+
+def _bursts(n=8000, bursts=((2000, 3500), (5000, 6000)), seed=0):
+    rng = np.random.default_rng(seed)
+    x = rng.normal(0, 5, n)
+    for start, end in bursts:
+        x[start:end] += rng.normal(0, 60, end - start)
+    return x
+
+
+def _run(detector, x, block_size):
+    events = []
+    times = np.arange(len(x)) / SAMPLE_RATE
+    for position in range(0, len(x), block_size):
+        events += detector.process_block(x[position:position + block_size], times[position:position + block_size])
+    return events
+
+
+@pytest.mark.parametrize('mode', OnsetDetector.MODES)
+def test_detects_bursts_with_bounded_latency(mode):
+    detector = OnsetDetector(sample_rate=SAMPLE_RATE, mode=mode)
+    assert detector.calibrate(np.random.default_rng(1).normal(0, 5, 5000))
+
+    events = _run(detector, _bursts(), block_size=37)
+    assert [event.kind for event in events] == ['onset', 'offset', 'onset', 'offset']
+    for event, true_time in zip(events, (2.0, 3.5, 5.0, 6.0)):
+        assert event.detected_at - true_time <= detector.max_latency_seconds
+        assert event.time <= event.detected_at
+    # El inicio se fecha en el primer cruce: a pocas muestras del comienzo real
+    assert abs(events[0].time - 2.0) < 0.01
+    assert events[0].threshold_uv == pytest.approx(detector.on_threshold[0])
+
+
+def test_events_do_not_depend_on_block_size():
+    results = []
+    for block_size in (1, 10, 333, 8000):
+        detector = OnsetDetector(sample_rate=SAMPLE_RATE, mode='tkeo')
+        detector.calibrate(np.random.default_rng(1).normal(0, 5, 5000))
+        results.append(_run(detector, _bursts(), block_size))
+    for result in results[1:]:
+        assert [event[:4] for event in result] == [event[:4] for event in results[0]]
+        np.testing.assert_allclose([event.envelope_uv for event in result],
+                                   [event.envelope_uv for event in results[0]], rtol=1e-9)
+
+
+def test_hysteresis_suppresses_chatter_near_threshold():
+    detector = OnsetDetector(sample_rate=SAMPLE_RATE)
+    detector.calibrate(np.random.default_rng(1).normal(0, 5, 5000))
+
+    # Envolvente que oscila alrededor del umbral de activación, siempre sobre el de desactivación
+    level = (detector.on_threshold[0] + detector.off_threshold[0]) / 2 * 1.25
+    x = np.concatenate((np.zeros(200), level * np.where(np.arange(3000) % 2, 1.0, -1.0), np.zeros(500)))
+    x *= 1 + 0.3 * np.sin(np.arange(len(x)) / 40)
+    events = _run(detector, x, block_size=64)
+    assert [event.kind for event in events] == ['onset', 'offset']
+
+
+def test_uncalibrated_detector_emits_nothing():
+    detector = OnsetDetector(sample_rate=SAMPLE_RATE)
+    assert detector.process_block(_bursts()) == []
+    detector.calibrate(np.zeros((100, 1)))
+    detector.configure(sample_rate=2000)  # Otra frecuencia invalida el reposo
+    assert not detector.is_calibrated
+
+
+def test_calibration_potentials_leave_streaming_state_untouched():
+    processor = SignalProcessor(sample_rate=SAMPLE_RATE)
+    processor.set_filter_state('highpass', True)
+    raw = 3552 + np.random.default_rng(0).normal(0, 5, 2000)
+    processor.start_calibration(duration_seconds=1)
+    processor.process_block(raw[:1500])
+    assert processor.is_calibrated
+    state = {key: value.copy() for key, value in processor._zi.items()}
+
+    rest = processor.calibration_potentials()
+    assert rest.shape == (1000, 1)
+    assert abs(rest[200:].mean()) < 1.0  # Sin offset tras el pasa-altas
+    assert all(np.array_equal(processor._zi[key], value) for key, value in state.items())
+
+
+def test_data_logger_writes_events_sidecar(tmp_path):
+    logger = DataLogger(base_directory=str(tmp_path))
+    logger.start_logging()
+    detector = OnsetDetector(sample_rate=SAMPLE_RATE)
+    detector.calibrate(np.random.default_rng(1).normal(0, 5, 5000))
+
+    x = _bursts(n=4000, bursts=((1000, 2000),))
+    times = logger.session_start_time / 1000 + np.arange(len(x)) / SAMPLE_RATE
+    for position in range(0, len(x), 100):
+        block = slice(position, position + 100)
+        logger.log_block(x[block], x[block], times[block])
+        logger.log_events(detector.process_block(x[block], times[block]))
+    logger.stop_logging()
+
+    with open(logger.events_file, newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert [row['event'] for row in rows] == ['onset', 'offset']
+    assert abs(float(rows[0]['time_ms']) - 1000) < 10
+    assert float(rows[0]['detected_ms']) >= float(rows[0]['time_ms'])
+    assert logger.get_stats()['samples_written'] == 4000
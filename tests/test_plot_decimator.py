@@ -0,0 +1,63 @@
+import numpy as np
+
+from PlotDecimator import MinMaxPyramid
+from RingBuffer import RingBuffer
+
+
+def _fill(capacity, values, block_sizes):
+    times = RingBuffer(capacity)
+    data = RingBuffer(capacity)
+    pyramid = MinMaxPyramid(capacity)
+    position = 0
+    for size in block_sizes:
+        block = values[position:position + size]
+        if len(block) == 0:
+            break
+        times.extend(np.arange(position, position + len(block), dtype=float))
+        data.extend(block)
+        pyramid.extend(block)
+        position += len(block)
+    return times, data, pyramid
+
+
+def test_render_bounds_points_and_keeps_peaks():
+    rng = np.random.default_rng(2)
+    values = rng.normal(0, 10, 120_000)
+    values[70_001] = 500    # Picos aislados que la decimación no debe perder
+    values[99_999] = -400
+    times, data, pyramid = _fill(150_000, values, rng.integers(1, 700, 1000))
+    assert pyramid.total_count == len(values)
+
+    start_index = len(values) - 60_000
+    x, y = pyramid.render(times.view(), data.view(), start_index, max_points=2000)
+
+    assert len(x) == len(y) <= 2000 + 200
+    assert y.max() == 500 and y.min() == -400
+    assert np.all(np.diff(x) >= 0)
+    # Cada bloque se dibuja en el tiempo de su primera muestra
+    assert len(values) - pyramid.bucket_sizes[-1] < x[-1] <= len(values) - 1
+    # El primer bloque puede empezar apenas antes de la ventana, nunca un bloque entero antes
+    assert start_index - pyramid.bucket_sizes[-1] < x[0] <= start_index
+
+
+def test_render_returns_raw_samples_when_window_fits():
+    values = np.sin(np.arange(3000) / 10)
+    times, data, pyramid = _fill(5000, values, [3000])
+
+    x, y = pyramid.render(times.view(), data.view(), 2500, max_points=1000)
+    np.testing.assert_array_equal(y, values[2500:])
+    np.testing.assert_array_equal(x, np.arange(2500, 3000))
+
+
+def test_levels_match_brute_force_after_wraparound():
+    rng = np.random.default_rng(3)
+    values = rng.normal(0, 1, 50_000)
+    _, _, pyramid = _fill(10_000, values, rng.integers(1, 300, 500))
+
+    for level, size in enumerate(pyramid.bucket_sizes):
+        completed = len(values) // size
+        mins = pyramid._mins[level].view()
+        first = completed - len(mins)
+        expected = values[first * size:completed * size].reshape(-1, size)
+        np.testing.assert_array_equal(mins, expected.min(axis=1))
+        np.testing.assert_array_equal(pyramid._maxs[level].view(), expected.max(axis=1))
@@ -0,0 +1,94 @@
+import time
+
+import numpy as np
+import pytest
+from PySide6.QtCore import QCoreApplication
+
+from DataLogger import DataLogger
+from ReplaySource import ReplaySource
+
+
+@pytest.fixture(scope='module')
+def qt_app():
+    return QCoreApplication.instance() or QCoreApplication([])
+
+
+def _record(tmp_path, file_format, raw_values, rate):
+    logger = DataLogger(base_directory=str(tmp_path))
+    logger.start_logging(file_format=file_format, metadata={'sample_rate': rate})
+    start_time = logger.session_start_time / 1000
+    logger.log_block(raw_values * 0.1875, raw_values, timestamps=start_time + np.arange(len(raw_values)) / rate)
+    logger.stop_logging()
+    return logger.last_file
+
+
+def _process_events(app):
+    app.processEvents()
+    time.sleep(0.001)
+
+
+def _replay(source, app, timeout=10):
+    blocks = []
+
+    def consume(values, timestamps):
+        blocks.append((values, timestamps))
+        source.block_consumed()
+
+    source.data_block_received.connect(consume)
+    assert source.connect_serial()
+    source.start_reading()
+
+    deadline = time.time() + timeout
+    while source.isRunning() and time.time() < deadline:
+        _process_events(app)
+    source.wait()
+    _process_events(app)
+    return blocks
+
+
+@pytest.mark.parametrize('file_format', ['csv', 'binary'])
+def test_replay_as_fast_as_possible_emits_raw_values(tmp_path, qt_app, file_format):
+    raw = np.arange(3000, dtype=float) % 512 - 256
+    source = ReplaySource(_record(tmp_path, file_format, raw, 1000), speed=0)
+    blocks = _replay(source, qt_app)
+
+    values = np.concatenate([values for values, _ in blocks])
+    np.testing.assert_array_equal(values[:, 0], raw)
+    assert source.sample_rate == 1000
+    assert len(blocks[0][0]) == 20  # 20 ms de grabación por bloque
+    assert source.get_stats()['samples_received'] == 3000
+
+
+def test_replay_keeps_original_timing_scaled_by_speed(tmp_path, qt_app):
+    raw = np.zeros(1000)
+    source = ReplaySource(_record(tmp_path, 'binary', raw, 1000), speed=5)
+
+    started = time.time()
+    blocks = _replay(source, qt_app)
+    elapsed = time.time() - started
+
+    # 1 s de grabación a 5x: unos 0.2 s
+    assert 0.15 < elapsed < 1.0
+    timestamps = np.concatenate([timestamps for _, timestamps in blocks])
+    np.testing.assert_allclose(np.diff(timestamps), 1 / 5000, atol=1e-6)
+
+
+def test_replay_as_fast_as_possible_waits_for_consumer(tmp_path, qt_app):
+    source = ReplaySource(_record(tmp_path, 'binary', np.zeros(1000), 1000), speed=0, max_pending_blocks=3)
+    blocks = []
+    source.data_block_received.connect(lambda values, timestamps: blocks.append(values))
+    assert source.connect_serial()
+    source.start_reading()
+
+    # Sin block_consumed() se detiene con max_pending_blocks bloques emitidos
+    deadline = time.time() + 0.5
+    while time.time() < deadline:
+        _process_events(qt_app)
+    assert len(blocks) == 3 and source.isRunning()
+
+    source.block_consumed()
+    deadline = time.time() + 2
+    while len(blocks) < 4 and time.time() < deadline:
+        _process_events(qt_app)
+    assert len(blocks) == 4
+    source.stop_reading()
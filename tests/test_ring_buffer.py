@@ -0,0 +1,94 @@
+import numpy as np
+
+from RingBuffer import RingBuffer
+from SlidingExtrema import SlidingMinMax
+
+
+def test_view_is_contiguous_and_keeps_newest():
+    buffer = RingBuffer(5)
+    buffer.extend([1, 2, 3])
+    buffer.append(4)
+    buffer.extend([5, 6, 7])
+
+    view = buffer.view()
+    np.testing.assert_array_equal(view, [3, 4, 5, 6, 7])
+    assert view.flags['C_CONTIGUOUS']
+    assert view.base is buffer._data
+    assert buffer.latest() == 7
+    assert buffer.total_count == 7
+
+
+def test_extend_larger_than_capacity():
+    buffer = RingBuffer(4)
+    buffer.append(0)
+    buffer.extend(np.arange(1, 11))
+
+    np.testing.assert_array_equal(buffer.view(), [7, 8, 9, 10])
+    assert buffer.total_count == 11
+
+
+def test_backing_array_is_stable_and_filled():
+    buffer = RingBuffer(4, shape=(2,), fill_value=-120.0)
+    backing, end = buffer.backing()
+    buffer.extend([[1, 1], [2, 2]])
+
+    # Mismo arreglo siempre: view() es su tramo final y lo anterior vale fill_value
+    same, end = buffer.backing()
+    assert same is backing
+    np.testing.assert_array_equal(backing[end - 4:end, 0], [-120, -120, 1, 2])
+    buffer.extend([[3, 3], [4, 4], [5, 5]])
+    _, end = buffer.backing()
+    np.testing.assert_array_equal(backing[end - 4:end, 0], buffer.view()[:, 0])
+
+    buffer.clear()
+    assert np.all(backing == -120.0)
+
+
+def test_resize_keeps_newest_data():
+    buffer = RingBuffer(6)
+    buffer.extend(np.arange(10))
+
+    buffer.resize(3)
+    np.testing.assert_array_equal(buffer.view(), [7, 8, 9])
+
+    buffer.resize(8)
+    buffer.extend([10, 11])
+    np.testing.assert_array_equal(buffer.view(), [7, 8, 9, 10, 11])
+
+
+def test_shaped_elements_form_contiguous_view():
+    buffer = RingBuffer(3, shape=(2,))
+    buffer.append([0, 0])
+    buffer.extend(np.arange(8).reshape(4, 2))
+    view = buffer.view()
+    assert view.shape == (3, 2)
+    assert view.flags['C_CONTIGUOUS']
+    np.testing.assert_array_equal(view, [[2, 3], [4, 5], [6, 7]])
+    np.testing.assert_array_equal(buffer.latest(), [6, 7])
+
+    buffer.resize(2)
+    np.testing.assert_array_equal(buffer.view(), [[4, 5], [6, 7]])
+
+
+def test_sliding_min_max_matches_brute_force():
+    rng = np.random.default_rng(1)
+    values = np.round(rng.normal(0, 100, 3000))  # Con repetidos
+    extrema = SlidingMinMax()
+    window = 250
+
+    position = 0
+    for size in rng.integers(1, 40, 200):
+        block = values[position:position + size]
+        if len(block) == 0:
+            break
+        if size % 3 == 0:
+            for value in block:
+                extrema.push(value)
+        else:
+            extrema.push_block(block)
+        position += len(block)
+
+        start = max(0, position - window)
+        extrema.expire(start)
+        assert extrema.min() == values[start:position].min()
+        assert extrema.max() == values[start:position].max()
@@ -0,0 +1,44 @@
+import numpy as np
+
+from SerialHandler import SerialHandler
+
+
+def test_block_parser_keeps_partial_lines_between_chunks():
+    handler = SerialHandler()
+
+    first = handler._parse_chunk(b"3550\r\n3551\r\n35")
+    second = handler._parse_chunk(b"52\r\n3553\r\n")
+
+    np.testing.assert_array_equal(first, [[3550], [3551]])
+    np.testing.assert_array_equal(second, [[3552], [3553]])
+    assert handler._pending == b""
+
+
+def test_block_parser_counts_malformed_lines():
+    handler = SerialHandler()
+
+    values = handler._parse_chunk(b"ADS1115 inicializado correctamente!\r\n3550\r\n\xff\xfe\r\n3551\r\n")
+
+    np.testing.assert_array_equal(values, [[3550], [3551]])
+    assert handler.malformed_lines == 2
+
+
+def test_block_parser_reads_one_column_per_channel():
+    handler = SerialHandler()
+
+    values = handler._parse_chunk(b"3550,3600,3700,3800\r\n3551,3601,3701\r\n3552,3602,3702,3802\r\n")
+
+    np.testing.assert_array_equal(values, [[3550, 3600, 3700, 3800], [3552, 3602, 3702, 3802]])
+    assert handler.malformed_lines == 1
+
+
+def test_block_timestamps_spread_samples_between_reads():
+    handler = SerialHandler()
+    handler.sample_rate = 1000
+
+    # Primer chunk: sin lectura anterior, hacia atrás a 1/sample_rate desde la llegada
+    np.testing.assert_allclose(handler._sample_times(4, 10.0), [9.997, 9.998, 9.999, 10.0])
+    # Repartidas entre la lectura anterior y esta, sin escalones
+    np.testing.assert_allclose(handler._sample_times(4, 10.002), [10.0005, 10.001, 10.0015, 10.002])
+    # Después de una pausa del dispositivo no se estiran más allá de 1/sample_rate
+    np.testing.assert_allclose(handler._sample_times(2, 11.0), [10.999, 11.0])
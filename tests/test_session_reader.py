@@ -0,0 +1,88 @@
+import os
+import time
+
+import numpy as np
+
+from DataLogger import DataLogger
+from SessionReader import SessionReader
+
+RATE = 1000
+
+
+def _record(tmp_path, file_format, count, flush_interval=1.0):
+    logger = DataLogger(base_directory=str(tmp_path), flush_interval=flush_interval)
+    logger.start_logging(num_channels=2, file_format=file_format)
+    _log(logger, 0, count)
+    return logger
+
+
+def _log(logger, start, end):
+    for position in range(start, end, 500):
+        stop = min(position + 500, end)
+        raw = np.column_stack((np.arange(position, stop), -np.arange(position, stop))) * 0.5
+        start_time = logger.session_start_time / 1000
+        logger.log_block(raw, raw * 2, timestamps=start_time + np.arange(position, stop) / RATE)
+
+
+def _wait_written(logger, count):
+    deadline = time.time() + 5
+    while logger.samples_written < count and time.time() < deadline:
+        time.sleep(0.01)
+
+
+def test_binary_range_is_zero_copy_and_index_persists(tmp_path):
+    logger = _record(tmp_path, 'binary', 5000)
+    logger.stop_logging()
+    path = logger.last_file
+
+    reader = SessionReader(path)
+    assert reader.sample_count == 5000
+    assert reader.channels == 2
+    assert os.path.exists(path + '.tidx')
+
+    blocks = list(reader.iter_range(0.9995, 2.4995))
+    assert all(np.shares_memory(block.raw, reader._mmap) for block in blocks)
+    block = reader.read_range(0.9995, 2.4995)
+    np.testing.assert_array_equal(block.sample, np.arange(1001, 2501))
+    np.testing.assert_array_equal(block.raw[:, 1], -np.arange(1000, 2500) * 0.5)
+    assert abs(reader.duration - 4.999) < 1e-6
+
+    # Segunda apertura: el índice persistido ya cubre todos los chunks
+    reopened = SessionReader(path)
+    np.testing.assert_array_equal(reopened._index, reader._index)
+    np.testing.assert_array_equal(reopened.read_range(4.8995).sample, np.arange(4901, 5001))
+
+
+def test_binary_reader_follows_live_recording(tmp_path):
+    logger = _record(tmp_path, 'binary', 3000, flush_interval=0)
+    _wait_written(logger, 3000)
+    time.sleep(0.1)
+
+    reader = SessionReader(logger.get_current_file())
+    assert reader.sample_count == 2048  # Solo chunks completos
+
+    _log(logger, 3000, 6000)
+    _wait_written(logger, 6000)
+    time.sleep(0.1)
+    assert reader.refresh() == 5120 - 2048
+    np.testing.assert_array_equal(reader.read_range(4.9995, 5.1995).sample, np.arange(5001, 5121))
+    logger.stop_logging()
+
+
+def test_csv_range_reads_indexed_groups_and_tail(tmp_path):
+    logger = _record(tmp_path, 'csv', 3000)
+    logger.stop_logging()
+    path = logger.last_file
+
+    reader = SessionReader(path)
+    assert reader.sample_count == 3000
+    assert len(reader._index) == 2  # Grupos de 1024 filas; el resto queda como cola
+
+    block = reader.read_range(0.4995, 2.8995)
+    np.testing.assert_array_equal(block.sample, np.arange(501, 2901))
+    np.testing.assert_allclose(block.filtered[:, 0], np.arange(500, 2900) * 1.0)
+    np.testing.assert_allclose(block.time - reader.session_start_time, np.arange(500, 2900) / RATE, atol=1e-4)
+
+    reopened = SessionReader(path)
+    np.testing.assert_array_equal(reopened._index, reader._index)
+    assert len(reopened.read_range(2.4995)) == 4 and len(reopened.read_range(2.4995).sample) == 500
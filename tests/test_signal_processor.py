@@ -0,0 +1,167 @@
+import numpy as np
+from scipy import signal
+
+from SignalProcessor import SignalProcessor
+
+
+def _muscle_potential(processor, raw_values):
+    """Conversión RAW -> µV sin calibrar, igual que add_sample"""
+    voltage_mv = np.asarray(raw_values) * processor.ads_resolution
+    return ((voltage_mv - 666.0) / processor.system_gain) * 1000
+
+
+def _test_signal(n=2000, sample_rate=100):
+    t = np.arange(n) / sample_rate
+    rng = np.random.default_rng(0)
+    return 3552 + 200 * np.sin(2 * np.pi * 7 * t) + 50 * np.sin(2 * np.pi * 50 * t) + rng.normal(0, 20, n)
+
+
+def test_streaming_filters_match_scipy_reference():
+    processor = SignalProcessor()
+    for filter_type in ('notch', 'lowpass', 'highpass'):
+        processor.set_filter_state(filter_type, True)
+
+    raw = _test_signal()
+    output = np.array([processor.add_sample(value) for value in raw])
+
+    expected = _muscle_potential(processor, raw)
+    for filter_type in processor.filter_chain:
+        sos = processor._design_sos(filter_type)
+        zi = signal.sosfilt_zi(sos) * expected[0]
+        expected, _ = signal.sosfilt(sos, expected, zi=zi)
+
+    np.testing.assert_allclose(output, expected, rtol=1e-9, atol=1e-9)
+
+
+def test_streaming_starts_without_transient():
+    processor = SignalProcessor()
+    processor.set_filter_state('lowpass', True)
+
+    output = [processor.add_sample(4000) for _ in range(50)]
+
+    np.testing.assert_allclose(output, _muscle_potential(processor, 4000), rtol=1e-9)
+
+
+def test_zero_phase_mode_keeps_filtfilt_behaviour():
+    processor = SignalProcessor()
+    processor.set_filter_mode('zero_phase')
+    processor.set_filter_state('lowpass', True)
+
+    raw = _test_signal(200)
+    for value in raw:
+        last = processor.add_sample(value)
+
+    b, a = signal.butter(2, processor.lowpass_cutoff / (processor.sample_rate / 2))
+    expected = signal.filtfilt(b, a, _muscle_potential(processor, raw))
+    assert np.isclose(last, expected[-1])
+
+
+def test_zero_phase_blocks_keep_length_and_moving_average():
+    processor = SignalProcessor()
+    processor.set_filter_mode('zero_phase')
+    processor.set_filter_state('moving_avg', True)
+    processor.set_filter_state('lowpass', True)
+
+    # Un bloque más largo que el buffer devuelve una fila por muestra
+    raw = _test_signal(1500)
+    _, output = processor.process_block(raw)
+    assert output.shape == (1500,)
+
+    window = np.ones(processor.moving_avg_window) / processor.moving_avg_window
+    averaged = signal.lfilter(window, 1.0, _muscle_potential(processor, raw))
+    averaged[:processor.moving_avg_window] = (np.cumsum(_muscle_potential(processor, raw))[:processor.moving_avg_window]
+                                              / np.arange(1, processor.moving_avg_window + 1))
+    expected = signal.sosfiltfilt(processor._design_sos('lowpass'), averaged)
+    np.testing.assert_allclose(output, expected, rtol=1e-9, atol=1e-9)
+
+    # Los bloques siguientes se filtran con las entradas anteriores como contexto
+    _, output = processor.process_block(_test_signal(20))
+    assert output.shape == (20,)
+
+
+def test_design_cache_only_rebuilds_changed_stage():
+    processor = SignalProcessor()
+    for filter_type in ('notch', 'lowpass', 'highpass'):
+        processor.set_filter_state(filter_type, True)
+
+    for value in _test_signal(100):
+        processor.add_sample(value)
+    assert processor.get_design_cache_stats()['misses'] == 3
+
+    # Los spinboxes envían todos los parámetros en cada cambio
+    processor.set_filter_params(lowpass_cutoff=25.0, highpass_cutoff=0.5, notch_freq=50.0, moving_avg_window=10)
+    for value in _test_signal(100):
+        processor.add_sample(value)
+    assert processor.get_design_cache_stats()['misses'] == 4
+
+    # Volver a un valor anterior reutiliza el diseño en caché
+    processor.set_filter_params(lowpass_cutoff=30.0)
+    stats = processor.get_design_cache_stats()
+    assert stats['misses'] == 4
+    assert stats['hits'] == 1
+
+
+def test_retune_carries_state_without_transient():
+    processor = SignalProcessor()
+    processor.set_filter_state('lowpass', True)
+    for _ in range(200):
+        steady = processor.add_sample(4000)
+
+    processor.set_filter_params(lowpass_cutoff=10.0)
+
+    assert np.isclose(processor.add_sample(4000), steady)
+
+
+def test_process_block_matches_per_sample_path():
+    raw = _test_signal(1000)
+    per_sample = SignalProcessor()
+    block = SignalProcessor()
+    for processor in (per_sample, block):
+        for filter_type in ('moving_avg', 'notch', 'lowpass', 'highpass'):
+            processor.set_filter_state(filter_type, True)
+        processor.start_calibration(duration_seconds=1.5)
+
+    expected = np.array([per_sample.add_sample(value) for value in raw])
+    outputs = [block.process_block(chunk) for chunk in np.array_split(raw, 37)]
+    voltage_mv = np.concatenate([mv for mv, _ in outputs])
+    output = np.concatenate([uv for _, uv in outputs])
+
+    assert block.is_calibrated
+    assert np.isclose(block.baseline_offset_mv, per_sample.baseline_offset_mv)
+    np.testing.assert_allclose(voltage_mv, raw * block.ads_resolution)
+    np.testing.assert_allclose(output, expected, rtol=1e-9, atol=1e-9)
+
+
+def test_interleaved_scalar_and_block_calls_share_state():
+    raw = _test_signal(600)
+    block = SignalProcessor()
+    mixed = SignalProcessor()
+    for processor in (block, mixed):
+        for filter_type in ('moving_avg', 'notch', 'lowpass', 'highpass'):
+            processor.set_filter_state(filter_type, True)
+
+    _, expected = block.process_block(raw)
+    output = []
+    for start in range(0, len(raw), 50):
+        output.extend(mixed.add_sample(value) for value in raw[start:start + 25])
+        output.extend(mixed.process_block(raw[start + 25:start + 50])[1])
+
+    np.testing.assert_allclose(output, expected, rtol=1e-9, atol=1e-9)
+
+
+def test_multichannel_block_matches_independent_channels():
+    raw = np.column_stack([_test_signal(500) + offset for offset in (0, 40, -40, 80)])
+    multichannel = SignalProcessor()
+    singles = [SignalProcessor() for _ in range(raw.shape[1])]
+    for processor in [multichannel] + singles:
+        for filter_type in ('moving_avg', 'notch', 'lowpass', 'highpass'):
+            processor.set_filter_state(filter_type, True)
+
+    outputs = [multichannel.process_block(chunk)[1] for chunk in np.array_split(raw, 9)]
+    output = np.concatenate(outputs)
+
+    assert multichannel.num_channels == 4
+    assert output.shape == raw.shape
+    for channel, processor in enumerate(singles):
+        _, expected = processor.process_block(raw[:, channel])
+        np.testing.assert_allclose(output[:, channel], expected, rtol=1e-9, atol=1e-9)
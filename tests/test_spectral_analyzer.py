@@ -0,0 +1,67 @@
+import itertools
+
+import numpy as np
+from scipy import signal
+
+from SpectralAnalyzer import SpectralAnalyzer
+
+
+def _feed(analyzer, x, block_sizes=(1, 33, 500, 7, 128)):
+    frames = []
+    position = 0
+    for size in itertools.cycle(block_sizes):
+        if position >= len(x):
+            break
+        block = x[position:position + size]
+        frame = analyzer.process_block(block, np.arange(position, position + len(block), dtype=float))
+        if frame is not None:
+            frames.append(frame)
+        position += size
+    return frames
+
+
+def test_psd_matches_scipy_welch_for_any_block_sizes():
+    rng = np.random.default_rng(0)
+    t = np.arange(6000) / 1000
+    x = rng.normal(0, 10, (6000, 2)) + 30 * np.sin(2 * np.pi * 80 * t)[:, np.newaxis]
+    analyzer = SpectralAnalyzer(sample_rate=1000, num_channels=2)
+    assert (analyzer.nperseg, analyzer.hop) == (512, 256)
+
+    frames = _feed(analyzer, x)
+    ends = np.concatenate([frame.time for frame in frames]).astype(int)
+    np.testing.assert_array_equal(ends, np.arange(511, len(x), 256))
+
+    # Cada estimación equivale a Welch sobre los últimos `averages` segmentos
+    psd = np.concatenate([frame.psd for frame in frames])
+    for row in (0, 2, len(ends) - 1):
+        segments = min(row + 1, analyzer.averages)
+        span = analyzer.nperseg + (segments - 1) * analyzer.hop
+        frequencies, expected = signal.welch(x[ends[row] - span + 1:ends[row] + 1], fs=1000,
+                                             nperseg=analyzer.nperseg, noverlap=analyzer.nperseg - analyzer.hop,
+                                             axis=0)
+        np.testing.assert_allclose(psd[row], expected.T, rtol=1e-9, atol=1e-12)
+    np.testing.assert_array_equal(frequencies, analyzer.frequencies)
+
+    # Solo se retienen las muestras del próximo segmento
+    assert len(analyzer._buffer) < analyzer.nperseg
+
+
+def test_median_and_mean_frequency_track_dominant_tone():
+    t = np.arange(4000) / 2000
+    analyzer = SpectralAnalyzer(sample_rate=2000)
+    frame = _feed(analyzer, 100 * np.sin(2 * np.pi * 150 * t), block_sizes=(200,))[-1]
+    resolution = analyzer.frequencies[1]
+    assert abs(frame.median_freq[-1, 0] - 150) <= resolution
+    assert abs(frame.mean_freq[-1, 0] - 150) <= 2 * resolution
+
+    # Por debajo de la banda (20-450 Hz) no hay potencia: sin frecuencias definidas
+    analyzer = SpectralAnalyzer(sample_rate=2000)
+    frame = _feed(analyzer, np.full(2000, 5.0), block_sizes=(200,))[-1]
+    assert np.isnan(frame.median_freq).all() and np.isnan(frame.mean_freq).all()
+
+
+def test_segment_length_scales_with_sample_rate():
+    for sample_rate, nperseg in ((100, 64), (1000, 512), (4000, 2048)):
+        analyzer = SpectralAnalyzer(sample_rate=sample_rate)
+        assert analyzer.nperseg == nperseg
+        assert analyzer.hop_seconds == analyzer.hop / sample_rate
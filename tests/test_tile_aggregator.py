@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+
+from TileAggregator import TileAggregator
+
+
+def _fill(aggregator, times_ms, values, block_sizes):
+    position = 0
+    for size in block_sizes:
+        if position >= len(times_ms):
+            break
+        aggregator.extend(times_ms[position:position + size], values[position:position + size])
+        position += size
+
+
+def _brute_force(times_ms, values, resolution, t0_ms, t1_ms):
+    buckets = np.floor(times_ms / resolution)
+    inside = (buckets >= np.floor(t0_ms / resolution)) & (buckets <= np.floor(t1_ms / resolution))
+    result = {}
+    for bucket in np.unique(buckets[inside]):
+        selected = values[buckets == bucket]
+        result[bucket * resolution] = (selected.min(axis=0), selected.max(axis=0))
+    return result
+
+
+def test_tile_matches_brute_force_at_every_resolution():
+    rng = np.random.default_rng(4)
+    times_ms = np.arange(60_000) * 1.0 + 0.5   # 1 kHz, 60 s
+    values = rng.normal(0, 50, (len(times_ms), 2))
+    values[41_234, 1] = 900                   # Pico que la reducción no debe perder
+    aggregator = TileAggregator()
+    _fill(aggregator, times_ms, values, rng.integers(1, 400, 1000))
+    assert aggregator.total_samples == len(times_ms) and aggregator.last_time_ms == times_ms[-1]
+
+    for pixels, resolution in ((5000, 10), (400, 100), (40, 1000)):
+        tile = aggregator.tile(20_000, 59_999.5, pixels)
+        assert tile['resolution_ms'] == resolution and tile['channels'] == 2
+        assert len(tile['time_ms']) <= pixels
+        expected = _brute_force(times_ms, values, resolution, 20_000, 59_999.5)
+        assert tile['time_ms'] == list(expected)
+        for index, (minimum, maximum) in enumerate(expected.values()):
+            for channel in range(2):
+                assert tile['min'][channel][index] == round(minimum[channel], 1)
+                assert tile['max'][channel][index] == round(maximum[channel], 1)
+
+        window = values[(times_ms >= 20_000) & (times_ms < 60_000)]
+        assert tile['stats']['max'][1] == 900 and tile['stats']['count'] == len(window)
+        assert tile['stats']['mean'] == pytest.approx(window.mean(axis=0), abs=0.05)
+        assert tile['stats']['rms'] == pytest.approx(np.sqrt((window ** 2).mean(axis=0)), abs=0.05)
+
+
+def test_tile_groups_coarsest_level_and_skips_forgotten_buckets():
+    aggregator = TileAggregator(resolutions_ms=(10, 100), buckets_per_level=50)
+    times_ms = np.arange(0, 20_000, 5.0)
+    _fill(aggregator, times_ms, np.sin(times_ms / 300), [37] * 200)
+
+    # 20 s en 100 ms son 200 intervalos, pero el nivel solo guarda los últimos 50
+    tile = aggregator.tile(0, 19_999, 10)
+    assert tile['resolution_ms'] == 500 and len(tile['time_ms']) == 10
+    assert tile['time_ms'][0] == 15_000 and tile['stats']['count'] == 1000
+
+    # Una ventana corta usa el nivel fino
+    assert aggregator.tile(19_800, 19_999, 100)['resolution_ms'] == 10
+    assert aggregator.tile(0, 100, 100)['stats'] is None
+
+
+def test_channel_change_and_clear_restart_aggregates():
+    aggregator = TileAggregator()
+    aggregator.extend([0.0, 5.0], [1.0, 3.0])
+    assert aggregator.tile(0, 10, 10)['stats']['mean'] == [2.0]
+
+    aggregator.extend([10.0, 15.0], [[1.0, 2.0], [3.0, 4.0]])
+    tile = aggregator.tile(0, 20, 10)
+    assert tile['channels'] == 2 and tile['time_ms'] == [10.0] and tile['stats']['mean'] == [2.0, 3.0]
+
+    aggregator.clear()
+    assert aggregator.tile(0, 20, 10)['stats'] is None
+
+
+def test_batch_longer_than_history_keeps_latest_buckets():
+    aggregator = TileAggregator(resolutions_ms=(10, 100), buckets_per_level=50)
+    times_ms = np.arange(0, 3000, 1.0)[::-1]  # Desordenado y más largo que 50 intervalos de 10 ms
+    aggregator.extend(times_ms, times_ms)
+
+    tile = aggregator.tile(2500, 2999, 50)
+    assert tile['resolution_ms'] == 10 and tile['time_ms'] == [2500.0 + 10 * i for i in range(50)]
+    assert tile['min'][0][:2] == [2500.0, 2510.0] and tile['stats']['count'] == 500
+    assert aggregator.tile(0, 2999, 30)['stats']['count'] == 3000
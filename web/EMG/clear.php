@@ -33,6 +33,10 @@ try {
             if ($existingData !== null && is_array($existingData)) {
                 $deletedBatches = count($existingData);
                 $previousSize = filesize($dataFile);
+                // La secuencia continúa después del borrado para no invalidar los cursores de los visores
+                if (!empty($existingData)) {
+                    file_put_contents('emg_seq.txt', end($existingData)['seq'] ?? 0);
+                }
             }
         }
         
@@ -59,10 +59,21 @@ try {
     // Parámetros opcionales
     $limit = isset($_GET['limit']) ? intval($_GET['limit']) : null;
     $latest = isset($_GET['latest']) ? filter_var($_GET['latest'], FILTER_VALIDATE_BOOLEAN) : false;
+    $since = isset($_GET['since']) ? intval($_GET['since']) : null;
+    
+    $firstSeq = empty($data) ? null : ($data[0]['seq'] ?? null);
+    $lastSeq = empty($data) ? 0 : (end($data)['seq'] ?? 0);
+    
+    // Solo los lotes posteriores al último que recibió el visor
+    if ($since !== null) {
+        $data = array_values(array_filter($data, function ($batch) use ($since) {
+            return ($batch['seq'] ?? 0) > $since;
+        }));
+    }
     
     // Aplicar límite si se especifica
     if ($limit && $limit > 0) {
-        if ($latest) {
+        if ($latest && $since === null) {
             // Obtener los últimos N lotes
             $data = array_slice($data, -$limit);
         } else {
@@ -97,6 +108,8 @@ try {
         'first_timestamp' => $firstTimestamp,
         'last_timestamp' => $lastTimestamp,
         'file_size' => filesize($dataFile),
+        'first_seq' => $firstSeq,
+        'last_seq' => $lastSeq,
         'timestamp' => date('c')
     ]);
     
@@ -2,7 +2,7 @@
 header('Content-Type: application/json');
 header('Access-Control-Allow-Origin: *');
 header('Access-Control-Allow-Methods: POST, GET, OPTIONS');
-header('Access-Control-Allow-Headers: Content-Type');
+header('Access-Control-Allow-Headers: Content-Type, Content-Encoding');
 
 // Manejar preflight OPTIONS request
 if ($_SERVER['REQUEST_METHOD'] == 'OPTIONS') {
@@ -18,32 +18,146 @@ if ($_SERVER['REQUEST_METHOD'] !== 'POST') {
 
 // Archivo donde se almacenan los datos
 $dataFile = 'emg_data.json';
+// Último número de secuencia antes de un borrado (clear.php)
+$seqFile = 'emg_seq.txt';
+// Bloqueo del leer-agregar-reescribir: dos POST simultáneos sin él leen el mismo
+// archivo y el último en escribir pisa al otro (un lote confirmado se pierde)
+$lockFile = 'emg_data.lock';
+
+// Espera máxima (s) por el lote anterior de un mismo emisor que sigue en vuelo
+$reorderTimeout = 2.0;
+
+function readExistingData($dataFile) {
+    if (!file_exists($dataFile)) {
+        return [];
+    }
+    $fileContent = file_get_contents($dataFile);
+    if ($fileContent === false || empty(trim($fileContent))) {
+        return [];
+    }
+    $existingData = json_decode($fileContent, true);
+    return $existingData === null ? [] : $existingData;
+}
+
+// Última secuencia guardada de un emisor (batch_id "<emisor>-<secuencia>" de HTTPSender)
+function lastSenderSequence($existingData, $sender) {
+    for ($i = count($existingData) - 1; $i >= 0; $i--) {
+        $batchId = $existingData[$i]['batch_id'] ?? '';
+        if (strncmp($batchId, $sender . '-', strlen($sender) + 1) === 0) {
+            return intval(substr($batchId, strlen($sender) + 1));
+        }
+    }
+    return null;
+}
+
+// Convierte un lote columnar (BatchCodec.py, "columnar-v1") al formato por muestra
+function expandColumnarBatch($data) {
+    $timeInfo = $data['time_ms'];
+    $resolution = $timeInfo['resolution'];
+    $scale = round(1 / $resolution);
+    $ticks = (int) round($timeInfo['t0'] / $resolution);
+    $channels = $data['channels'];
+    $count = $channels == 1 ? count($data['raw']) : count($data['raw'][0] ?? []);
+    
+    $samples = [];
+    for ($i = 0; $i < $count; $i++) {
+        if ($i > 0) {
+            $ticks += $timeInfo['deltas'][$i - 1];
+        }
+        if ($channels == 1) {
+            $raw = $data['raw'][$i];
+            $filtered = $data['filtered'][$i];
+        } else {
+            $raw = array_column($data['raw'], $i);
+            $filtered = array_column($data['filtered'], $i);
+        }
+        $samples[] = ['time_ms' => $ticks / $scale, 'raw' => $raw, 'filtered' => $filtered];
+    }
+    
+    unset($data['format'], $data['channels'], $data['time_ms'], $data['raw'], $data['filtered']);
+    $data['samples'] = $samples;
+    return $data;
+}
+
+$lock = null;
 
 try {
     // Leer datos JSON del request
     $input = file_get_contents('php://input');
+    
+    // Cuerpo comprimido por HTTPSender
+    if (($_SERVER['HTTP_CONTENT_ENCODING'] ?? '') === 'gzip') {
+        $input = gzdecode($input);
+        if ($input === false) {
+            throw new Exception('Cuerpo gzip inválido');
+        }
+    }
+    
     $data = json_decode($input, true);
     
     if ($data === null) {
         throw new Exception('Datos JSON inválidos');
     }
     
+    if (($data['format'] ?? '') === 'columnar-v1') {
+        $data = expandColumnarBatch($data);
+    }
+    
     // Validar estructura básica
     if (!isset($data['timestamp']) || !isset($data['samples'])) {
         throw new Exception('Estructura de datos inválida');
     }
     
-    // Leer datos existentes o crear array vacío
-    $existingData = [];
-    if (file_exists($dataFile)) {
-        $fileContent = file_get_contents($dataFile);
-        if ($fileContent !== false && !empty(trim($fileContent))) {
-            $existingData = json_decode($fileContent, true);
-            if ($existingData === null) {
-                $existingData = [];
-            }
+    $sender = null;
+    $sequence = null;
+    if (isset($data['batch_id']) && preg_match('/^(.+)-(\d+)$/', $data['batch_id'], $matches)) {
+        $sender = $matches[1];
+        $sequence = intval($matches[2]);
+    }
+    
+    $lock = fopen($lockFile, 'c');
+    if ($lock === false) {
+        throw new Exception('Error al abrir el archivo de bloqueo');
+    }
+    
+    // Leer datos existentes con el bloqueo tomado; si falta el lote anterior de un
+    // emisor ya conocido (varios en vuelo) se suelta el bloqueo y se reintenta hasta $reorderTimeout
+    $deadline = microtime(true) + $reorderTimeout;
+    while (true) {
+        if (!flock($lock, LOCK_EX)) {
+            throw new Exception('Error al bloquear el archivo de datos');
+        }
+        $existingData = readExistingData($dataFile);
+        if ($sender === null || microtime(true) >= $deadline) {
+            break;
         }
+        $lastSequence = lastSenderSequence($existingData, $sender);
+        if ($lastSequence === null || $sequence <= $lastSequence + 1) {
+            break;
+        }
+        flock($lock, LOCK_UN);
+        usleep(50000);
+    }
+    
+    // Reenvíos del spool de HTTPSender: un lote ya guardado se confirma sin duplicarlo
+    if (isset($data['batch_id']) && in_array($data['batch_id'], array_column($existingData, 'batch_id'), true)) {
+        echo json_encode([
+            'status' => 'success',
+            'message' => 'Lote ya recibido',
+            'duplicate' => true,
+            'samples_received' => 0,
+            'total_batches' => count($existingData),
+            'timestamp' => date('c')
+        ]);
+        exit;
+    }
+    
+    // Número de secuencia creciente para las lecturas incrementales (get_data.php?since=)
+    $lastSeq = empty($existingData) ? 0 : (end($existingData)['seq'] ?? count($existingData));
+    if (file_exists($seqFile)) {
+        $lastSeq = max($lastSeq, intval(file_get_contents($seqFile)));
     }
+    $data['seq'] = $lastSeq + 1;
     
     // Agregar timestamp del servidor
     $data['server_timestamp'] = date('c');
@@ -68,6 +182,7 @@ try {
     echo json_encode([
         'status' => 'success',
         'message' => 'Datos recibidos y guardados',
+        'seq' => $data['seq'],
         'samples_received' => count($data['samples']),
         'total_batches' => count($existingData),
         'timestamp' => date('c')
@@ -80,5 +195,10 @@ try {
         'message' => $e->getMessage(),
         'timestamp' => date('c')
     ]);
+} finally {
+    if ($lock) {
+        flock($lock, LOCK_UN);
+        fclose($lock);
+    }
 }
 ?>
\ No newline at end of file